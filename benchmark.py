@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# Times loading, histograms, metrics and maps for synthetic placement dumps of
+# several sizes (see placement_postprocessing/synthetic.py). Results can be
+# written to a JSON file, and compared with an earlier one to spot
+# regressions. Run with `--help` for usage.
+
+import placement_postprocessing as pp
+from placement_postprocessing import metrics, synthetic
+
+import argparse
+import datetime
+import json
+import matplotlib
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+import numpy as np
+import pandas as pd
+
+# Most time `import placement_postprocessing` may take, in seconds, and modules
+# it must not import (they're imported when they're first used).
+importBudget = 0.25
+deferredModules = ("pandas", "matplotlib", "graphviz")
+
+# Default sizes to benchmark, as WIDTHxHEIGHT[@BOXES].
+defaultSizes = ("33x33", "100x100", "316x316@2")
+
+# Histograms to time, as (stage name, function name in the package, plotting
+# arguments), as in the command-line interface.
+histograms = (("histogram_mailbox", "mailbox_loading_histogram", {}),
+              ("histogram_core", "core_loading_histogram", {"bins": 4}),
+              ("histogram_hwedge", "mailbox_edge_loading_histogram",
+               {"bins": 8}),
+              ("histogram_appedge", "application_edge_cost_histogram", {}))
+
+# Stages slower than this many times their baseline are regressions...
+defaultThreshold = 1.25
+
+# ...unless they're quicker than this anyway (in seconds), because timings
+# that small are mostly noise.
+minimumTime = 0.01
+
+
+def parse_size(size: str) -> typing.Tuple[int, int, int]:
+    """
+    Parses a size of the form WIDTHxHEIGHT[@BOXES] into a tuple of (width,
+    height, boxes). Raises a ValueError if it can't.
+    """
+    plate, _, boxes = size.partition("@")
+    width, _, height = plate.partition("x")
+    try:
+        return int(width), int(height), int(boxes) if boxes else 1
+    except ValueError:
+        raise ValueError("Size '{}' is not of the form "
+                         "WIDTHxHEIGHT[@BOXES].".format(size))
+
+
+def time_import(repeats: int=3) -> typing.Tuple[float, typing.List[str]]:
+    """
+    Times `import placement_postprocessing` in fresh interpreters, keeping
+    the quickest of `repeats`.
+
+    Returns a tuple of (seconds, modules in `deferredModules` that were
+    imported anyway).
+    """
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import placement_postprocessing\n"
+            "print(time.perf_counter() - start)\n"
+            "print(' '.join(module for module in {!r} "
+            "if module in sys.modules))".format(deferredModules))
+    packageParent = os.path.dirname(os.path.abspath(__file__))
+    best = float("inf")
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", code], check=True, stdout=subprocess.PIPE,
+            universal_newlines=True, cwd=packageParent).stdout
+        seconds, imported = out.split("\n")[:2]
+        best = min(best, float(seconds))
+    return best, imported.split()
+
+
+def time_stages(dataDir: str, outDir: str) -> typing.Dict[str, float]:
+    """
+    Loads the run in `dataDir` and times each stage once, drawing pictures
+    into `outDir`.
+
+    Returns a dictionary mapping stage names to times in seconds.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    data = pp.Data(dataDir, lazy=False)
+    timings["load"] = time.perf_counter() - start
+
+    for name, function, plotArgs in histograms:
+        start = time.perf_counter()
+        figure = getattr(pp, function)(data, plotArgs=dict(plotArgs))
+        figure.savefig(os.path.join(outDir, name + ".png"))
+        timings[name] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metrics.summarise(data)
+    timings["metrics"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pp.map.crossing_edge_counts(data)
+    timings["map_edges"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pp.draw_map(data, outPath=os.path.join(outDir, "map.png"),
+                backend="matplotlib")
+    timings["map"] = time.perf_counter() - start
+    return timings
+
+
+def benchmark(sizes: typing.Iterable[str], repeats: int=3,
+              workDir: str=None, log: typing.TextIO=sys.stdout) -> dict:
+    """
+    Generates a synthetic run for each size (into `workDir`, or a temporary
+    directory), and times each stage `repeats` times, keeping the quickest.
+    Runs already in `workDir` are reused.
+
+    Returns the results, as a JSON-able dictionary.
+    """
+    results = {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(),
+               "numpy": np.__version__,
+               "pandas": pd.__version__,
+               "matplotlib": matplotlib.__version__,
+               "machine": platform.machine(),
+               "repeats": repeats,
+               "sizes": {}}
+
+    results["import"], imported = time_import(repeats)
+    log.write("import: {:.3f}s{}\n".format(results["import"], "".join(
+        ", imported {}".format(module) for module in imported)))
+    results["importedModules"] = imported
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        root = tempDir if workDir is None else workDir
+        for size in sizes:
+            width, height, boxes = parse_size(size)
+            dataDir = os.path.join(root, "plate_{}x{}@{}".format(
+                width, height, boxes))
+            if not os.path.isdir(dataDir):
+                start = time.perf_counter()
+                synthetic.generate_run(dataDir, width, height, boxes)
+                log.write("Generated {} in {:.2f}s.\n".format(
+                    size, time.perf_counter() - start))
+
+            best = {}
+            for _ in range(repeats):
+                for stage, timing in time_stages(dataDir, tempDir).items():
+                    best[stage] = min(timing, best.get(stage, np.inf))
+            results["sizes"][size] = {"devices": width * height,
+                                      "boxes": boxes,
+                                      "stages": best}
+            log.write("{}: {}\n".format(size, ", ".join(
+                "{} {:.3f}s".format(stage, timing)
+                for stage, timing in best.items())))
+            log.flush()
+    return results
+
+
+def compare(results: dict, baseline: dict,
+            threshold: float=defaultThreshold,
+            log: typing.TextIO=sys.stdout) -> typing.List[str]:
+    """
+    Compares `results` with `baseline` (both from `benchmark`), stage by
+    stage, for the sizes in both.
+
+    Returns a list of "<SIZE> <STAGE>" for stages that are more than
+    `threshold` times slower than their baseline.
+    """
+    regressions = []
+    if "import" in baseline:
+        ratio = results["import"] / baseline["import"]
+        log.write("import: {:.3f}s -> {:.3f}s ({:.2f}x)\n".format(
+            baseline["import"], results["import"], ratio))
+        if ratio > threshold and results["import"] > minimumTime:
+            regressions.append("import")
+    for size, result in results["sizes"].items():
+        if size not in baseline["sizes"]:
+            continue
+        old = baseline["sizes"][size]["stages"]
+        for stage, timing in result["stages"].items():
+            if stage not in old:
+                continue
+            ratio = timing / old[stage] if old[stage] else np.inf
+            regressed = ratio > threshold and timing > minimumTime
+            log.write("{} {}: {:.3f}s -> {:.3f}s ({:.2f}x){}\n".format(
+                size, stage, old[stage], timing, ratio,
+                " REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append("{} {}".format(size, stage))
+    return regressions
+
+
+def main(argv: typing.List[str]=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Times loading, histograms, metrics and maps for "
+                    "synthetic placement runs of several sizes.")
+    parser.add_argument("sizes", nargs="*", default=list(defaultSizes),
+                        metavar="SIZE",
+                        help="Sizes to run, as WIDTHxHEIGHT[@BOXES]. "
+                             "Defaults to {}.".format(" ".join(defaultSizes)))
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+                        help="Number of times to time each stage. The "
+                             "quickest is kept. Defaults to 3.")
+    parser.add_argument("-w", "--work-dir", default=None,
+                        help="Directory to generate runs into, and reuse "
+                             "them from. Defaults to a temporary directory.")
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSON file to write results to.")
+    parser.add_argument("-b", "--baseline", default=None,
+                        help="JSON file of earlier results to compare with.")
+    parser.add_argument("-t", "--threshold", type=float,
+                        default=defaultThreshold,
+                        help="Ratio to the baseline above which a stage has "
+                             "regressed. Defaults to {}."
+                             .format(defaultThreshold))
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.sizes, args.repeats, args.work_dir)
+    if args.output is not None:
+        with open(args.output, "w") as outFile:
+            json.dump(results, outFile, indent=4)
+
+    # Importing the package should be quick, whatever the baseline.
+    failed = False
+    if results["import"] > importBudget or \
+            results["importedModules"]:
+        print("Importing the package took {:.3f}s (budget {}s), and "
+              "imported '{}'.".format(results["import"],
+                                      importBudget,
+                                      "', '".join(results["importedModules"])))
+        failed = True
+
+    if args.baseline is not None:
+        with open(args.baseline) as baselineFile:
+            regressions = compare(results, json.load(baselineFile),
+                                  args.threshold)
+        if regressions:
+            print("Regressions: {}".format(", ".join(regressions)))
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
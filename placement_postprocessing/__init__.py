@@ -1,3 +1,63 @@
-from .artist import *
-from .data import Data
-from .map import draw_map
+# Nothing heavy (pandas, matplotlib, graphviz) is imported until it's used:
+# names are imported from their modules the first time they're looked up
+# (PEP 562), so `import placement_postprocessing` is quick.
+
+from .keys import *
+
+import importlib
+import sys
+import types
+import typing
+
+# Public names, and the module each is defined in.
+_exports = {"Data": "data",
+            "RunCollection": "collection",
+            "draw_map": "map",
+            "draw_delta_map": "map",
+            "draw_tiled_map": "map",
+            "diff": "diff",
+            "RunDiff": "diff",
+            "dashboard": "artist",
+            "delta_histogram": "artist",
+            "application_edge_cost_histogram": "artist",
+            "core_loading_histogram": "artist",
+            "mailbox_edge_loading_histogram": "artist",
+            "mailbox_loading_histogram": "artist"}
+
+# Submodules that can be used as attributes of the package.
+_submodules = ("address", "artist", "cli", "collection", "data", "diff",
+               "edgecache", "framecache", "graph", "instrument", "keys",
+               "map", "metrics", "reader", "streaming", "synthetic",
+               "topology", "validation", "watch", "whatif")
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in _exports:
+        value = getattr(importlib.import_module(
+            "." + _exports[name], __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module '{}' has no attribute '{}'"
+                             .format(__name__, name))
+    globals()[name] = value  # So we're not asked again.
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(set(globals()) | set(_exports) | set(_submodules))
+
+
+class _Package(types.ModuleType):
+    """
+    This package, which keeps exported names from being replaced by the
+    submodules of the same name (i.e. `diff`) when those are first imported.
+    """
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        if name in _exports and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,161 @@
+# Packs hardware names from the Orchestrator into integer addresses, so that
+# hardware components can be compared and grouped without any string work.
+
+import numpy as np
+import pandas as pd
+import re
+import typing
+
+# Hardware hierarchy levels, from coarsest to finest.
+levels = ("box", "board", "mailbox", "core", "thread")
+
+# Each field of a packed address occupies one byte, except the box, which is
+# an index into an interning table (see `pack`) and occupies the top bytes.
+# The bit offset of each field is:
+fieldShifts = {"box": 48,
+               "boardX": 40,
+               "boardY": 32,
+               "mailboxX": 24,
+               "mailboxY": 16,
+               "core": 8,
+               "thread": 0}
+fieldMask = 0xff
+
+# Bits to keep when truncating an address to each level.
+levelMasks = {"box": ~((1 << 48) - 1),
+              "board": ~((1 << 32) - 1),
+              "mailbox": ~((1 << 16) - 1),
+              "core": ~((1 << 8) - 1),
+              "thread": ~0}
+
+# Hardware names look like O_.<ROOT>.<EXTENSION>.<BOX>.B<X><Y>.M<X><Y>, with
+# optional .C<N> and .T<NN> components for cores and threads. Everything
+# before the board is interned as the "box".
+reHardwareName = re.compile(
+    r"^(.+)\.B([0-9])([0-9])\.M([0-9])([0-9])(?:\.C([0-9]+))?"
+    r"(?:\.T([0-9]+))?$")
+
+
+def _check_level(level: str) -> None:
+    if level not in levels:
+        raise ValueError("Level '{}' must be one of '{}'."
+                         .format(level, "', '".join(levels)))
+
+
+def pack(names: pd.Series, boxes: typing.List[str]) -> np.ndarray:
+    """
+    Packs a series of hardware names (boxes, boards, mailboxes, cores or
+    threads, in any mix) into an array of int64 addresses. Arguments:
+
+     - names: Series (categorical, or anything pandas can factorize) of
+           hardware names.
+     - boxes: Interning table of box prefixes
+           (O_.<ROOT>.<EXTENSION>.<BOX>). Prefixes not already in the table
+           are appended to it, so pass the same list to every call whose
+           addresses you want to compare.
+
+    Each distinct name is parsed only once. Names that cannot be understood
+    are packed as -1.
+    """
+
+    # Intern the names, so that we only parse each one once. Categorical
+    # names are already interned.
+    if isinstance(getattr(names, "dtype", None), pd.CategoricalDtype):
+        codes = names.cat.codes.to_numpy()
+        uniques = names.cat.categories
+    else:
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+    parts = pd.Series(uniques, dtype=object).str.extract(reHardwareName)
+    valid = parts[0].notna().to_numpy()
+
+    # Intern the box prefixes, growing the table as needed.
+    known = {box: index for index, box in enumerate(boxes)}
+    for box in parts[0][valid].unique():
+        if box not in known:
+            known[box] = len(boxes)
+            boxes.append(box)
+
+    packed = np.full(len(uniques), -1, dtype=np.int64)
+    fields = parts[valid].fillna("0")
+    value = fields[0].map(known).to_numpy(dtype=np.int64) << fieldShifts["box"]
+    for column, field in enumerate(("boardX", "boardY", "mailboxX",
+                                    "mailboxY", "core", "thread")):
+        value |= ((fields[column + 1].to_numpy(dtype=np.int64) & fieldMask)
+                  << fieldShifts[field])
+    packed[valid] = value
+
+    out = packed[codes]
+    out[codes == -1] = -1  # Missing names
+    return out
+
+
+def truncate(addresses: np.ndarray, level: str) -> np.ndarray:
+    """
+    Truncates packed addresses to the component that contains them at
+    `level` (one of `levels`). Invalid (negative) addresses stay invalid.
+    """
+    _check_level(level)
+    return np.where(addresses >= 0, addresses & levelMasks[level], -1)
+
+
+def field(addresses: np.ndarray, name: str) -> np.ndarray:
+    """
+    Extracts one field (a key of `fieldShifts`) from packed addresses.
+    """
+    if name == "box":
+        return addresses >> fieldShifts["box"]
+    return (addresses >> fieldShifts[name]) & fieldMask
+
+
+def unpack(addresses: np.ndarray, boxes: typing.List[str],
+           level: str="thread") -> np.ndarray:
+    """
+    Turns packed addresses back into hardware names, down to `level`, using
+    the box interning table `boxes` they were packed with. Only distinct
+    addresses are formatted. Invalid addresses become None.
+    """
+    _check_level(level)
+    uniques, inverse = np.unique(addresses, return_inverse=True)
+    names = []
+    depth = levels.index(level)
+    for address in uniques.tolist():
+        if address < 0:
+            names.append(None)
+            continue
+        parts = [boxes[address >> fieldShifts["box"]]]
+        if depth >= 1:
+            parts.append("B{}{}".format(
+                (address >> fieldShifts["boardX"]) & fieldMask,
+                (address >> fieldShifts["boardY"]) & fieldMask))
+        if depth >= 2:
+            parts.append("M{}{}".format(
+                (address >> fieldShifts["mailboxX"]) & fieldMask,
+                (address >> fieldShifts["mailboxY"]) & fieldMask))
+        if depth >= 3:
+            parts.append("C{}".format(
+                (address >> fieldShifts["core"]) & fieldMask))
+        if depth >= 4:
+            parts.append("T{:02d}".format(
+                (address >> fieldShifts["thread"]) & fieldMask))
+        names.append(".".join(parts))
+    return np.asarray(names, dtype=object)[inverse.reshape(-1)]
+
+
+def group_sum(addresses: np.ndarray, level: str,
+              weights: np.ndarray=None) \
+        -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Groups packed addresses by their component at `level`, and sums `weights`
+    (or counts, if no weights are given) over each group. Invalid addresses
+    are ignored.
+
+    Returns a tuple of (distinct truncated addresses, sums), sorted by address.
+    """
+    truncated = truncate(addresses, level)
+    valid = truncated >= 0
+    uniques, inverse = np.unique(truncated[valid], return_inverse=True)
+    sums = np.bincount(inverse.reshape(-1),
+                       weights=None if weights is None
+                       else np.asarray(weights)[valid],
+                       minlength=len(uniques))
+    return uniques, sums
@@ -2,17 +2,37 @@
 
 from .keys import *  # Sorry
 from .data import Data
+from .diff import RunDiff
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
+import sys
 
+# Keyword arguments of pyplot.subplots that are not figure arguments.
+subplotsArgs = ("sharex", "sharey", "squeeze", "subplot_kw", "gridspec_kw",
+                "width_ratios", "height_ratios")
 
-def _common_formatting(figure: mpl.figure.Figure) -> mpl.figure.Figure:
+
+def _subplots(*args, **figArgs) -> tuple:
     """
-    Take a figure and apply sensible formatting to to it.
+    Makes a figure and some axes, as `matplotlib.pyplot.subplots` does. If
+    pyplot has not been imported, the figure is made without it, so that
+    drawing pictures to files never imports pyplot (or a GUI backend). Such
+    figures are not managed by pyplot (so `plt.show` won't show them), but can
+    be saved as usual.
+    """
+    if "matplotlib.pyplot" in sys.modules:
+        return sys.modules["matplotlib.pyplot"].subplots(*args, **figArgs)
+    import matplotlib.figure
+    axesArgs = {key: figArgs.pop(key) for key in subplotsArgs
+                if key in figArgs}
+    figure = matplotlib.figure.Figure(**figArgs)
+    return figure, figure.subplots(*args, **axesArgs)
+
+
+def _format_axes(axes: "matplotlib.axes.Axes") -> "matplotlib.axes.Axes":
+    """
+    Take some axes and apply sensible formatting to them.
     """
-    axes = figure.gca()
     try:
         axes.xaxis.get_major_locator().set_params(integer=True)
     except TypeError:
@@ -22,47 +42,31 @@ def _common_formatting(figure: mpl.figure.Figure) -> mpl.figure.Figure:
     axes.spines["top"].set_visible(False)
     axes.yaxis.set_ticks_position("left")
     axes.xaxis.set_ticks_position("bottom")
-    figure.tight_layout()
-    return figure
+    return axes
 
 
-def _histogram(data: Data, what: str="mailbox", figArgs: dict={},
-               plotArgs: dict={}) -> mpl.figure.Figure:
+def _common_formatting(figure: "matplotlib.figure.Figure") \
+        -> "matplotlib.figure.Figure":
     """
-    Draws a histogram - either for cores (node), for mailboxes (node), for
-    edges connecting mailboxes (hwedge), or for the cost associated with each
-    application edge (appedge). Arguments:
-
-    - data: A placement_processing Data object with loaded data.
-    - what: String, either "mailbox", "core", "hwedge", or "appedge".
-    - figArgs: Keyword arguments to be passed to the figure constructor
-          (subplots).
-    - plotArgs: Plotting arguments to be passed to the histogram plot (hist).
-
-    Returns a matplotlib figure object that you can view/save/modify as you
-    like.
+    Take a figure and apply sensible formatting to to it.
     """
+    for axes in figure.axes:
+        _format_axes(axes)
+    figure.tight_layout()
+    return figure
 
-    if what == "core":
-        loadings = data.frames[keyNodeLoadingCore]["load"]
-    elif what == "mailbox":
-        loadings = data.frames[keyNodeLoadingMbox]["load"]
-    elif what == "hwedge":
-        loadings = data.frames[keyHwEdgeLoading]["load"]
-    elif what == "appedge":
-        loadings = data.frames[keyAppEdgeCosts]["cost"]
-    else:  # Sanity
-        raise RuntimeError("Argument 'what' must be either 'mailbox', 'core', "
-                           "'hwedge', or 'appedge'.")
 
-    # Process figure arguments (adding our defaults). We modify inplace because
-    # we're monsters.
-    defaultFigArgs = {"figsize": (4, 3), "dpi": 100}
-    for item in defaultFigArgs.items():
-        if item[0] not in figArgs.keys():
-            figArgs[item[0]] = item[1]
+def _draw_histogram(axes: "matplotlib.axes.Axes", data: Data,
+                    what: str="mailbox", plotArgs: dict={}) \
+        -> "matplotlib.axes.Axes":
+    """
+    Draws a histogram onto some existing axes. See `_histogram` for
+    arguments. The counts are computed (and cached) by `data.histogram`, so
+    matplotlib never sees the raw data.
+    """
 
-    # Process plot arguments (adding our defaults), as before.
+    # Process plot arguments (adding our defaults).
+    plotArgs = dict(plotArgs)
     defaultPlotArgs = {"bins": 6}
     if what == "hwedge":
         defaultPlotArgs["color"] = "b"
@@ -77,27 +81,26 @@ def _histogram(data: Data, what: str="mailbox", figArgs: dict={},
         if item[0] not in plotArgs.keys():
             plotArgs[item[0]] = item[1]
 
-    # Actually do some work
-    figure, axes = plt.subplots(**figArgs)
-    figure.dpi = figArgs["dpi"]  # Sometimes overridden by other arguments.
-    axes.hist(loadings, **plotArgs)
+    # Actually do some work. Raises a RuntimeError if `what` is nonsense.
+    counts, edges = data.histogram(what, plotArgs.pop("bins"),
+                                   plotArgs.pop("range", None))
+    axes.hist(edges[:-1], bins=edges, weights=counts, **plotArgs)
 
     # This weird approach suppresses a UserWarning raised when limits are set
     # to the same value.
-    axes.set_xlim(min(loadings), max(loadings +
-                  (0 if min(loadings) != max(loadings) else 1e-2)))
+    axes.set_xlim(edges[0], edges[-1] + (0 if edges[0] != edges[-1]
+                                         else 1e-2))
 
     # Line up ticks with bins, formatting them as integers if possible.
-    desiredTicks = np.linspace(min(loadings), max(loadings),
-                               plotArgs["bins"] + 1)
-    if (desiredTicks == desiredTicks.astype(int)).all():
-        axes.set_xticks(desiredTicks.astype(int))
+    if (edges == edges.astype(int)).all():
+        axes.set_xticks(edges.astype(int))
     else:
-        axes.set_xticks(desiredTicks)
+        axes.set_xticks(edges)
 
     # The formatting continues...
-    axes.set_ylim(0, len(loadings))
-    axes.set_ylabel("Occurences (total={})".format(len(loadings)))
+    total = int(counts.sum())
+    axes.set_ylim(0, total)
+    axes.set_ylabel("Occurences (total={})".format(total))
     if what == "core":
         axes.set_xlabel("Number of application nodes placed on cores")
         axes.set_title("Core Loading")
@@ -111,13 +114,137 @@ def _histogram(data: Data, what: str="mailbox", figArgs: dict={},
     elif what == "appedge":
         axes.set_xlabel("Edge cost")
         axes.set_title("'Hardware cost' of application edges")
+    return _format_axes(axes)
+
+
+def _histogram(data: Data, what: str="mailbox", figArgs: dict={},
+               plotArgs: dict={}) -> "matplotlib.figure.Figure":
+    """
+    Draws a histogram - either for cores (node), for mailboxes (node), for
+    edges connecting mailboxes (hwedge), or for the cost associated with each
+    application edge (appedge). Arguments:
+
+    - data: A placement_processing Data object with loaded data.
+    - what: String, either "mailbox", "core", "hwedge", or "appedge".
+    - figArgs: Keyword arguments to be passed to the figure constructor
+          (subplots).
+    - plotArgs: Plotting arguments to be passed to the histogram plot
+          (hist). The "bins" and "range" arguments are used to bin the data
+          with numpy (see `Data.histogram`).
+
+    Returns a matplotlib figure object that you can view/save/modify as you
+    like.
+    """
+
+    # Sanity
+    if what not in ("mailbox", "core", "hwedge", "appedge"):
+        raise RuntimeError("Argument 'what' must be either 'mailbox', 'core', "
+                           "'hwedge', or 'appedge'.")
+
+    # Process figure arguments (adding our defaults).
+    figArgs = dict(figArgs)
+    defaultFigArgs = {"figsize": (4, 3), "dpi": 100}
+    for item in defaultFigArgs.items():
+        if item[0] not in figArgs.keys():
+            figArgs[item[0]] = item[1]
+
+    with data.stats.stage("draw histogram {}".format(what)):
+        figure, axes = _subplots(**figArgs)
+        figure.dpi = figArgs["dpi"]  # Sometimes overridden by other arguments.
+        _draw_histogram(axes, data, what, plotArgs)
+        return _common_formatting(figure)
+
+
+def dashboard(data: Data, figArgs: dict={}, plotArgs: dict={}) \
+        -> "matplotlib.figure.Figure":
+    """
+    Draws the core loading, mailbox loading, mailbox edge loading, and
+    application edge cost histograms together, in one two-by-two figure.
+    Arguments:
+
+    - data: A placement_processing Data object with loaded data.
+    - figArgs: Keyword arguments to be passed to the figure constructor
+          (subplots).
+    - plotArgs: Dictionary mapping "core", "mailbox", "hwedge", and "appedge"
+          to plotting arguments for that histogram (see `_histogram`).
+
+    Returns a matplotlib figure object that you can view/save/modify as you
+    like.
+    """
+
+    # Process figure arguments (adding our defaults).
+    figArgs = dict(figArgs)
+    defaultFigArgs = {"figsize": (8, 6), "dpi": 100}
+    for item in defaultFigArgs.items():
+        if item[0] not in figArgs.keys():
+            figArgs[item[0]] = item[1]
+
+    with data.stats.stage("draw dashboard"):
+        figure, axes = _subplots(2, 2, **figArgs)
+        figure.dpi = figArgs["dpi"]
+        for panel, what in zip(axes.flat, ("core", "mailbox", "hwedge",
+                                           "appedge")):
+            _draw_histogram(panel, data, what, plotArgs.get(what, {}))
+        return _common_formatting(figure)
+
+
+def delta_histogram(runDiff: RunDiff, what: str="mailbox", figArgs: dict={},
+                    plotArgs: dict={}) -> "matplotlib.figure.Figure":
+    """
+    Draws a histogram of how much something changed between two placement
+    runs - either the loading of cores (core), of mailboxes (mailbox), of
+    edges connecting mailboxes (hwedge), or the cost of application edges
+    (appedge). Arguments:
+
+    - runDiff: A RunDiff object, from `placement_postprocessing.diff.diff`.
+    - what: String, either "mailbox", "core", "hwedge", or "appedge".
+    - figArgs: Keyword arguments to be passed to the figure constructor
+          (subplots).
+    - plotArgs: Plotting arguments to be passed to the histogram plot (hist).
+          The "bins" and "range" arguments are used to bin the data with
+          numpy.
+
+    Returns a matplotlib figure object that you can view/save/modify as you
+    like.
+    """
+    tables = {"core": (runDiff.coreLoads, "Change in core loading"),
+              "mailbox": (runDiff.mailboxLoads, "Change in mailbox loading"),
+              "hwedge": (runDiff.hwEdgeLoads,
+                         "Change in mailbox edge loading"),
+              "appedge": (runDiff.edgeCosts,
+                          "Change in 'hardware cost' of application edges")}
+    if what not in tables:
+        raise RuntimeError("Argument 'what' must be either 'mailbox', 'core', "
+                           "'hwedge', or 'appedge'.")
+    table, title = tables[what]
+    deltas = table["delta"].dropna().to_numpy(dtype=np.float64)
+
+    # Process arguments (adding our defaults).
+    figArgs = dict(figArgs)
+    for item in {"figsize": (4, 3), "dpi": 100}.items():
+        if item[0] not in figArgs.keys():
+            figArgs[item[0]] = item[1]
+    plotArgs = dict(plotArgs)
+    for item in {"bins": 6, "color": "#888888",
+                 "edgecolor": "#222222"}.items():
+        if item[0] not in plotArgs.keys():
+            plotArgs[item[0]] = item[1]
+
+    counts, edges = np.histogram(deltas, bins=plotArgs.pop("bins"),
+                                 range=plotArgs.pop("range", None))
+    figure, axes = _subplots(**figArgs)
+    figure.dpi = figArgs["dpi"]
+    axes.hist(edges[:-1], bins=edges, weights=counts, **plotArgs)
+    axes.set_ylabel("Occurences (total={})".format(int(counts.sum())))
+    axes.set_xlabel("Change (second run - first run)")
+    axes.set_title(title)
     return _common_formatting(figure)
 
 
 # Alias
 def application_edge_cost_histogram(data: Data, figArgs: dict={},
                                     plotArgs: dict={}) \
-    -> mpl.figure.Figure:
+    -> "matplotlib.figure.Figure":
     """See documentation for _histogram."""
     return _histogram(data, "appedge", figArgs, plotArgs)
 
@@ -125,7 +252,7 @@ def application_edge_cost_histogram(data: Data, figArgs: dict={},
 # Alias
 def core_loading_histogram(data: Data, figArgs: dict={},
                            plotArgs: dict={}) \
-    -> mpl.figure.Figure:
+    -> "matplotlib.figure.Figure":
     """See documentation for _histogram."""
     return _histogram(data, "core", figArgs, plotArgs)
 
@@ -133,7 +260,7 @@ def core_loading_histogram(data: Data, figArgs: dict={},
 # Alias
 def mailbox_edge_loading_histogram(data: Data, figArgs: dict={},
                                    plotArgs: dict={}) \
-    -> mpl.figure.Figure:
+    -> "matplotlib.figure.Figure":
     """See documentation for _histogram."""
     return _histogram(data, "hwedge", figArgs, plotArgs)
 
@@ -141,6 +268,6 @@ def mailbox_edge_loading_histogram(data: Data, figArgs: dict={},
 # Alias
 def mailbox_loading_histogram(data: Data, figArgs: dict={},
                               plotArgs: dict={}) \
-    -> mpl.figure.Figure:
+    -> "matplotlib.figure.Figure":
     """See documentation for _histogram."""
     return _histogram(data, "mailbox", figArgs, plotArgs)
@@ -0,0 +1,263 @@
+# A command-line interface for drawing pictures for lots of placement runs at
+# once. Run with `python -m placement_postprocessing --help`.
+
+from .keys import *  # Sorry again
+from .collection import RunCollection, Run
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+import typing
+
+# Pictures we can draw, as (name, function name in the package, plotting
+# arguments, keys of the files the picture is drawn from). The map is drawn
+# with draw_map; everything else is a histogram (or four).
+outputs = (
+    ("mailbox_loading", "mailbox_loading_histogram", {},
+     (keyNodeLoading,)),
+    ("core_loading", "core_loading_histogram", {"bins": 4},
+     (keyNodeLoading,)),
+    ("edge_loading", "mailbox_edge_loading_histogram", {"bins": 8},
+     (keyHwEdgeLoading,)),
+    ("app_edge_costs", "application_edge_cost_histogram", {},
+     (keyAppEdgeCosts,)),
+    ("dashboard", "dashboard", {"core": {"bins": 4}, "hwedge": {"bins": 8}},
+     (keyNodeLoading, keyHwEdgeLoading, keyAppEdgeCosts)),
+    ("map", "draw_map", {},
+     (keyNodeLoading, keyHwEdgeLoading, keyAppEdgeCosts, keyAppToHw)))
+
+
+def output_dir(run: Run, outputRoot: str=None) -> str:
+    """
+    Returns the directory that pictures for `run` are written to: a
+    directory named after the run in `outputRoot`, or in the run's own
+    directory if `outputRoot` is None.
+    """
+    name = "{}_{}".format(run.appname, run.timestamp)
+    return os.path.join(run.dataDir if outputRoot is None else outputRoot,
+                        "plots_" + name)
+
+
+def _is_fresh(outPath: str, inPaths: typing.Iterable[str]) -> bool:
+    """
+    Returns whether `outPath` exists and is newer than every input.
+    """
+    if not os.path.exists(outPath):
+        return False
+    outTime = os.path.getmtime(outPath)
+    return all(os.path.getmtime(inPath) <= outTime for inPath in inPaths)
+
+
+def _init_worker() -> None:
+    """
+    Sets up a worker process for drawing without a display.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_run(run: Run, outDir: str, extension: str="pdf",
+               force: bool=False, draw: typing.Iterable[str]=None,
+               stats: bool=None) \
+        -> typing.Dict[str, typing.Union[float, str, Exception]]:
+    """
+    Draws every picture (or those named in `draw`) for one placement run into
+    `outDir`. Pictures newer than all of the files they are drawn from are
+    skipped, unless `force` is True. A failure to draw one picture does not
+    stop the others from being drawn.
+
+    If `stats` is True (or None, and the environment variable
+    `instrument.envVariable` is set), the time and peak memory of each stage
+    of loading and drawing is also written to "stats.json" in `outDir`.
+
+    Returns a dictionary mapping each stage ("load", then each picture name)
+    to the time it took in seconds, "skipped" if it was skipped, or the
+    exception it raised.
+    """
+    # Pictures are drawn without pyplot (see artist._subplots), so figures
+    # are freed once they're saved.
+    import placement_postprocessing as pp
+
+    timings = {}
+    start = time.perf_counter()
+    data = pp.Data(run.dataDir, timestamp=run.timestamp, stats=stats)
+    timings["load"] = time.perf_counter() - start
+    os.makedirs(outDir, exist_ok=True)
+
+    for name, function, plotArgs, sources in outputs:
+        if draw is not None and name not in draw:
+            continue
+        outPath = os.path.join(outDir, "{}.{}".format(name, extension))
+        inPaths = [os.path.join(data.dataDir, data.files[key])
+                   for key in sources]
+        if not force and _is_fresh(outPath, inPaths):
+            timings[name] = "skipped"
+            continue
+
+        start = time.perf_counter()
+        try:
+            if name == "map":
+                pp.draw_map(data, outPath=outPath, backend="auto")
+            else:
+                figure = getattr(pp, function)(data,
+                                               plotArgs=dict(plotArgs))
+                figure.savefig(outPath)
+        except Exception as error:  # Report it, and carry on.
+            timings[name] = error
+            continue
+        timings[name] = time.perf_counter() - start
+
+    if data.stats.enabled:
+        data.stats.to_json(os.path.join(outDir, "stats.json"))
+    return timings
+
+
+def format_timings(run: Run, timings: dict) -> str:
+    """
+    Formats the timings returned by `render_run` as one line of text.
+    """
+    stages = []
+    total = 0
+    for stage, timing in timings.items():
+        if isinstance(timing, float):
+            stages.append("{} {:.2f}s".format(stage, timing))
+            total += timing
+        elif isinstance(timing, Exception):
+            stages.append("{} FAILED ({}: {})".format(
+                stage, type(timing).__name__, timing))
+        else:
+            stages.append("{} {}".format(stage, timing))
+    return "{} {} ({}): {}; total {:.2f}s".format(
+        run.appname, run.timestamp, run.dataDir, ", ".join(stages), total)
+
+
+def format_result(run: Run,
+                  result: typing.Union[dict, Exception]) -> str:
+    """
+    Formats the timings returned by `render_run`, or the exception it raised,
+    as one line of text.
+    """
+    if isinstance(result, Exception):
+        return "{} {} ({}): FAILED ({}: {})".format(
+            run.appname, run.timestamp, run.dataDir, type(result).__name__,
+            result)
+    return format_timings(run, result)
+
+
+def failed(results: typing.Dict[Run, typing.Union[dict, Exception]]) \
+        -> bool:
+    """
+    Returns whether any of `results` (from `render`) failed, in whole or in
+    part.
+    """
+    return any(not isinstance(timings, dict) or
+               any(isinstance(timing, Exception)
+                   for timing in timings.values())
+               for timings in results.values())
+
+
+def render(paths: typing.Iterable[str], outputRoot: str=None,
+           extension: str="pdf", force: bool=False, processes: int=None,
+           draw: typing.Iterable[str]=None, log: typing.TextIO=sys.stdout,
+           stats: bool=None) \
+        -> typing.Dict[Run, dict]:
+    """
+    Draws pictures for every placement run found under each of `paths`
+    across a pool of `processes` worker processes (defaults to one per CPU),
+    writing a line of timings to `log` as each run finishes. See
+    `render_run` and `output_dir` for the other arguments.
+
+    Returns a dictionary mapping each run to its timings (or to the exception
+    raised when loading it).
+    """
+    runs = []
+    for path in paths:
+        collection = RunCollection(path)
+        runs.extend(collection.runs)
+        for run, reason in collection.errors.items():
+            log.write("Skipping {} {} ({}): {}\n".format(
+                run.appname, run.timestamp, run.dataDir, reason))
+
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            processes, initializer=_init_worker) as pool:
+        futures = {pool.submit(render_run, run, output_dir(run, outputRoot),
+                               extension, force, draw, stats): run
+                   for run in runs}
+        for future in concurrent.futures.as_completed(futures):
+            run = futures[future]
+            try:
+                results[run] = future.result()
+            except Exception as error:
+                results[run] = error
+            log.write(format_result(run, results[run]) + "\n")
+            log.flush()
+    return results
+
+
+def main(argv: typing.List[str]=None) -> int:
+    """
+    Entry point for the command-line interface. Returns an exit code, which is
+    nonzero if anything failed.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m placement_postprocessing",
+        description="Draws histograms and maps for every placement run found "
+                    "under the given directories.")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="Directories to search for placement runs.")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Directory to write pictures to, in one "
+                             "subdirectory per run. Defaults to each run's "
+                             "own directory.")
+    parser.add_argument("-f", "--format", default="pdf",
+                        help="File extension (and so format) of pictures. "
+                             "Defaults to pdf.")
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="Number of worker processes. Defaults to one "
+                             "per CPU.")
+    parser.add_argument("--force", action="store_true",
+                        help="Redraw pictures even if they are newer than "
+                             "their inputs.")
+    parser.add_argument("--only", nargs="+", default=None,
+                        choices=[output[0] for output in outputs],
+                        help="Only draw these pictures.")
+    parser.add_argument("--stats", action="store_true", default=None,
+                        help="Write the time and peak memory of each stage "
+                             "of loading and drawing to stats.json, next to "
+                             "each run's pictures.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep watching the directories, drawing "
+                             "pictures for each new (or changed) run once "
+                             "its files stop changing, until interrupted.")
+    parser.add_argument("--new-only", action="store_true",
+                        help="With --watch, don't draw runs that are already "
+                             "there when watching starts.")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="With --watch, seconds between scans of the "
+                             "directories. Defaults to 2.")
+    parser.add_argument("--settle", type=float, default=None,
+                        help="With --watch, seconds the files of a run must "
+                             "stay the same before it is drawn. Defaults "
+                             "to 5.")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="With --watch, most runs given to the workers "
+                             "at once. Defaults to twice the number of "
+                             "processes.")
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        from .watch import Watcher, defaultInterval, defaultSettle
+        watcher = Watcher(
+            args.paths, args.output_dir, args.format, args.force, args.only,
+            args.stats, args.processes, args.queue_size,
+            defaultInterval if args.interval is None else args.interval,
+            defaultSettle if args.settle is None else args.settle,
+            existing=not args.new_only)
+        return 1 if failed(watcher.watch()) else 0
+
+    results = render(args.paths, args.output_dir, args.format, args.force,
+                     args.processes, args.only, stats=args.stats)
+    return 1 if failed(results) else 0
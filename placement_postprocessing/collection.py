@@ -0,0 +1,143 @@
+# A class that finds many placement runs under a directory tree, and loads
+# them in parallel.
+
+from .data import Data, match_file, portfolio
+
+import collections
+import concurrent.futures
+import os
+import typing
+
+# A placement run found on disk.
+Run = collections.namedtuple("Run", ("dataDir", "appname", "timestamp"))
+
+
+def _load_run(run: Run, dataArgs: dict) -> Data:
+    """
+    Loads every dataframe of a run, for use in worker processes. Module-level
+    so that it can be pickled.
+    """
+    return Data(run.dataDir, timestamp=run.timestamp, lazy=False, **dataArgs)
+
+
+class RunCollection:
+    """
+    A collection of placement runs found anywhere under a root directory. Runs
+    are grouped by the directory they're in and their <TIMESTAMP>, so a
+    directory may hold any number of runs. Each run is loaded into its own
+    Data object.
+    """
+
+    # The directory tree we're scanning.
+    rootDir = None
+
+    # Complete runs found by self.scan, as a list of Run tuples, sorted.
+    runs = None
+
+    # Runs that could not be used, mapped to the reason why (a string for runs
+    # with missing files, or the exception raised while loading them).
+    errors = None
+
+    # File names of each run found by self.scan (complete or not), as a
+    # dictionary keyed by Run, of dictionaries keyed by file key (see
+    # data.portfolio).
+    files = None
+
+    # Loaded Data objects, keyed by Run, populated in self.load.
+    data = None
+
+    def __init__(self, path: str, scan: bool=True) -> None:
+        """
+        Constructs a collection of placement runs from the directory tree at
+        `path`, and scans it (unless `scan` is False).
+        """
+        self.rootDir = path
+        self.runs = []
+        self.errors = {}
+        self.files = {}
+        self.data = {}
+        if scan:
+            self.scan()
+
+    def scan(self) -> typing.List[Run]:
+        """
+        Walks the directory tree for placement files, grouping them into runs.
+        Raises a ValueError if the root is not a directory. Runs that are
+        missing any expected files are not in `self.runs`, but are noted in
+        `self.errors`.
+
+        Returns `self.runs`.
+        """
+        if not os.path.isdir(self.rootDir):
+            raise ValueError("Could not find a directory at '{}'."
+                             .format(self.rootDir))
+
+        found = collections.defaultdict(dict)  # (dir, timestamp) -> files
+        appnames = {}
+        for directory, _, handles in os.walk(self.rootDir):
+            for handle in handles:
+                match = match_file(handle)
+                if match is None:
+                    continue
+                index, appname, timestamp = match
+                found[(directory, timestamp)][index] = handle
+                if appname:
+                    appnames[(directory, timestamp)] = appname
+
+        self.runs = []
+        self.errors = {}
+        self.files = {}
+        for (directory, timestamp), files in sorted(found.items()):
+            run = Run(directory, appnames.get((directory, timestamp)),
+                      timestamp)
+            self.files[run] = files
+            missing = [key for key in portfolio.keys() if key not in files]
+            if missing:
+                self.errors[run] = ("Files '{}' missing from target directory."
+                                    .format(", ".join(missing)))
+            else:
+                self.runs.append(run)
+        return self.runs
+
+    def load(self, processes: int=None, **dataArgs) -> typing.Dict[Run, Data]:
+        """
+        Loads every run in `self.runs`, each into its own Data object, parsing
+        the runs in parallel across a pool of `processes` worker processes
+        (defaults to one per CPU). Keyword arguments are passed to the Data
+        constructor (e.g. `cacheDir`).
+
+        If `processes` is 1, runs are loaded in this process, one at a time.
+        Runs that raise exceptions while loading are noted in `self.errors`
+        rather than stopping the whole collection.
+
+        Returns `self.data`, a dictionary of Data objects keyed by Run.
+        """
+        self.data = {}
+        if processes == 1:
+            for run in self.runs:
+                try:
+                    self.data[run] = _load_run(run, dataArgs)
+                except (RuntimeError, ValueError, OSError) as error:
+                    self.errors[run] = error
+            return self.data
+
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            futures = {pool.submit(_load_run, run, dataArgs): run
+                       for run in self.runs}
+            for future in concurrent.futures.as_completed(futures):
+                run = futures[future]
+                try:
+                    self.data[run] = future.result()
+                except (RuntimeError, ValueError, OSError) as error:
+                    self.errors[run] = error
+
+        # Keep the order of self.runs, rather than the order of completion.
+        self.data = {run: self.data[run] for run in self.runs
+                     if run in self.data}
+        return self.data
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    def __iter__(self) -> typing.Iterator[Run]:
+        return iter(self.runs)
@@ -2,10 +2,15 @@
 # Orchestrator.
 
 from .keys import *  # Sorry
+from . import instrument
+from . import reader
 
+import collections.abc
+import numpy as np
 import os
 import pandas as pd
 import re
+import typing
 
 # Regular expressions for common capture groups in data file handles.
 reAppname = ".+"  # Optimistic
@@ -19,6 +24,8 @@ reAppToHw = (r"placement_gi_to_hardware_({})_({})\.csv"
              .format(reAppname, reTimestamp))
 reDiagnostic = (r"placement_diagnostics_({})_({})\.txt"
                 .format(reAppname, reTimestamp))
+reEdgeCache = (r"placement_edge_cache_({})\.txt"
+               .format(reTimestamp))
 reHwEdgeLoading = (r"placement_edge_loading_({})\.csv"
                    .format(reTimestamp))
 reHwToApp = (r"placement_hardware_to_gi_({})_({})\.csv"
@@ -33,14 +40,120 @@ portfolio = {keyAppEdgeCosts: reAppEdgeCosts,
              keyHwToApp: reHwToApp,
              keyNodeLoading: reNodeLoading}
 
+# The file each dataframe is parsed from.
+frameSources = {keyAppEdgeCosts: keyAppEdgeCosts,
+                keyAppToHw: keyAppToHw,
+                keyHwEdgeLoading: keyHwEdgeLoading,
+                keyHwToApp: keyHwToApp,
+                keyNodeLoadingCore: keyNodeLoading,
+                keyNodeLoadingMbox: keyNodeLoading}
+
+# The dataframe and column each histogram (see Data.histogram) is drawn from.
+histogramSources = {"core": (keyNodeLoadingCore, "load"),
+                    "mailbox": (keyNodeLoadingMbox, "load"),
+                    "hwedge": (keyHwEdgeLoading, "load"),
+                    "appedge": (keyAppEdgeCosts, "cost")}
+
+# Files that we use if they're there, but that don't have to be.
+optionalPortfolio = {keyEdgeCache: reEdgeCache}
+
+
+def match_file(handle: str) -> typing.Optional[typing.Tuple[str, str, str]]:
+    """
+    Matches a file name against the expressions in `portfolio` and
+    `optionalPortfolio`. Raises a RuntimeError if the expression matches
+    with an unexpected number of groups.
+
+    Returns a tuple of (key, appname, timestamp) if the file matches, where
+    appname is None for files that don't include one. Returns None otherwise.
+    """
+    expressions = {**portfolio, **optionalPortfolio}
+    for index in expressions.keys():
+
+        # The actual work
+        match = re.fullmatch(expressions[index], handle)
+        if not match:
+            continue  # We'll be back, probably
+
+        # If there are two captured groups (the parentheses), the first is the
+        # appname and the second is the timestamp. If there is one group, it is
+        # the timestamp. If there are more than two groups, something's gone
+        # horribly wrong.
+        groups = match.groups()
+        if len(groups) > 2:
+            raise RuntimeError(
+                "Unknown error when matching expression '{}' to file '{}'. "
+                "Not really sure what to say to this. There were {} matches."
+                .format(expressions[index], handle, len(groups)))
+        elif len(groups) == 2:
+            return (index, groups[0], groups[1])
+        else:  # We've already checked zero.
+            return (index, None, groups[0])
+    return None
+
+
+class LazyDict(collections.abc.MutableMapping):
+    """
+    A dictionary with a fixed set of initial keys, whose values are computed
+    by calling `loader(key)` the first time they are accessed, and kept
+    thereafter. Iterating over keys (or testing membership) loads nothing.
+    If `onLoad` is given, `onLoad(key)` is called after each value is
+    loaded (and stored).
+    """
+
+    def __init__(self, keys: typing.Iterable, loader: typing.Callable,
+                 onLoad: typing.Callable=None) -> None:
+        self._keys = dict.fromkeys(keys)  # Ordered set
+        self._values = {}
+        self._loader = loader
+        self._onLoad = onLoad
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in self._keys:
+                raise KeyError(key)
+            self._values[key] = self._loader(key)
+            if self._onLoad is not None:
+                self._onLoad(key)
+        return self._values[key]
+
+    def __setitem__(self, key, value) -> None:
+        self._keys[key] = None
+        self._values[key] = value
+
+    def __delitem__(self, key) -> None:
+        del self._keys[key]
+        self._values.pop(key, None)
+
+    def __iter__(self) -> typing.Iterator:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return "{}({{{}}})".format(type(self).__name__, ", ".join(
+            "{!r}: {}".format(key, "<loaded>" if key in self._values
+                              else "<not loaded>") for key in self._keys))
+
+    def is_loaded(self, key) -> bool:
+        """Returns whether the value for `key` has been loaded."""
+        return key in self._values
+
+    def unload(self, key) -> None:
+        """Forgets the value for `key`, so that it's reloaded on next use."""
+        self._values.pop(key, None)
+
 
 class Data:
 
     # Fields for each file, to be populated with strings in self.detect_files.
-    files = {key: None for key in portfolio.keys()}
+    # Optional files that are not found stay None.
+    files = {key: None for key in {**portfolio, **optionalPortfolio}.keys()}
 
-    # Dataframes for each CSV, to be populated in self.read_files. Node loading
-    # is split into two.
+    # Dataframes for each CSV. Node loading is split into two. For each
+    # instance, this is a LazyDict that reads each dataframe the first time
+    # it is accessed (or all of them, in self.read_files).
     frames = {item[0]: None for item in
               filter(lambda x: x[1].split(".")[-1] == "csv" and
                      "node_loading" not in x[1],
@@ -48,21 +161,139 @@ class Data:
     frames[keyNodeLoadingCore] = None
     frames[keyNodeLoadingMbox] = None
 
+    # Packed integer addresses (see address.py) for each hardware name column,
+    # keyed by (frame key, column name). Also a LazyDict, populated as each
+    # address column is accessed (or in self.read_files).
+    addresses = None
+
+    # Interning table of box prefixes used to pack `addresses`.
+    boxes = None
+
+    # Histograms computed by self.histogram, keyed by their arguments.
+    histograms = None
+
+    # Application and hardware graphs (see graph.py), keyed by "application"
+    # or "hardware", built by self.graph.
+    graphs = None
+
+    # Mailbox-to-mailbox edge costs, populated in self.load_edge_cache.
+    edgeCache = None
+
+    # Parsed placement diagnostics, populated in self.load_diagnostics.
+    diagnostics = None
+
     # The directory holding the files we're processing.
     dataDir = None
 
+    # The directory to cache parsed dataframes in, or None to not cache them.
+    cacheDir = None
+
+    # Whether or not to hash the contents of source files when checking that
+    # cached dataframes are up to date.
+    cacheHash = False
+
+    # The pandas CSV parsing engine to use (see reader.available_engines).
+    csvEngine = "c"
+
+    # If set, only files from the placement run with this timestamp are
+    # detected, so that one directory can hold several runs.
+    runTimestamp = None
+
+    # Timings and peak memory for each stage of loading (see instrument.py).
+    stats = None
+
+    # Whether histograms of big files are computed a chunk at a time, rather
+    # than from whole dataframes (see self.histogram).
+    streaming = False
+
+    # Whether the files are checked against each other (see validation.py)
+    # as they're read: each check is run as soon as the dataframes it needs
+    # have been loaded.
+    validateOnLoad = True
+
+    # A Report (see validation.py) of the checks run so far, populated as
+    # the files are read, and in self.validate.
+    validation = None
+
     # Gathered metadata
     appname = None
     timestamp = None
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, cacheDir: str=None,
+                 cacheHash: bool=False, lazy: bool=True,
+                 timestamp: str=None, csvEngine: str="c",
+                 stats: typing.Union[bool, instrument.Stats]=None,
+                 streaming: bool=False, validate: bool=True) -> None:
         """
         Constructs a placement data object from the data found within the
-        directory at `path`.
+        directory at `path`. If `timestamp` is set, only the placement run
+        with that timestamp is loaded from the directory, and files from
+        other runs are ignored.
+
+        If `lazy` is True (the default), the files in the directory are
+        detected up front, but each dataframe is only read when it is first
+        accessed through `self.frames`. Otherwise, everything is read now.
+
+        If `cacheDir` is set, parsed dataframes are written to (and reused
+        from) binary cache files in that directory. Cache files are reused
+        only if the size and modification time of their source file are
+        unchanged (and its contents too, if `cacheHash` is True).
+
+        CSV files are parsed with the pandas engine `csvEngine`, which may be
+        "pyarrow" if pyarrow is installed.
+
+        If `stats` is True, the time and peak memory taken by each stage of
+        loading (and drawing) this data are recorded in `self.stats` (see
+        instrument.py). Pass a Stats object to record into that instead, or
+        leave it as None to let the environment variable
+        `instrument.envVariable` decide.
+
+        If `streaming` is True, histograms of the application edge costs and
+        the mailbox edge loading are computed from their files a chunk at a
+        time (see streaming.py), unless their dataframes are loaded already,
+        so that those files never need to fit in memory.
+
+        If `validate` is True (the default), the files are checked against
+        each other (see `self.validate`) as they're read: each check is run
+        as soon as the dataframes it needs have been loaded, and loading the
+        dataframe that completes a failing check raises a RuntimeError. The
+        dataframes a failing check read are forgotten, and loading any of
+        them again runs the check again, so bad data always raises. Pass
+        `validate=False` to only check them when asked.
         """
+        self.stats = stats if isinstance(stats, instrument.Stats) \
+            else instrument.Stats(stats)
         self.dataDir = path
-        self.detect_files()
-        self.read_files()
+        self.files = dict.fromkeys(type(self).files.keys())
+        self.cacheDir = cacheDir
+        self.cacheHash = cacheHash
+        self.csvEngine = csvEngine
+        self.runTimestamp = timestamp
+        self.streaming = streaming
+        self.validateOnLoad = validate
+        self._failed = set()  # Checks that failed, until they pass
+        self._reset_frames()
+        with self.stats.stage("detect_files"):
+            self.detect_files()
+        if not lazy:
+            self.read_files()
+
+    def _reset_frames(self) -> None:
+        """
+        Forgets all loaded dataframes and addresses, so that they are read
+        again when next accessed.
+        """
+        self.frames = LazyDict(type(self).frames.keys(), self._load_frame,
+                               self._frame_loaded)
+        self.addresses = LazyDict(
+            [(key, column) for key, columns in hardwareColumns.items()
+             for column in columns], self._load_addresses)
+        self.boxes = []
+        self.histograms = {}
+        self.graphs = {}
+        self._appnodeIndex = None
+        self.validation = None
+        self._checked = set()  # Checks run (or running) on these frames
 
     def detect_files(self) -> None:
         """
@@ -73,6 +304,9 @@ class Data:
          - Any of the files have conflicting application names.
          - Any of the files have conflicting timestamps.
 
+        (If `self.runTimestamp` is set, files with other timestamps are
+        ignored, rather than conflicting.)
+
         Sets the values for each key in `self.files`, if there were no
         errors. If there were errors, the values in `self.files` are all set to
         None.
@@ -82,7 +316,9 @@ class Data:
 
         The expected files correspond to the items in the module-level
         `portfolio` dictionary, and their meaning is described in the
-        Orchestrator documentation.
+        Orchestrator documentation. Files in the module-level
+        `optionalPortfolio` dictionary are detected in the same way, but may
+        be missing.
         """
 
         # Sanity
@@ -98,115 +334,391 @@ class Data:
         try:
 
             # Check every file against every regex
-            for handle in os.listdir(self.dataDir):
-                for index in portfolio.keys():
-
-                    # The actual work
-                    match = re.fullmatch(portfolio[index], handle)
-
-                    # Only one file should match each type of regex.
-                    if match:
-                        if self.files[index]:
-                            raise RuntimeError(
-                                "Files '{}' and '{}' are both {} "
-                                "files. Ensure only one placement run is in "
-                                "the target directory."
-                                .format(handle, self.files[index], index))
-                        self.files[index] = handle
-                    else:
-                        continue  # We'll be back, probably
-
-                    # If there are two captured groups (the parentheses), the
-                    # first is the appname and the second is the timestamp. If
-                    # there is one group, it is the timestamp. If there are
-                    # more than two groups, something's gone horribly wrong.
-                    groups = match.groups()
-                    if len(groups) > 2:
-                        raise RuntimeError(
-                            "Unknown error when matching expression '{}' to "
-                            "file '{}'. Not really sure what to say to "
-                            "this. There were {} matches."
-                            .format(portfolio[index], handle, len(groups)))
-                    elif len(groups) == 2:
-                        appnameGroup = groups[0]
-                        timestampGroup = groups[1]
-                    else:  # We've already checked zero.
-                        appnameGroup = None
-                        timestampGroup = groups[0]
-
-                    # Are timestamps consistent?
-                    if self.timestamp and timestampGroup != self.timestamp:
-                        raise RuntimeError(
-                            "File '{}' has a different timestamp. Ensure only "
-                            "one placement run is in the target directory."
-                            .format(handle))
-                    self.timestamp = timestampGroup
-
-                    # Are appnames consistent? (not all expressions...)
-                    if (appnameGroup and self.appname and
-                            appnameGroup != self.appname):
-                        raise RuntimeError(
-                            "File '{}' has a different appname. Ensure only "
-                            "one placement run is in the target directory."
-                            .format(handle))
-                        self.appname = appnameGroup
+            for handle in sorted(os.listdir(self.dataDir)):
+                match = match_file(handle)
+                if match is None:
+                    continue  # Not one of ours
+                index, appnameGroup, timestampGroup = match
+
+                # Ignore other runs, if we've been asked for a specific one.
+                if (self.runTimestamp is not None and
+                        timestampGroup != self.runTimestamp):
+                    continue
+
+                # Only one file should match each type of regex.
+                if self.files[index]:
+                    raise RuntimeError(
+                        "Files '{}' and '{}' are both {} "
+                        "files. Ensure only one placement run is in "
+                        "the target directory."
+                        .format(handle, self.files[index], index))
+                self.files[index] = handle
+
+                # Are timestamps consistent?
+                if self.timestamp and timestampGroup != self.timestamp:
+                    raise RuntimeError(
+                        "File '{}' has a different timestamp. Ensure only "
+                        "one placement run is in the target directory."
+                        .format(handle))
+                self.timestamp = timestampGroup
+
+                # Are appnames consistent? (not all expressions...)
+                if (appnameGroup and self.appname and
+                        appnameGroup != self.appname):
+                    raise RuntimeError(
+                        "File '{}' has a different appname. Ensure only "
+                        "one placement run is in the target directory."
+                        .format(handle))
+                if appnameGroup:
+                    self.appname = appnameGroup
 
             # Check that all files were found at least once.
-            if None in self.files.values():
+            missing = [key for key in portfolio.keys()
+                       if self.files[key] is None]
+            if missing:
                 raise RuntimeError(
                     "Files '{}' missing from target directory."
-                    .format(", ".join(
-                        [item[0] for item in filter(lambda x: x[1] is None,
-                                                    self.files.items())])))
+                    .format(", ".join(missing)))
 
         # Reset self.files on error.
         except RuntimeError:
-            self.files = {key: None for key in portfolio.keys()}
+            self.files = dict.fromkeys(self.files.keys())
             raise
 
     def read_files(self):
         """
-        Opens each detected CSV file as a pandas dataframe. Raises a
-        RuntimeError if:
+        Opens each detected CSV file as a pandas dataframe now, rather than
+        when each is first accessed. Raises a RuntimeError if:
 
          - Any files have not been detected yet.
 
-        Sets the values for each key in `self.frames`, if there were no
-        errors. If there were errors, the values in `self.files` are all set to
-        None.
+         - The files don't agree with each other (see `self.validate`), unless
+           this object was constructed with `validate=False`.
+
+        Sets the values for each key in `self.frames` (and `self.addresses`),
+        if there were no errors. If there were errors, all loaded dataframes
+        are forgotten.
 
         Also see `self.detect_files`.
         """
 
         try:
-            # Sanity
-            if None in self.files.values():
-                raise RuntimeError(
-                    "Files '{}' have not been detected. Have you called "
-                    "`detect_files` yet?"
-                    .format(", ".join(
-                        [item[0] for item in filter(lambda x: x[1] is None,
-                                                    self.files.items())])))
-
-            # Load 'em up...
-            for key in self.frames.keys():
-                if key == keyNodeLoadingCore or key == keyNodeLoadingMbox:
-                    continue
-                self.frames[key] = pd.read_csv(
-                    os.path.join(self.dataDir, self.files[key]),
-                    names=headers[key])
-
-            # ...treating node loading separately. Load the dataframe, find the
-            # split, then create two dataframes from that.
-            tmp = pd.read_csv(
-                os.path.join(self.dataDir, self.files[keyNodeLoading]),
-                names=headers[keyNodeLoading])
-            mailboxDataIndex = tmp[tmp.isnull().any(axis=1)].index[1]
-            self.frames[keyNodeLoadingCore] = \
-                tmp[1:mailboxDataIndex].copy().reset_index(drop=True)
-            self.frames[keyNodeLoadingMbox] = \
-                tmp[mailboxDataIndex + 1:].copy().reset_index(drop=True)
+            with self.stats.stage("read_files"):
+                for key in self.frames.keys():
+                    self.frames[key]
+                for key in self.addresses.keys():
+                    self.addresses[key]
 
         except RuntimeError:
-            self.frames = {key: None for key in self.frames.keys()}
+            report = self.validation  # Kept, for its offending rows.
+            self._reset_frames()
+            self.validation = report
+            raise
+
+    def _load_frame(self, key: str) -> pd.DataFrame:
+        """
+        Loads the dataframe for `key` from its source file (see
+        `frameSources`). Other dataframes parsed from the same file are stored
+        in `self.frames` at the same time. Raises a RuntimeError if the source
+        file has not been detected.
+        """
+        sourceKey = frameSources[key]
+        if self.files[sourceKey] is None:
+            raise RuntimeError(
+                "File '{}' has not been detected. Have you called "
+                "`detect_files` yet?".format(sourceKey))
+        out = self._load_source(sourceKey)
+        for otherKey, frame in out.items():
+            if otherKey != key:
+                self.frames[otherKey] = frame
+        return out[key]
+
+    def _frame_loaded(self, key: str) -> None:
+        """
+        Runs the checks (see validation.checkFrames) that were waiting for
+        the dataframe `key`, or for the dataframes loaded along with it, if
+        `self.validateOnLoad` is True. Raises a RuntimeError if any finds a
+        problem.
+        """
+        if not self.validateOnLoad:
+            return
+        from . import validation
+
+        # Checks that have failed before are run again as soon as any of
+        # their dataframes is loaded again, so bad data always raises.
+        ready = [name for name, keys in validation.checkFrames.items()
+                 if name not in self._checked and
+                 (name in self._failed and key in keys or
+                  all(self.frames.is_loaded(other) for other in keys))]
+        if ready:
+            self._check(ready)
+
+    def _check(self, checks: typing.Iterable[str]) -> "validation.Report":
+        """
+        Runs `checks`, loading the dataframes they need, and adds their
+        results to `self.validation`. Raises a RuntimeError if any of them
+        found a problem; if `self.validateOnLoad` is True, the dataframes
+        read by the failed checks are also forgotten, so that they can't be
+        used without raising again.
+
+        Returns `self.validation`.
+        """
+        from . import validation
+
+        # Loading dataframes here shouldn't run the same checks again.
+        self._checked.update(checks)
+        try:
+            for name in checks:
+                for key in validation.checkFrames.get(name, ()):
+                    self.frames[key]
+        except RuntimeError:  # Another check failed; these haven't run.
+            self._checked.difference_update(checks)
             raise
+
+        self.validation = validation.check(self, checks, self.validation)
+        failed = validation.Report(name for name in checks
+                                   if name in self.validation.problems)
+        self._failed.difference_update(checks)
+        if failed.checks:
+            failed.problems = {name: self.validation.problems[name]
+                               for name in failed.checks}
+            if self.validateOnLoad:
+                self._checked.difference_update(failed.checks)
+                self._failed.update(failed.checks)
+                for name in failed.checks:
+                    for key in validation.checkFrames[name]:
+                        self.frames.unload(key)
+                        for column in hardwareColumns.get(key, ()):
+                            self.addresses.unload((key, column))
+                self.histograms = {}  # Anything derived from them, too.
+                self.graphs = {}
+                self._appnodeIndex = None
+            raise RuntimeError("Placement files in '{}' don't agree with "
+                               "each other.\n{}".format(self.dataDir, failed))
+        return self.validation
+
+    def _load_addresses(self, frameAndColumn: typing.Tuple[str, str]) \
+            -> np.ndarray:
+        """
+        Parses the hardware name column `column` of dataframe `key` into
+        packed addresses (see address.py), given a (key, column) tuple.
+        """
+        from . import address
+        key, column = frameAndColumn
+        names = self.frames[key][column]
+        with self.stats.stage("pack {} {}".format(key, column)):
+            return address.pack(names, self.boxes)
+
+    def _load_source(self, sourceKey: str) -> dict:
+        """
+        Returns the dataframes parsed from the file for `sourceKey`, keyed
+        like `self.frames`, using cached dataframes if `self.cacheDir` is set
+        and they are up to date. Column dtypes are as in `dtypes`.
+        """
+        from . import framecache
+        keys = [key for key, source in frameSources.items()
+                if source == sourceKey]
+        path = os.path.join(self.dataDir, self.files[sourceKey])
+
+        # Try the cache first.
+        if self.cacheDir is not None:
+            sourceFingerprint = framecache.fingerprint(path, self.cacheHash)
+            cachePaths = {key: framecache.cache_path(
+                self.cacheDir, path, key) for key in keys}
+            with self.stats.stage("load cached {}".format(sourceKey)):
+                out = {key: framecache.load(cachePaths[key],
+                                            sourceFingerprint)
+                       for key in keys}
+            if all(frame is not None for frame in out.values()):
+                return out
+
+        # Node loading is split into two.
+        with self.stats.stage("parse {}".format(sourceKey)):
+            if sourceKey == keyNodeLoading:
+                out = dict(zip((keyNodeLoadingCore, keyNodeLoadingMbox),
+                               reader.read_node_loading(path,
+                                                        self.csvEngine)))
+            else:
+                out = {sourceKey: reader.read_frame(path, sourceKey,
+                                                    self.csvEngine)}
+
+        if self.cacheDir is not None:
+            try:
+                with self.stats.stage("save cached {}".format(sourceKey)):
+                    for key, frame in out.items():
+                        framecache.save(cachePaths[key], frame,
+                                        sourceFingerprint)
+            except OSError:  # Not being able to cache is not fatal.
+                pass
+        return out
+
+    def load_edge_cache(self, sidecarDir: str=None) -> "EdgeCache":
+        """
+        Loads the mailbox-to-mailbox edge cost cache, if one was detected, into
+        `self.edgeCache`. The first load parses the text file and writes a
+        memory-mapped sidecar (into `sidecarDir`, or next to the cache file by
+        default); later loads just map the sidecar. Raises a RuntimeError if
+        there is no edge cache file.
+
+        Returns the EdgeCache object (see edgecache.py).
+        """
+        if self.edgeCache is None:
+            if self.files[keyEdgeCache] is None:
+                raise RuntimeError("No edge cache file was detected in '{}'."
+                                   .format(self.dataDir))
+            from .edgecache import EdgeCache
+            self.edgeCache = EdgeCache(
+                os.path.join(self.dataDir, self.files[keyEdgeCache]),
+                sidecarDir)
+        return self.edgeCache
+
+    def load_diagnostics(self) -> "metrics.Diagnostics":
+        """
+        Parses the placement diagnostics file into `self.diagnostics`, if it
+        hasn't been parsed already.
+
+        Returns the Diagnostics object (see metrics.py).
+        """
+        if self.diagnostics is None:
+            from .metrics import parse_diagnostics
+            self.diagnostics = parse_diagnostics(
+                os.path.join(self.dataDir, self.files[keyDiagnostic]))
+        return self.diagnostics
+
+    def locate(self, appnodes: typing.Iterable[str]) -> np.ndarray:
+        """
+        Finds where application nodes were placed, using a hash join against
+        the application to hardware mapping (the first mapping wins, for
+        application nodes mapped more than once).
+
+        Returns an array of packed hardware (thread) addresses (see
+        address.py), with -1 for application nodes that aren't mapped.
+        """
+        if self._appnodeIndex is None:
+            mapped = self.frames[keyAppToHw]["appnode"]
+            first = ~mapped.duplicated().to_numpy()
+            self._appnodeIndex = (
+                pd.Index(mapped.to_numpy(dtype=object)[first]),
+                self.addresses[(keyAppToHw, "hwnode")][first])
+        index, hwAddresses = self._appnodeIndex
+        rows = index.get_indexer(np.asarray(appnodes, dtype=object))
+        return np.where(rows >= 0, hwAddresses[rows], -1)
+
+    def validate(self, checks: typing.Iterable[str]=None) \
+            -> "validation.Report":
+        """
+        Checks that the files agree with each other (see validation.py): that
+        both mappings hold the same application nodes on the same threads,
+        that node loading counts the devices mapped to each core and mailbox,
+        and that every edge ends on a node that exists. Dataframes the checks
+        need are read, if they haven't been already. Raises a RuntimeError,
+        listing the offending rows, if:
+
+         - Any check finds a problem.
+
+        Arguments:
+
+         - checks: Names of the checks to run (see validation.checks), or
+               None to run them all.
+
+        Returns the validation.Report, which is also stored in
+        `self.validation` (even if there were problems), along with the
+        results of checks run as the files were read.
+        """
+        from .validation import checks as allChecks
+        return self._check(allChecks if checks is None else tuple(checks))
+
+    def histogram(self, what: str="mailbox",
+                  bins: typing.Union[int, typing.Sequence[float], str]=6,
+                  range: typing.Tuple[float, float]=None) \
+            -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Bins the values of one metric, in one pass with numpy. Results are
+        cached, so asking again (e.g. to draw the same histogram twice) costs
+        nothing. Arguments:
+
+         - what: String, either "mailbox", "core", "hwedge", or "appedge" (see
+               `histogramSources`).
+         - bins, range: As for `numpy.histogram`. If `self.streaming` is
+               True, `bins` can't be a string.
+
+        Returns a tuple of (counts, bin edges), as from `numpy.histogram`.
+        """
+        if what not in histogramSources:
+            raise RuntimeError("Argument 'what' must be either 'mailbox', "
+                               "'core', 'hwedge', or 'appedge'.")
+        cacheKey = (what, tuple(bins) if np.iterable(bins) and
+                    not isinstance(bins, str) else bins,
+                    None if range is None else tuple(range))
+        if cacheKey not in self.histograms:
+            from . import streaming
+            key, column = histogramSources[what]
+            if (self.streaming and key in streaming.streamableKeys and
+                    not self.frames.is_loaded(key)):
+                with self.stats.stage("histogram {}".format(what)):
+                    self.histograms[cacheKey] = streaming.stats(
+                        self, what, bins, range, quantileBins=0).histogram
+                return self.histograms[cacheKey]
+            values = self.frames[key][column].to_numpy(dtype=np.float64)
+            with self.stats.stage("histogram {}".format(what)):
+                self.histograms[cacheKey] = np.histogram(values, bins=bins,
+                                                         range=range)
+        return self.histograms[cacheKey]
+
+    def graph(self, what: str="application") -> "CSRGraph":
+        """
+        Builds (or returns the already-built) graph of the application, from
+        the application edges, or of the hardware, from the mailbox edge
+        loading. Node ids are interned from the names at either end of the
+        edges, and edge ids are row numbers in the dataframe the edges came
+        from. Arguments:
+
+         - what: String, either "application" (weighted by edge cost) or
+               "hardware" (weighted by loading).
+
+        Returns a CSRGraph (see graph.py), whose `addresses` are where each
+        application node is placed (or -1), or the address of each mailbox.
+        """
+        if what not in ("application", "hardware"):
+            raise RuntimeError("Argument 'what' must be either 'application' "
+                               "or 'hardware'.")
+        if what not in self.graphs:
+            key, weightColumn = (keyAppEdgeCosts, "cost") \
+                if what == "application" else (keyHwEdgeLoading, "load")
+            frame = self.frames[key]
+            from .graph import CSRGraph
+            with self.stats.stage("graph {}".format(what)):
+                graph = CSRGraph.from_frame(frame, weightColumn=weightColumn)
+                if what == "application":
+                    graph.addresses = self.locate(graph.names)
+                else:
+                    graph.addresses = np.full(len(graph), -1, dtype=np.int64)
+                    graph.addresses[graph.edgeFrom] = \
+                        self.addresses[(key, "from")]
+                    graph.addresses[graph.edgeTo] = \
+                        self.addresses[(key, "to")]
+            self.graphs[what] = graph
+        return self.graphs[what]
+
+    def rollup(self, level: str="mailbox") -> pd.DataFrame:
+        """
+        Computes the number of application nodes placed on each hardware
+        component at a level of the hardware hierarchy, from the application
+        to hardware mapping. Arguments:
+
+         - level: String, one of "box", "board", "mailbox", "core", or
+               "thread".
+
+        Returns a dataframe with the same columns as the node loading
+        dataframes (`headers[keyNodeLoading]`), indexed by packed address (see
+        address.py). Hardware components with no application nodes placed on
+        them are not included.
+        """
+        from . import address
+        uniques, counts = address.group_sum(
+            self.addresses[(keyAppToHw, "hwnode")], level)
+        return pd.DataFrame(
+            {headers[keyNodeLoading][0]: address.unpack(uniques, self.boxes,
+                                                        level),
+             headers[keyNodeLoading][1]: counts.astype(np.int64)},
+            index=pd.Index(uniques, name="address"))
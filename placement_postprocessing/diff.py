@@ -0,0 +1,130 @@
+# Functions that compare two placement runs of the same application.
+
+from .keys import *  # Sorry
+from .data import Data
+
+import numpy as np
+import pandas as pd
+import typing
+
+
+class RunDiff(typing.NamedTuple):
+    """
+    The differences between two placement runs, A and B. See `diff`.
+    """
+    moves: pd.DataFrame
+    coreLoads: pd.DataFrame
+    mailboxLoads: pd.DataFrame
+    hwEdgeLoads: pd.DataFrame
+    edgeCosts: pd.DataFrame
+
+
+def _intern(columnA: pd.Series, columnB: pd.Series) \
+        -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Interns the values of two columns together, so that equal values in
+    either column get the same integer id.
+
+    Returns a tuple of (ids for A, ids for B, distinct values indexed by id).
+    Missing values get id -1.
+    """
+    codes, uniques = pd.factorize(np.concatenate(
+        (np.asarray(columnA, dtype=object), np.asarray(columnB,
+                                                        dtype=object))))
+    return (codes[:len(columnA)], codes[len(columnA):],
+            np.asarray(uniques, dtype=object))
+
+
+def _outer_join(frameA: pd.DataFrame, frameB: pd.DataFrame,
+                keyColumns: typing.Sequence[str], valueColumn: str) \
+        -> pd.DataFrame:
+    """
+    Joins two dataframes on `keyColumns`, by interning the key columns of both
+    together into one integer key per row, and hash-joining on that.
+
+    Returns a dataframe with the key columns, `valueColumn` from each side (as
+    `<valueColumn>A` and `<valueColumn>B`, NaN where a key is only on one
+    side), and one row per key (or pair of rows, for duplicated keys).
+    """
+    keyA = np.zeros(len(frameA), dtype=np.int64)
+    keyB = np.zeros(len(frameB), dtype=np.int64)
+    names = []
+    for column in keyColumns:
+        idsA, idsB, uniques = _intern(frameA[column], frameB[column])
+        uniques = np.append(uniques, None)  # For missing keys, with id -1.
+        idsA = np.where(idsA < 0, len(uniques) - 1, idsA)
+        idsB = np.where(idsB < 0, len(uniques) - 1, idsB)
+        keyA = keyA * len(uniques) + idsA
+        keyB = keyB * len(uniques) + idsB
+        names.append(uniques)
+
+    left = pd.DataFrame({"key": keyA,
+                         valueColumn + "A": frameA[valueColumn].to_numpy()})
+    right = pd.DataFrame({"key": keyB,
+                          valueColumn + "B": frameB[valueColumn].to_numpy()})
+    joined = left.merge(right, on="key", how="outer", sort=False)
+
+    # Recover key columns from the integer key.
+    key = joined.pop("key").to_numpy()
+    for column, uniques in reversed(list(zip(keyColumns, names))):
+        joined.insert(0, column, uniques[key % len(uniques)])
+        key = key // len(uniques)
+    return joined
+
+
+def _load_change(frameA: pd.DataFrame, frameB: pd.DataFrame,
+                 keyColumns: typing.Sequence[str], valueColumn: str) \
+        -> pd.DataFrame:
+    """
+    As `_outer_join`, but treats values missing from either side as zero and
+    adds a "delta" column (B - A).
+    """
+    out = _outer_join(frameA, frameB, keyColumns, valueColumn)
+    out[valueColumn + "A"] = out[valueColumn + "A"].fillna(0)
+    out[valueColumn + "B"] = out[valueColumn + "B"].fillna(0)
+    out["delta"] = out[valueColumn + "B"] - out[valueColumn + "A"]
+    return out
+
+
+def diff(dataA: Data, dataB: Data) -> RunDiff:
+    """
+    Compares two placement runs of the same application (e.g. placed with
+    different methods). All comparisons are joins on interned integer ids,
+    without any Python-level loops over rows. Arguments:
+
+     - dataA, dataB: placement_processing Data objects.
+
+    Returns a RunDiff holding these dataframes:
+
+     - moves: Application nodes placed on different threads in A and B, with
+           columns "appnode", "hwnodeA" and "hwnodeB" (NaN if the node is
+           not placed in that run).
+     - coreLoads, mailboxLoads: Loading of each core and mailbox, with
+           columns "node", "loadA", "loadB", and "delta" (B - A).
+     - hwEdgeLoads: Loading of each hardware edge, with columns "from",
+           "to", "loadA", "loadB", and "delta".
+     - edgeCosts: Cost of each application edge, with columns "from", "to",
+           "costA", "costB", and "delta" (NaN for edges only in one run).
+    """
+    moves = _outer_join(dataA.frames[keyAppToHw], dataB.frames[keyAppToHw],
+                        ("appnode",), "hwnode")
+    hwA, hwB, _ = _intern(moves["hwnodeA"], moves["hwnodeB"])
+    moves = moves[hwA != hwB].reset_index(drop=True)
+
+    edgeCosts = _outer_join(dataA.frames[keyAppEdgeCosts],
+                            dataB.frames[keyAppEdgeCosts], ("from", "to"),
+                            "cost")
+    edgeCosts["delta"] = edgeCosts["costB"] - edgeCosts["costA"]
+
+    return RunDiff(
+        moves=moves,
+        coreLoads=_load_change(dataA.frames[keyNodeLoadingCore],
+                               dataB.frames[keyNodeLoadingCore], ("node",),
+                               "load"),
+        mailboxLoads=_load_change(dataA.frames[keyNodeLoadingMbox],
+                                  dataB.frames[keyNodeLoadingMbox], ("node",),
+                                  "load"),
+        hwEdgeLoads=_load_change(dataA.frames[keyHwEdgeLoading],
+                                 dataB.frames[keyHwEdgeLoading],
+                                 ("from", "to"), "load"),
+        edgeCosts=edgeCosts)
@@ -0,0 +1,190 @@
+# A class that reads the mailbox-to-mailbox cost cache dumped by the
+# Orchestrator, and keeps it as a dense matrix on disk.
+
+import numpy as np
+import os
+import pandas as pd
+import typing
+
+# Lines that open and close the cost section of the cache file. Anything after
+# the closing line (e.g. the path matrix) is ignored.
+costSectionStart = "Cost cache matrix +"
+costSectionEnd = "Cost cache matrix -"
+
+# Cost of an application edge between two nodes on the same mailbox, which
+# the cache gives as zero.
+onMailboxCost = 0.001
+
+# Extensions appended to the cache file path to form the sidecar paths.
+matrixSuffix = ".npy"
+mailboxesSuffix = ".mailboxes.txt"
+
+
+class EdgeCache:
+    """
+    Mailbox-to-mailbox edge costs, as a dense float32 matrix indexed by
+    mailbox id. Pairs with no cost in the cache file are NaN.
+
+    The matrix is built by streaming through the text cache file once, then
+    persisted as a `.npy` sidecar file (with a second sidecar listing the
+    mailbox for each id), so that later loads memory-map the sidecar without
+    copying or parsing anything.
+    """
+
+    # Dense (mailbox x mailbox) cost matrix, probably memory-mapped.
+    matrix = None
+
+    # Mailbox names, indexed by mailbox id.
+    mailboxes = None
+
+    # pandas Index over `mailboxes`, for name -> id lookups.
+    index = None
+
+    def __init__(self, path: str, sidecarDir: str=None,
+                 chunksize: int=1 << 20) -> None:
+        """
+        Loads the cost cache at `path`. Arguments:
+
+         - path: Path to a placement_edge_cache_<TIMESTAMP>.txt file.
+         - sidecarDir: Directory to write sidecar files into. Defaults to the
+               directory holding `path`. If the sidecar files can't be written,
+               the matrix is kept in memory instead.
+         - chunksize: Number of lines parsed at a time.
+
+        Sidecar files older than the cache file are rebuilt.
+        """
+        sidecarDir = os.path.dirname(path) if sidecarDir is None \
+            else sidecarDir
+        sidecar = os.path.join(sidecarDir, os.path.basename(path))
+        matrixPath = sidecar + matrixSuffix
+        mailboxesPath = sidecar + mailboxesSuffix
+
+        if not (self._sidecar_fresh(path, matrixPath) and
+                self._sidecar_fresh(path, mailboxesPath)):
+            mailboxes, fromIds, toIds, costs = parse(path, chunksize)
+            try:
+                write_sidecars(matrixPath, mailboxesPath, mailboxes, fromIds,
+                               toIds, costs)
+            except OSError:  # Read-only data directory, probably.
+                self.matrix = _dense(len(mailboxes), fromIds, toIds, costs)
+                self._set_mailboxes(mailboxes)
+                return
+
+        self.matrix = np.load(matrixPath, mmap_mode="r")
+        with open(mailboxesPath) as mailboxesFile:
+            self._set_mailboxes(mailboxesFile.read().splitlines())
+
+    @staticmethod
+    def _sidecar_fresh(sourcePath: str, sidecarPath: str) -> bool:
+        return (os.path.exists(sidecarPath) and
+                os.path.getmtime(sidecarPath) >= os.path.getmtime(sourcePath))
+
+    def _set_mailboxes(self, mailboxes: typing.List[str]) -> None:
+        self.mailboxes = np.asarray(mailboxes, dtype=object)
+        self.index = pd.Index(self.mailboxes)
+
+    def __len__(self) -> int:
+        return len(self.mailboxes)
+
+    def ids(self, names: typing.Iterable[str]) -> np.ndarray:
+        """
+        Returns the mailbox ids of an iterable of mailbox names, with -1 for
+        names not in the cache.
+        """
+        return self.index.get_indexer(pd.Index(names, dtype=object))
+
+    def cost(self, fromName: str, toName: str) -> float:
+        """
+        Returns the cost of the edge between two mailboxes, by name. Raises
+        a KeyError if either mailbox is not in the cache.
+        """
+        return float(self.matrix[self.index.get_loc(fromName),
+                                 self.index.get_loc(toName)])
+
+    def costs(self, fromIds: np.ndarray, toIds: np.ndarray) -> np.ndarray:
+        """
+        Returns the costs of the edges between arrays of mailbox ids (see
+        `ids`), as a float32 array.
+        """
+        return self.matrix[np.asarray(fromIds), np.asarray(toIds)]
+
+
+def parse(path: str, chunksize: int=1 << 20) \
+        -> typing.Tuple[typing.List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Streams through the cost section of the cache file at `path`,
+    `chunksize` lines at a time. Raises a RuntimeError if the file does not
+    start with a cost section.
+
+    Returns a tuple of (mailbox names, indexed by id; from ids; to ids;
+    costs), one entry per line in the cost section for the last three.
+    """
+    with open(path) as cacheFile:
+        if not cacheFile.readline().startswith(costSectionStart):
+            raise RuntimeError("File '{}' does not start with a cost cache "
+                               "matrix.".format(path))
+
+        # Lines look like "<FROM> -> <TO> = <COST>".
+        reader = pd.read_csv(cacheFile, sep=" ", header=None,
+                             names=("from", "arrow", "to", "equals", "cost"),
+                             usecols=("from", "to", "cost"), dtype=str,
+                             chunksize=chunksize)
+
+        ids = {}
+        fromIds = []
+        toIds = []
+        costs = []
+        for chunk in reader:
+
+            # The line closing the cost section has fewer fields than a
+            # cost line, so it has no cost.
+            end = np.flatnonzero(chunk["cost"].isna().to_numpy())
+            if len(end):
+                chunk = chunk.iloc[:end[0]]
+
+            for name in pd.unique(chunk[["from", "to"]].to_numpy().ravel()):
+                if name not in ids:
+                    ids[name] = len(ids)
+            fromIds.append(chunk["from"].map(ids).to_numpy(dtype=np.int32))
+            toIds.append(chunk["to"].map(ids).to_numpy(dtype=np.int32))
+            costs.append(chunk["cost"].to_numpy(dtype=np.float32))
+
+            if len(end):
+                break
+
+    return (list(ids.keys()),
+            np.concatenate(fromIds) if fromIds else np.empty(0, np.int32),
+            np.concatenate(toIds) if toIds else np.empty(0, np.int32),
+            np.concatenate(costs) if costs else np.empty(0, np.float32))
+
+
+def _dense(size: int, fromIds: np.ndarray, toIds: np.ndarray,
+           costs: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+    if out is None:
+        out = np.empty((size, size), dtype=np.float32)
+    out[:] = np.nan
+    out[fromIds, toIds] = costs
+    return out
+
+
+def write_sidecars(matrixPath: str, mailboxesPath: str,
+                   mailboxes: typing.List[str], fromIds: np.ndarray,
+                   toIds: np.ndarray, costs: np.ndarray) -> None:
+    """
+    Writes the dense cost matrix and mailbox names (as from `parse`) to
+    sidecar files, filling the matrix in place on disk. Files are written
+    under temporary names then moved into place, so readers never see a
+    half-written sidecar.
+    """
+    tmpMatrixPath = matrixPath + ".tmp"
+    tmpMailboxesPath = mailboxesPath + ".tmp"
+    matrix = np.lib.format.open_memmap(tmpMatrixPath, mode="w+",
+                                       dtype=np.float32,
+                                       shape=(len(mailboxes), len(mailboxes)))
+    _dense(len(mailboxes), fromIds, toIds, costs, out=matrix)
+    matrix.flush()
+    del matrix
+    with open(tmpMailboxesPath, "w") as mailboxesFile:
+        mailboxesFile.write("".join(name + "\n" for name in mailboxes))
+    os.replace(tmpMailboxesPath, mailboxesPath)
+    os.replace(tmpMatrixPath, matrixPath)
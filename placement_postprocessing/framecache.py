@@ -0,0 +1,109 @@
+# Functions that keep parsed dataframes on disk in a compact binary form, so
+# that reopening a placement run doesn't mean parsing its CSVs again.
+
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+
+# Extension for cache files.
+cacheSuffix = ".npz"
+
+# Bytes read at a time when hashing source files.
+hashBlockSize = 1 << 20
+
+
+def fingerprint(path: str, contentHash: bool=False) -> str:
+    """
+    Computes a fingerprint for the file at `path`, from its size and
+    modification time, and (if `contentHash` is True) a hash of its contents,
+    for filesystems with unreliable modification times.
+    """
+    status = os.stat(path)
+    out = "{}:{}".format(status.st_size, status.st_mtime_ns)
+    if contentHash:
+        digest = hashlib.sha1()
+        with open(path, "rb") as sourceFile:
+            for block in iter(lambda: sourceFile.read(hashBlockSize), b""):
+                digest.update(block)
+        out += ":" + digest.hexdigest()
+    return out
+
+
+def cache_path(cacheDir: str, sourcePath: str, key: str) -> str:
+    """
+    Returns the path of the cache file for the dataframe `key`, parsed from
+    the source file at `sourcePath`. The name holds a hash of the source's
+    absolute path, because some source files (e.g. the node loading) are
+    named only by their timestamp, so runs from different directories can
+    share a cache directory without sharing cache files.
+    """
+    sourceHash = hashlib.sha1(os.fsencode(os.path.abspath(sourcePath)))
+    return os.path.join(cacheDir, "{}.{}.{}{}".format(
+        os.path.basename(sourcePath), sourceHash.hexdigest()[:16],
+        key.replace(" ", "_"), cacheSuffix))
+
+
+def save(path: str, frame: pd.DataFrame, sourceFingerprint: str) -> None:
+    """
+    Writes `frame` to a cache file at `path`, tagged with the fingerprint of
+    its source file. Numeric columns are stored as they are; string and
+    categorical columns are stored as integer codes and their categories. The
+    file is written under a temporary name and moved into place, so readers
+    never see a half-written cache.
+    """
+    arrays = {"fingerprint": np.asarray(sourceFingerprint),
+              "columns": np.asarray(frame.columns, dtype=str)}
+    kinds = []
+    for index, column in enumerate(frame.columns):
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            kinds.append("category")
+            codes = series.cat.codes.to_numpy()
+            categories = series.cat.categories
+        elif series.dtype.kind in "biuf":
+            kinds.append("numeric")
+            arrays["values{}".format(index)] = series.to_numpy()
+            continue
+        else:
+            kinds.append("string")
+            codes, categories = pd.factorize(series)
+        arrays["codes{}".format(index)] = codes
+        arrays["categories{}".format(index)] = np.asarray(categories,
+                                                          dtype=str)
+    arrays["kinds"] = np.asarray(kinds, dtype=str)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmpPath = path + ".tmp" + cacheSuffix
+    np.savez(tmpPath, **arrays)
+    os.replace(tmpPath, path)
+
+
+def load(path: str, sourceFingerprint: str) -> pd.DataFrame:
+    """
+    Reads a dataframe written by `save` from `path`. Returns None if there is
+    no cache file at `path`, if it can't be read, or if it was written from a
+    source file with a different fingerprint.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            if str(arrays["fingerprint"]) != sourceFingerprint:
+                return None
+            columns = {}
+            for index, (column, kind) in enumerate(
+                    zip(arrays["columns"].tolist(), arrays["kinds"].tolist())):
+                if kind == "numeric":
+                    columns[column] = arrays["values{}".format(index)]
+                    continue
+                codes = arrays["codes{}".format(index)]
+                categories = arrays["categories{}".format(index)]
+                if kind == "category":
+                    columns[column] = pd.Categorical.from_codes(
+                        codes, categories.astype(object))
+                else:
+                    values = categories.astype(object)[codes]
+                    values[codes < 0] = None
+                    columns[column] = pd.Series(values)
+            return pd.DataFrame(columns)
+    except (OSError, KeyError, ValueError):
+        return None
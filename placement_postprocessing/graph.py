@@ -0,0 +1,220 @@
+# A class that holds a graph as compressed sparse rows (CSR) over interned
+# integer node ids, so that neighbour, degree and cut queries only touch the
+# edges they're about, rather than filtering whole dataframes.
+
+import numpy as np
+import pandas as pd
+import typing
+
+# Directions of edges, relative to the nodes being asked about.
+directions = ("out", "in", "both")
+
+
+def intern(*columns: pd.Series) -> typing.Tuple[typing.List[np.ndarray],
+                                                np.ndarray]:
+    """
+    Interns the values of some columns together, so that equal values in
+    any column get the same integer id. Categorical columns (see
+    keys.dtypes) are interned through their categories, so each distinct
+    value is only hashed once.
+
+    Returns a tuple of (a list of id arrays, one per column, with -1 for
+    missing values; distinct values indexed by id), where ids are in order
+    of first appearance in the categories.
+    """
+    categoricals = [column.astype("category") for column in columns]
+    names = pd.Index(np.concatenate(
+        [np.asarray(column.cat.categories, dtype=object)
+         for column in categoricals])).unique()
+    ids = []
+    for column in categoricals:
+        # Missing values have code -1, so look up -1 for them.
+        lookup = np.append(names.get_indexer(column.cat.categories), -1)
+        ids.append(lookup[column.cat.codes.to_numpy()])
+    return ids, np.asarray(names, dtype=object)
+
+
+def _gather(indptr: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Returns the positions of every entry in `rows` of a CSR structure with
+    offsets `indptr`, row by row, without a Python-level loop.
+    """
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total)
+
+
+class CSRGraph:
+    """
+    A directed graph, whose nodes are interned to integer ids (0 to N-1), and
+    whose edges are the rows of some dataframe (the edge ids). Out- and
+    in-edges of each node are held as compressed sparse rows: the
+    neighbours of node `n` are `indices[indptr[n]:indptr[n + 1]]`.
+
+    Nodes can be given to queries as ids, names, boolean masks over all
+    nodes, or sequences of any of those.
+    """
+
+    # Node names, indexed by id.
+    names = None
+
+    # Packed hardware addresses (see address.py) for each node, if known
+    # (for hardware nodes, their own address; for application nodes, where
+    # they're placed, or -1), or None.
+    addresses = None
+
+    # Ends of each edge, as node ids, in the order of the rows they came
+    # from.
+    edgeFrom = None
+    edgeTo = None
+
+    # Weight of each edge (e.g. cost, or loading), in the same order.
+    weights = None
+
+    def __init__(self, edgeFrom: np.ndarray, edgeTo: np.ndarray,
+                 names: np.ndarray, weights: np.ndarray=None) -> None:
+        """
+        Constructs a graph from the ends of each edge (as ids into `names`),
+        and optionally a weight for each edge (which defaults to one). Edges
+        with an end of -1 are ignored.
+        """
+        self.names = np.asarray(names, dtype=object)
+        self.edgeFrom = np.asarray(edgeFrom, dtype=np.int64)
+        self.edgeTo = np.asarray(edgeTo, dtype=np.int64)
+        self.weights = np.ones(len(self.edgeFrom)) if weights is None \
+            else np.asarray(weights, dtype=np.float64)
+        self._index = None
+        self._csr = {}
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, fromColumn: str="from",
+                   toColumn: str="to", weightColumn: str=None) \
+            -> "CSRGraph":
+        """
+        Constructs a graph from a dataframe with one row per edge, interning
+        node names from the `fromColumn` and `toColumn` columns together (see
+        `intern`). Edge ids are row numbers in the dataframe.
+        """
+        (edgeFrom, edgeTo), names = intern(frame[fromColumn],
+                                           frame[toColumn])
+        return cls(edgeFrom, edgeTo, names,
+                   None if weightColumn is None
+                   else frame[weightColumn].to_numpy(dtype=np.float64))
+
+    def __len__(self) -> int:
+        """Returns the number of nodes."""
+        return len(self.names)
+
+    @property
+    def edgeCount(self) -> int:
+        return len(self.edgeFrom)
+
+    def _structure(self, direction: str) \
+            -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns (and caches) the CSR structure for edges leaving ("out") or
+        entering ("in") each node, as a tuple of (offsets, neighbour ids,
+        edge ids).
+        """
+        if direction not in self._csr:
+            if direction == "out":
+                rows, columns = self.edgeFrom, self.edgeTo
+            else:
+                rows, columns = self.edgeTo, self.edgeFrom
+            valid = np.flatnonzero((rows >= 0) & (columns >= 0))
+            edges = valid[np.argsort(rows[valid], kind="stable")]
+            indptr = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows[edges], minlength=len(self)),
+                      out=indptr[1:])
+            self._csr[direction] = (indptr, columns[edges], edges)
+        return self._csr[direction]
+
+    def ids(self, nodes) -> np.ndarray:
+        """
+        Returns the ids of `nodes` (see the class documentation) as an array.
+        Raises a KeyError if any named node is not in the graph.
+        """
+        if isinstance(nodes, (str, int, np.integer)):
+            nodes = [nodes]
+        nodes = np.asarray(nodes)
+        if nodes.dtype == bool:
+            if len(nodes) != len(self):
+                raise ValueError("Node mask has {} entries, but the graph "
+                                 "has {} nodes.".format(len(nodes),
+                                                        len(self)))
+            return np.flatnonzero(nodes)
+        if nodes.dtype.kind in "iu":
+            return nodes.astype(np.int64)
+        if self._index is None:
+            self._index = pd.Index(self.names)
+        out = self._index.get_indexer(nodes.astype(object))
+        if (out < 0).any():
+            raise KeyError(nodes[np.flatnonzero(out < 0)[0]])
+        return out
+
+    def _structures(self, direction: str) \
+            -> typing.List[typing.Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Returns the CSR structures (see `_structure`) for `direction`: one of
+        them, or both for "both".
+        """
+        if direction not in directions:
+            raise ValueError("Argument 'direction' must be either 'out', "
+                             "'in', or 'both'.")
+        return [self._structure(each) for each in
+                (("out", "in") if direction == "both" else (direction,))]
+
+    def neighbours(self, nodes, direction: str="out") -> np.ndarray:
+        """
+        Returns the ids of the distinct nodes at the other end of edges
+        leaving (or entering, or both) `nodes`, sorted.
+        """
+        rows = self.ids(nodes)
+        return np.unique(np.concatenate(
+            [indices[_gather(indptr, rows)]
+             for indptr, indices, _ in self._structures(direction)]))
+
+    def edges(self, nodes, direction: str="both") -> np.ndarray:
+        """
+        Returns the ids (row numbers) of the distinct edges leaving (or
+        entering, or both) `nodes`, sorted.
+        """
+        rows = self.ids(nodes)
+        return np.unique(np.concatenate(
+            [edges[_gather(indptr, rows)]
+             for indptr, _, edges in self._structures(direction)]))
+
+    def degree(self, nodes=None, direction: str="out") -> np.ndarray:
+        """
+        Returns the number of edges leaving (or entering, or both) each of
+        `nodes`, or every node if `nodes` is None.
+        """
+        out = sum(np.diff(indptr)
+                  for indptr, _, _ in self._structures(direction))
+        return out if nodes is None else out[self.ids(nodes)]
+
+    def cut(self, nodesA, nodesB=None, weighted: bool=False) -> float:
+        """
+        Returns the number (or total weight, if `weighted`) of edges between
+        two sets of nodes, in either direction. If `nodesB` is None, it is
+        every node not in `nodesA`. The two sets should not overlap.
+        """
+        rowsA = np.unique(self.ids(nodesA))
+        if nodesB is None:  # Edges to anything outside A.
+            rowsB, inside = rowsA, False
+        else:
+            rowsB, inside = np.unique(self.ids(nodesB)), True
+
+        total = 0
+        for direction in ("out", "in"):
+            indptr, indices, edges = self._structure(direction)
+            positions = _gather(indptr, rowsA)
+            crossing = edges[positions[
+                np.isin(indices[positions], rowsB) == inside]]
+            total += self.weights[crossing].sum() if weighted \
+                else len(crossing)
+        return float(total) if weighted else int(total)
@@ -0,0 +1,184 @@
+# A class that times (and measures the memory used by) each stage of loading
+# and drawing, when it's switched on. Switched off, stages cost next to
+# nothing.
+
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+import typing
+
+import pandas as pd
+
+# Environment variable that switches stats on (if it's set to anything other
+# than "", "0", or "false") for objects that aren't told either way.
+envVariable = "PLACEMENT_POSTPROCESSING_STATS"
+
+# Separates the names of nested stages.
+stageSeparator = "/"
+
+# What a stage does when stats are off. Reusable, so nothing is allocated.
+_noStage = contextlib.nullcontext()
+
+
+def enabled_by_environment() -> bool:
+    """
+    Returns whether `envVariable` asks for stats to be collected.
+    """
+    return os.environ.get(envVariable, "").strip().lower() not in \
+        ("", "0", "false")
+
+
+class StageStats(typing.NamedTuple):
+    """
+    Totals for one stage. See `Stats`.
+    """
+    calls: int
+    seconds: float
+    peakBytes: int  # Largest over all calls, or None if not measured.
+
+
+class Stats:
+    """
+    Wall-clock times and peak memory allocations (through tracemalloc) for
+    named stages of work, which may be nested. Use like:
+
+        with stats.stage("read_files"):
+            ...
+
+    Nested stages are named after their parents, like
+    "read_files/parse hardware node loading". Each call is recorded, and
+    totals are available by stage name (`stats["read_files"]`), as a
+    dataframe (`stats.to_frame()`), or as JSON (`stats.to_json()`).
+    """
+
+    # Whether stages are timed at all.
+    enabled = False
+
+    # Whether peak memory is measured too (which slows down everything
+    # measured, while it's being measured).
+    traceMemory = True
+
+    # One (stage name, seconds, peak bytes) tuple per call, in the order
+    # they finished.
+    records = None
+
+    def __init__(self, enabled: bool=None, traceMemory: bool=True) -> None:
+        """
+        Constructs an empty set of stats. If `enabled` is None, stats are
+        collected if the environment variable `envVariable` says so.
+        """
+        self.enabled = enabled_by_environment() if enabled is None \
+            else enabled
+        self.traceMemory = traceMemory
+        self.records = []
+        self._stack = []  # [name, memory at start, peak so far] per stage
+        self._startedTracing = False
+
+    def stage(self, name: str) -> typing.ContextManager:
+        """
+        Returns a context manager that records the time (and peak memory)
+        taken by the code it wraps, as stage `name` within any enclosing
+        stages. Does nothing if stats are off.
+        """
+        if not self.enabled:
+            return _noStage
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name: str) -> typing.Iterator[None]:
+        tracing = self.traceMemory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._startedTracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            # Enclosing stages keep the peak so far, so that we can reset it
+            # for this stage.
+            for frame in self._stack:
+                frame[2] = max(frame[2], peak)
+            if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                tracemalloc.reset_peak()
+                peak = current
+            self._stack.append([name, current, peak])
+        else:
+            self._stack.append([name, None, None])
+        fullName = stageSeparator.join(frame[0] for frame in self._stack)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            frame = self._stack.pop()
+            peakBytes = None
+            if tracing and tracemalloc.is_tracing():
+                peak = max(frame[2], tracemalloc.get_traced_memory()[1])
+                peakBytes = peak - frame[1]
+                if self._stack:
+                    self._stack[-1][2] = max(self._stack[-1][2], peak)
+            if not self._stack and self._startedTracing:
+                tracemalloc.stop()
+                self._startedTracing = False
+            self.records.append((fullName, seconds, peakBytes))
+
+    def names(self) -> typing.List[str]:
+        """
+        Returns the names of every recorded stage, in the order they first
+        finished.
+        """
+        return list(dict.fromkeys(record[0] for record in self.records))
+
+    def __getitem__(self, name: str) -> StageStats:
+        """
+        Returns the totals for stage `name`. Raises a KeyError if it was never
+        recorded.
+        """
+        matches = [record for record in self.records if record[0] == name]
+        if not matches:
+            raise KeyError(name)
+        peaks = [record[2] for record in matches if record[2] is not None]
+        return StageStats(calls=len(matches),
+                          seconds=sum(record[1] for record in matches),
+                          peakBytes=max(peaks) if peaks else None)
+
+    def __contains__(self, name: str) -> bool:
+        return any(record[0] == name for record in self.records)
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def reset(self) -> None:
+        """
+        Forgets everything recorded so far.
+        """
+        self.records = []
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the totals for every stage, as a dataframe indexed by stage
+        name, with the columns of StageStats.
+        """
+        names = self.names()
+        return pd.DataFrame([self[name] for name in names],
+                            index=pd.Index(names, name="stage"),
+                            columns=StageStats._fields)
+
+    def to_dict(self) -> typing.Dict[str, dict]:
+        """
+        Returns the totals for every stage, as a JSON-able dictionary keyed by
+        stage name.
+        """
+        return {name: self[name]._asdict() for name in self.names()}
+
+    def to_json(self, path: str=None) -> str:
+        """
+        Returns the totals for every stage as a JSON string (see `to_dict`),
+        also writing it to `path` if it's given.
+        """
+        out = json.dumps(self.to_dict(), indent=4)
+        if path is not None:
+            with open(path, "w") as jsonFile:
+                jsonFile.write(out)
+        return out
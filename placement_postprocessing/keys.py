@@ -3,6 +3,7 @@
 keyAppEdgeCosts = "application edge costs"
 keyAppToHw = "application to hardware mapping"
 keyDiagnostic = "placement diagnostics"
+keyEdgeCache = "edge cost cache"
 keyHwEdgeLoading = "hardware edge loading"
 keyHwToApp = "hardware to application mapping"
 keyNodeLoading = "hardware node loading"
@@ -15,3 +16,20 @@ headers = {keyAppEdgeCosts: ("from", "to", "cost"),
            keyHwEdgeLoading: ("from", "to", "load"),
            keyHwToApp: ("hwnode", "appnode"),
            keyNodeLoading: ("node", "load")}
+
+# Compact dtypes for the columns of each CSV file, so that pandas doesn't have
+# to infer them. Names are interned as categoricals.
+dtypes = {keyAppEdgeCosts: {"from": "category", "to": "category",
+                            "cost": "float32"},
+          keyAppToHw: {"appnode": "category", "hwnode": "category"},
+          keyHwEdgeLoading: {"from": "category", "to": "category",
+                             "load": "int32"},
+          keyHwToApp: {"hwnode": "category", "appnode": "category"},
+          keyNodeLoading: {"node": "category", "load": "int32"}}
+
+# Columns holding hardware names, for each dataframe.
+hardwareColumns = {keyAppToHw: ("hwnode",),
+                   keyHwEdgeLoading: ("from", "to"),
+                   keyHwToApp: ("hwnode",),
+                   keyNodeLoadingCore: ("node",),
+                   keyNodeLoadingMbox: ("node",)}
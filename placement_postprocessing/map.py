@@ -2,13 +2,99 @@
 
 from .keys import *  # Still sorry, but not enough to learn from my ways.
 from .data import Data
+from .diff import RunDiff
+from . import address
 
-import graphviz as gv
 import numpy as np
 import os
+import pandas as pd
 import typing
 
 
+# Constants for positioning mailboxes. Mailboxes exist in a 4x4 grid on each
+# board, and boards exist in a 3x2 grid in each box.
+boardSpacing = 4
+boxSpacingX = 3
+boxSpacingY = 2
+
+# Levels of the hardware hierarchy that maps can be drawn in tiles of (see
+# `draw_tiled_map`).
+tileLevels = ("box", "board")
+
+# Base co-ordinates for each box (in units of boxes), given its name.
+boxPositions = {"LoneBox": (0, 0),
+                "Ay": (0, 0),
+                "By": (0, 0),
+                "Co": (1, 0),
+                "De": (0, 1),
+                "El": (1, 1),
+                "Fi": (0, 2),
+                "Go": (1, 2),
+                "He": (0, 3),
+                "Ib": (1, 3)}
+
+
+def node_positions_from_addresses(
+        addresses: np.ndarray, boxes: typing.List[str],
+        boxPositions: typing.Dict[str, typing.Tuple[int, int]]=boxPositions) \
+        -> np.ndarray:
+    """
+    Vectorised version of `node_position_from_name`, operating on packed
+    hardware addresses (see address.py). Arguments:
+
+     - addresses: Array of packed addresses, as in `Data.addresses`. Only the
+           box, board and mailbox components are used.
+     - boxes: The box interning table the addresses were packed with, as in
+           `Data.boxes`.
+     - boxPositions: Dictionary mapping box names (<BOX>, not the whole
+           prefix) to their base co-ordinates, in units of boxes. Defaults to
+           the module-level `boxPositions`.
+
+    Returns an (N,2) integer array of co-ordinates, in units of mailboxes, so
+    each box covers boxSpacingX by boxSpacingY boards of boardSpacing by
+    boardSpacing mailboxes. Rows for addresses that cannot be positioned are
+    (-1, -1).
+    """
+
+    # Base co-ordinates for each interned box, or -1 if we don't know where
+    # the box goes (or the prefix doesn't look like O_.<ROOT>.<EXT>.<BOX>).
+    boxTable = np.full((len(boxes) + 1, 2), -1, dtype=np.int64)
+    for index, prefix in enumerate(boxes):
+        splitPrefix = prefix.split(".")
+        if len(splitPrefix) == 4 and splitPrefix[-1] in boxPositions:
+            boxTable[index] = boxPositions[splitPrefix[-1]]
+
+    addresses = np.asarray(addresses, dtype=np.int64)
+    valid = addresses >= 0
+    boxIndex = np.where(valid, address.field(addresses, "box"), len(boxes))
+    base = boxTable[boxIndex]
+    valid &= base[:, 0] >= 0
+
+    out = np.empty((len(addresses), 2), dtype=np.int64)
+    out[:, 0] = ((base[:, 0] * boxSpacingX +
+                  address.field(addresses, "boardX")) * boardSpacing +
+                 address.field(addresses, "mailboxX"))
+    out[:, 1] = ((base[:, 1] * boxSpacingY +
+                  address.field(addresses, "boardY")) * boardSpacing +
+                 address.field(addresses, "mailboxY"))
+    out[~valid] = -1
+    return out
+
+
+def node_positions_from_names(
+        names: typing.Iterable[str],
+        boxPositions: typing.Dict[str, typing.Tuple[int, int]]=boxPositions) \
+        -> np.ndarray:
+    """
+    Vectorised version of `node_position_from_name`, operating on a whole
+    column (Series, array, or list) of mailbox names at once. See
+    `node_positions_from_addresses` for arguments and return value.
+    """
+    boxes = []
+    return node_positions_from_addresses(address.pack(names, boxes), boxes,
+                                         boxPositions)
+
+
 def node_position_from_name(name: str) -> typing.Tuple[int, int]:
     """
     Given a node (mailbox) name, infer its positional co-ordinate in the
@@ -34,76 +120,44 @@ def node_position_from_name(name: str) -> typing.Tuple[int, int]:
         positional co-ordinates for the mailbox. Here, <X> and <Y> must both be
         in [0,3].
 
+      - <BOX> is a key of the module-level `boxPositions` dictionary.
+
     Mailboxes are assumed to exist in a 4x4 grid, and boards are assumed to
     exist in a 2x3 grid.
 
     Returns the co-ordinate, with both components zero or positive, as a tuple
     if it can be understood. If not, returns (-1, -1) and prints a message.
+
+    If you have more than one name to position, use
+    `node_positions_from_names`, which is much faster.
     """
 
-    out = (-1, -1)  # Error output.
-    errMsg = ("Not sure how to decode name '{}'. Not positioning any nodes "
+    # Verify node length input (no cores or threads).
+    out = (-1, -1)
+    if len(name.split(".")) == 6:
+        out = tuple(int(component) for component in
+                    node_positions_from_names([name])[0])
+    if out[0] == -1:
+        print("Not sure how to decode name '{}'. Not positioning any nodes "
               "explicitly.".format(name))
-
-    # Constants
-    boardSpacing = 4
-    boxSpacingX = 3
-    boxSpacingY = 2
-
-    # Verify node length input.
-    splitName = name.split(".")
-    if len(splitName) != 6:
-        print(errMsg)
-        return out
-
-    # Grab components
-    try:
-        box, board, mbox = splitName[3:]
-        mx = int(mbox[1])
-        my = int(mbox[2])
-        bx = int(board[1])
-        by = int(board[2])
-    except ValueError:
-        print(errMsg)
-        return out
-
-    # See if we can determine base co-ordinates for the box, given its
-    # name. If we can't, just don't try.
-    boxPositions = {"LoneBox": (0, 0),
-                    "Ay": (0, 0),
-                    "By": (0, 0),
-                    "Co": (1, 0),
-                    "De": (0, 1),
-                    "El": (1, 1),
-                    "Fi": (0, 2),
-                    "Go": (1, 2),
-                    "He": (0, 3),
-                    "Ib": (1, 3)}
-    if box not in boxPositions.keys():
-        print(errMsg)
-        return out
-
-    # gogogo!
-    return (boxPositions[box][0] * boxSpacingX +
-            bx * boardSpacing +
-            mx,
-            boxPositions[box][1] * boxSpacingY +
-            by * boardSpacing +
-            my)
-
+    return out
 
 
 def draw_map(data: Data, cleanup: bool=True, drawHwEdges: bool=False,
              maxNodeHLoad: float=np.inf,
-             maxEdgeHLoad: float=np.inf, outPath: str="" ) -> None:
+             maxEdgeHLoad: float=np.inf, outPath: str="",
+             backend: str="graphviz", topK: int=None,
+             minCount: int=1) -> None:
     """
     Draws a map showing device placement on a hardware graph using
-    graphviz, where:
+    graphviz (or matplotlib), where:
 
      - Hardware nodes (mailboxes) are colored more strongly the more
        heavily-loaded they are.
      - Edges in the application graph are drawn if they do not directly overlay
-       with a single edge in the hardware model.
+       with a single edge in the hardware model. Application edges between the
+       same pair of mailboxes are drawn as one edge, which is thicker and more
+       opaque the more application edges it stands for.
      - Edges in the hardware graph are thicker if they are more heavily loaded
        with application edges.
 
@@ -111,15 +165,26 @@ def draw_map(data: Data, cleanup: bool=True, drawHwEdges: bool=False,
 
      - data: A placement_processing Data object with loaded data.
      - cleanup: If False, leaves a source file describing the graph. Useful
-           for debugging.
+           for debugging. Ignored by the matplotlib backend.
      - drawHwEdges: If True, draws hardware edges that are used in black.
      - maxNodeHLoad: If not default, forces a maximum node loading on the
            map. If infinite (default), impose no maximum.
      - maxEdgeHLoad: As above, but for edges.
      - outPath: Path (absolute or relative) to write the map
            to. Extension determines the type of file written.
-
-    Returns nothing, but writes the graph to `outPath`.
+     - backend: String, either "graphviz", "matplotlib", or "auto". The
+           graphviz backend lays the map out with neato. The matplotlib
+           backend draws mailboxes and edges directly, which is much faster
+           for large maps, but needs every mailbox to have an explicit
+           position (see `node_position_from_name`). "auto" uses matplotlib
+           if it can, and graphviz otherwise.
+     - topK: If set, only draws the `topK` pairs of mailboxes with the most
+           application edges between them.
+     - minCount: Only draws pairs of mailboxes with at least `minCount`
+           application edges between them.
+
+    Returns nothing, but writes the graph to `outPath`. Raises a RuntimeError
+    if the matplotlib backend is chosen but mailboxes can't be positioned.
     """
 
     # A little bit of sanity. We'll refer to these headers by name because
@@ -132,50 +197,167 @@ def draw_map(data: Data, cleanup: bool=True, drawHwEdges: bool=False,
     assert headers[keyHwEdgeLoading][2] == "load"
     assert headers[keyAppToHw][0] == "appnode"
     assert headers[keyAppToHw][1] == "hwnode"
+    assert headers[keyAppEdgeCosts][0] == "from"
+    assert headers[keyAppEdgeCosts][1] == "to"
+    if backend not in ("graphviz", "matplotlib", "auto"):
+        raise ValueError("Argument 'backend' must be either 'graphviz', "
+                         "'matplotlib', or 'auto'.")
 
     # Compute positional data for mailboxes, if known a priori.
-    explicitPositions = True
-    positions = {}
-    for _, record in data.frames[keyNodeLoadingMbox].iterrows():  # Sorry purists
-        nodePos = node_position_from_name(record["node"])
-        if (nodePos[0] == -1):
-            explicitPositions = False
-            break
-        positions[record["node"]] = "{},{}!".format(*nodePos)
-
-    # Derive colors from hardware node loading, respecting `maxNodeHLoad` if
-    # it's set. We do this not by changing the colour, but by adding two
-    # hexidecimal places of alpha information.
+    mailboxes = data.frames[keyNodeLoadingMbox]["node"]
+    mailboxAddresses = data.addresses[(keyNodeLoadingMbox, "node")]
+    with data.stats.stage("map positions"):
+        nodePositions = node_positions_from_addresses(mailboxAddresses,
+                                                      data.boxes)
+    unpositioned = np.flatnonzero(nodePositions[:, 0] == -1)
+    explicitPositions = len(unpositioned) == 0
+    if not explicitPositions:
+        if backend == "matplotlib":
+            raise RuntimeError(
+                "Not sure how to decode name '{}', so can't draw this map "
+                "with the matplotlib backend."
+                .format(mailboxes.iloc[unpositioned[0]]))
+        print("Not sure how to decode name '{}'. Not positioning any nodes "
+              "explicitly.".format(mailboxes.iloc[unpositioned[0]]))
+    if backend == "auto":
+        backend = "matplotlib" if explicitPositions else "graphviz"
+
+    nodeLoads, edgeThicknesses = _loading_styles(data, maxNodeHLoad,
+                                                 maxEdgeHLoad)
+
+    # Compute application node edges, aggregated by pair of mailboxes, keeping
+    # only the ones we've been asked for.
+    with data.stats.stage("map crossing edges"):
+        extraEdges = crossing_edge_counts(data)
+        extraEdges = extraEdges[extraEdges["count"] >= minCount]
+        if topK is not None:
+            extraEdges = extraEdges.iloc[np.sort(np.argsort(
+                -extraEdges["count"].to_numpy(), kind="stable")[:topK])]
+
+    with data.stats.stage("map draw"):
+        if backend == "graphviz":
+            _draw_map_graphviz(data, mailboxes,
+                               nodePositions if explicitPositions else None,
+                               nodeLoads,
+                               edgeThicknesses if drawHwEdges else None,
+                               extraEdges, outPath, cleanup)
+        else:
+            _draw_map_matplotlib(data, mailboxes, nodePositions, nodeLoads,
+                                 edgeThicknesses if drawHwEdges else None,
+                                 extraEdges, outPath)
+
+
+def _loading_styles(data: Data, maxNodeHLoad: float=np.inf,
+                    maxEdgeHLoad: float=np.inf) \
+        -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns a tuple of (loading fraction of each mailbox, thickness of each
+    hardware edge), respecting `maxNodeHLoad` and `maxEdgeHLoad` if they're
+    set. See `draw_map`.
+    """
+    # Derive node loading fractions, respecting `maxNodeHLoad` if it's set.
     maxNodeLoad = data.frames[keyNodeLoadingMbox]["load"].max() \
         if maxNodeHLoad == np.inf else maxNodeHLoad
-    baseColour = "#4444ff"  # String addition incoming
-    nodeLoading = {}
-    for _, record in data.frames[keyNodeLoadingMbox].iterrows():  # Sorry purists
-        nodeLoading[record["node"]] = \
-            baseColour + hex(int(record["load"] / maxNodeLoad * 255))[2:]
+    nodeLoads = (data.frames[keyNodeLoadingMbox]["load"].to_numpy() /
+                 maxNodeLoad)
 
     # Derive thicknesses for hardware node edges in the graph, respecting
     # `maxEdgeHLoad` if it's set.
     maxEdgeLoad = data.frames[keyHwEdgeLoading]["load"].max() \
         if maxEdgeHLoad == np.inf else maxEdgeHLoad
-    maxThicc = 5  # Totally arbitrary
-    edgeLoading = {}
-    for _, record in data.frames[keyHwEdgeLoading].iterrows():
-        load = record["load"]
-        edgeLoading[(record["from"], record["to"])] = \
-            load / maxEdgeLoad * maxThicc \
-            if load / maxEdgeLoad < 1 else maxThicc
-
-    # Compute application node edges. Do this by going through each application
-    # edge, then making a connection between their hardware nodes.
-    extraEdges = []
-    hwEdgesDf = data.frames[keyHwEdgeLoading]  # Convenience
-    for _, record in data.frames[keyAppEdgeCosts].iterrows():
-        appEdge = tuple(record)
-        hwFrom = ".".join(data.frames[keyAppToHw][data.frames[keyAppToHw]["appnode"] == appEdge[0]]["hwnode"].values[0].split(".")[:-2])
-        hwTo = ".".join(data.frames[keyAppToHw][data.frames[keyAppToHw]["appnode"] == appEdge[1]]["hwnode"].values[0].split(".")[:-2])
-        if hwFrom != hwTo:
-            extraEdges.append([hwFrom, hwTo])
+    edgeThicknesses = np.minimum(
+        data.frames[keyHwEdgeLoading]["load"].to_numpy() / maxEdgeLoad, 1) * \
+        maxThicc
+    return nodeLoads, edgeThicknesses
+
+
+# Styling shared between map backends.
+baseColour = "#4444ff"
+maxThicc = 5  # Totally arbitrary
+extraEdgeColour = "#ff0000"
+hwEdgeColour = "#000000"
+minExtraAlpha = 0.25  # For the least-used pair of mailboxes.
+gainColour = "#ff4444"  # For delta maps
+lossColour = "#4444ff"
+
+
+def crossing_edge_counts(data: Data) -> pd.DataFrame:
+    """
+    Finds the application edges that cross between mailboxes, and counts them
+    for each pair of mailboxes (irrespective of direction). Arguments:
+
+     - data: A placement_processing Data object with loaded data.
+
+    Returns a dataframe with columns "from", "to" (mailbox names), and
+    "count", with one row per pair of mailboxes, in order of the first
+    application edge between each pair. The direction of each pair is that
+    of its first application edge.
+    """
+
+    # Truncate the packed address of each application node to its mailbox
+    # once, then join both ends of every application edge against that
+    # mapping in one go, comparing integers rather than names.
+    appToHw = data.frames[keyAppToHw]
+    first = ~appToHw["appnode"].duplicated().to_numpy()  # First match wins
+    appIndex = pd.Index(appToHw["appnode"].to_numpy(dtype=object)[first])
+    appMailboxes = np.append(address.truncate(
+        data.addresses[(keyAppToHw, "hwnode")][first], "mailbox"), -1)
+    graph = data.graph("application")  # Each node is only looked up once.
+    nodeMailboxes = appMailboxes[appIndex.get_indexer(graph.names)]
+    hwFrom = nodeMailboxes[graph.edgeFrom]  # -1 (missing) stays -1.
+    hwTo = nodeMailboxes[graph.edgeTo]
+    crossing = (hwFrom >= 0) & (hwTo >= 0) & (hwFrom != hwTo)
+    hwFrom = hwFrom[crossing]
+    hwTo = hwTo[crossing]
+
+    # Intern mailboxes, then count each (undirected) pair. Only the
+    # mailboxes of the pairs are turned back into names.
+    codes, mailboxes = pd.factorize(np.concatenate((hwFrom, hwTo)))
+    fromCodes = codes[:len(hwFrom)]
+    toCodes = codes[len(hwFrom):]
+    _, first, counts = np.unique(
+        _undirected_pairs(fromCodes, toCodes, len(mailboxes)),
+        return_index=True, return_counts=True)
+    order = np.argsort(first)
+    first = first[order]
+    names = address.unpack(np.asarray(mailboxes), data.boxes, "mailbox")
+    return pd.DataFrame({"from": names[fromCodes[first]],
+                         "to": names[toCodes[first]],
+                         "count": counts[order]})
+
+
+def _extra_edge_style(counts: np.ndarray) \
+        -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the thicknesses (in points) and opacities (in [0, 1]) of
+    application edges between pairs of mailboxes, given the number of
+    application edges between each pair.
+    """
+    if len(counts) == 0:
+        return np.empty(0), np.empty(0)
+    fraction = counts / counts.max()
+    return 1 + fraction * (maxThicc - 1), minExtraAlpha + \
+        fraction * (1 - minExtraAlpha)
+
+
+def _draw_map_graphviz(data: Data, mailboxes: pd.Series,
+                       nodePositions: np.ndarray, nodeLoads: np.ndarray,
+                       edgeThicknesses: np.ndarray,
+                       extraEdges: pd.DataFrame, outPath: str,
+                       cleanup: bool) -> None:
+    """
+    Draws a map with graphviz. See `draw_map`, and `crossing_edge_counts` for
+    `extraEdges`. `nodePositions` and
+    `edgeThicknesses` are None if mailboxes are not explicitly positioned, or
+    hardware edges are not to be drawn, respectively.
+    """
+
+    import graphviz as gv
+
+    # Derive colors from hardware node loading. We do this not by changing
+    # the colour, but by adding two hexidecimal places of alpha information.
+    nodeLoading = {node: baseColour + hex(int(load * 255))[2:]
+                   for node, load in zip(mailboxes, nodeLoads.tolist())}
 
     # Draw graph...
     graph = gv.Graph("G", strict=True, engine="neato")
@@ -184,8 +366,11 @@ def draw_map(data: Data, cleanup: bool=True, drawHwEdges: bool=False,
                fillcolor="#000000", margin="0")
 
     # Hardware nodes, with their loading colours.
+    if nodePositions is not None:
+        positions = {node: "{},{}!".format(*nodePos) for node, nodePos in
+                     zip(mailboxes, nodePositions.tolist())}
     for node, colour in nodeLoading.items():
-        if explicitPositions:
+        if nodePositions is not None:
             graph.node(node, fillcolor=colour, pos=positions[node])
         else:
             graph.node(node, fillcolor=colour)
@@ -193,15 +378,365 @@ def draw_map(data: Data, cleanup: bool=True, drawHwEdges: bool=False,
     # Hardware edges, with their loading thicknesses. Note these come before
     # application-hardware edges because the graph is strict (i.e. edges after
     # the first are ignored).
-    if drawHwEdges:
-        for edge, thickness in edgeLoading.items():
-            graph.edge(*edge, color="#000000", penwidth=str(thickness))
-
-    # Application-hardware edges.
-    for edge in extraEdges:
-        graph.edge(*edge, color="#ff0000")
+    if edgeThicknesses is not None:
+        hwEdges = data.frames[keyHwEdgeLoading]
+        for edgeFrom, edgeTo, thickness in zip(
+                hwEdges["from"], hwEdges["to"], edgeThicknesses.tolist()):
+            graph.edge(edgeFrom, edgeTo, color=hwEdgeColour,
+                       penwidth=str(thickness))
+
+    # Application-hardware edges, thicker and more opaque the more
+    # application edges they stand for.
+    widths, alphas = _extra_edge_style(extraEdges["count"].to_numpy())
+    for edgeFrom, edgeTo, width, alpha in zip(
+            extraEdges["from"], extraEdges["to"], widths.tolist(),
+            alphas.tolist()):
+        graph.edge(edgeFrom, edgeTo, penwidth=str(width),
+                   color="{}{:02x}".format(extraEdgeColour, int(alpha * 255)))
 
     # All you wanna do is drag me down, all I wanna do is stamp you out.
     fileName, extension = os.path.splitext(os.path.basename(outPath))
-    graph.render(filename=fileName, directory=os.path.dirname(outPath),
-                 cleanup=cleanup, format=extension.split(".")[-1])
+    with data.stats.stage("map render"):
+        graph.render(filename=fileName, directory=os.path.dirname(outPath),
+                     cleanup=cleanup, format=extension.split(".")[-1])
+
+
+def _undirected_pairs(fromIndices: np.ndarray, toIndices: np.ndarray,
+                      size: int) -> np.ndarray:
+    """
+    Encodes pairs of node indices (each in [0, size)) as single integers,
+    irrespective of direction.
+    """
+    low = np.minimum(fromIndices, toIndices).astype(np.int64)
+    high = np.maximum(fromIndices, toIndices).astype(np.int64)
+    return low * size + high
+
+
+def _draw_map_matplotlib(data: Data, mailboxes: pd.Series,
+                         nodePositions: np.ndarray, nodeLoads: np.ndarray,
+                         edgeThicknesses: np.ndarray,
+                         extraEdges: pd.DataFrame, outPath: str) -> None:
+    """
+    Draws a map with matplotlib collections, using the same sizes, colours and
+    thicknesses as graphviz would (one unit of position is one inch, nodes
+    are 0.75 inches across, and thicknesses are in points). See `draw_map`,
+    and `crossing_edge_counts` for `extraEdges`.
+    `edgeThicknesses` is None if hardware edges are not to be drawn.
+    """
+    fromIndices, toIndices, widths, colours = _map_edges(
+        data, mailboxes, edgeThicknesses, extraEdges)
+    figure = _map_figure(nodePositions, _node_colours(nodeLoads),
+                         fromIndices, toIndices, widths, colours)
+    with data.stats.stage("map render"):
+        figure.savefig(outPath)
+
+
+def _node_colours(nodeLoads: np.ndarray) -> np.ndarray:
+    """
+    Returns the RGBA colour of each mailbox, given its loading fraction,
+    quantised as it would be by graphviz.
+    """
+    import matplotlib.colors
+    nodeColours = np.tile(matplotlib.colors.to_rgba(baseColour),
+                          (len(nodeLoads), 1))
+    nodeColours[:, 3] = np.floor(np.clip(nodeLoads, 0, 1) * 255) / 255
+    return nodeColours
+
+
+def _map_edges(data: Data, mailboxes: pd.Series,
+               edgeThicknesses: np.ndarray, extraEdges: pd.DataFrame) \
+        -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Works out which edges the matplotlib backend draws between `mailboxes`,
+    and how. See `_draw_map_matplotlib`.
+
+    Returns a tuple of (index of the mailbox each edge comes from, index of
+    the mailbox it goes to, thicknesses in points, RGBA colours).
+    """
+    import matplotlib.colors
+    mailboxIndex = pd.Index(np.asarray(mailboxes, dtype=object))
+
+    # Edges, as pairs of mailbox indices. Like graphviz' strict graphs, only
+    # the first edge between each pair of mailboxes is drawn, and hardware
+    # edges take precedence.
+    drawnPairs = np.empty(0, dtype=np.int64)
+    fromParts = []
+    toParts = []
+    widths = []
+    colours = []
+    if edgeThicknesses is not None:
+        hwEdges = data.frames[keyHwEdgeLoading]
+        fromIndices = mailboxIndex.get_indexer(
+            np.asarray(hwEdges["from"], dtype=object))
+        toIndices = mailboxIndex.get_indexer(
+            np.asarray(hwEdges["to"], dtype=object))
+        known = (fromIndices >= 0) & (toIndices >= 0)
+        pairs = _undirected_pairs(fromIndices[known], toIndices[known],
+                                  len(mailboxIndex))
+        drawnPairs, first = np.unique(pairs, return_index=True)
+        first = np.sort(first)
+        fromParts.append(fromIndices[known][first])
+        toParts.append(toIndices[known][first])
+        widths.append(edgeThicknesses[known][first])
+        colours.append(np.tile(matplotlib.colors.to_rgba(hwEdgeColour),
+                               (len(first), 1)))
+
+    # Application-hardware edges are already one per pair of mailboxes.
+    fromIndices = mailboxIndex.get_indexer(
+        np.asarray(extraEdges["from"], dtype=object))
+    toIndices = mailboxIndex.get_indexer(
+        np.asarray(extraEdges["to"], dtype=object))
+    keep = ((fromIndices >= 0) & (toIndices >= 0) &
+            ~np.isin(_undirected_pairs(fromIndices, toIndices,
+                                       len(mailboxIndex)), drawnPairs))
+    extraWidths, extraAlphas = _extra_edge_style(
+        extraEdges["count"].to_numpy())
+    extraColours = np.tile(matplotlib.colors.to_rgba(extraEdgeColour),
+                           (len(extraEdges), 1))
+    extraColours[:, 3] = extraAlphas
+    fromParts.append(fromIndices[keep])
+    toParts.append(toIndices[keep])
+    widths.append(extraWidths[keep])
+    colours.append(extraColours[keep])
+    return (np.concatenate(fromParts), np.concatenate(toParts),
+            np.concatenate(widths), np.concatenate(colours))
+
+
+def _map_figure(nodePositions: np.ndarray, nodeColours: np.ndarray,
+                fromIndices: np.ndarray, toIndices: np.ndarray,
+                widths: np.ndarray, colours: np.ndarray,
+                labels: typing.Sequence[str]=None) \
+        -> "matplotlib.figure.Figure":
+    """
+    Draws mailboxes as squares at `nodePositions` (one inch per unit), and
+    edges between them (as indices into `nodePositions`), into a figure
+    just big enough to hold them. Squares are labelled with `labels`, if
+    given.
+
+    Returns the figure.
+    """
+    import matplotlib.collections
+    import matplotlib.figure
+
+    nodeSize = 0.75  # Graphviz' default node width, in inches.
+    corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * nodeSize / 2
+    squares = nodePositions[:, np.newaxis, :] + corners[np.newaxis, :, :]
+    segments = np.stack((nodePositions[fromIndices],
+                         nodePositions[toIndices]), axis=1)
+
+    # Draw figure, one inch per unit of position.
+    low = nodePositions.min(axis=0) - nodeSize / 2
+    high = nodePositions.max(axis=0) + nodeSize / 2
+    figure = matplotlib.figure.Figure(figsize=tuple(high - low), dpi=72)
+    axes = figure.add_axes((0, 0, 1, 1))
+    axes.set_axis_off()
+    axes.set_xlim(low[0], high[0])
+    axes.set_ylim(low[1], high[1])
+    axes.add_collection(matplotlib.collections.LineCollection(
+        segments, linewidths=widths, colors=colours, zorder=1))
+    axes.add_collection(matplotlib.collections.PolyCollection(
+        squares, facecolors=nodeColours, edgecolors="#000000",
+        linewidths=1, zorder=2))
+    for label, position in zip(labels or (), nodePositions.tolist()):
+        axes.text(*position, label, ha="center", va="center", fontsize=8,
+                  zorder=3)
+    return figure
+
+
+def _save_map_figure(outPath: str, *figureArgs) -> None:
+    """
+    Draws a figure with `_map_figure` and writes it to `outPath`. For worker
+    processes.
+    """
+    _map_figure(*figureArgs).savefig(outPath)
+
+
+def draw_tiled_map(data: Data, outPath: str="map.png", level: str="box",
+                   drawHwEdges: bool=False, maxNodeHLoad: float=np.inf,
+                   maxEdgeHLoad: float=np.inf, minCount: int=1,
+                   processes: int=None) -> typing.Dict[str, str]:
+    """
+    Draws a map of a big system in tiles, one per box (or board), which are
+    drawn in parallel with the matplotlib backend (see `draw_map`), and an
+    overview, where each box (or board) is one square coloured by the total
+    loading of its mailboxes, and application edges between mailboxes in
+    different tiles are summed into one edge between each pair of tiles.
+    Tiles only hold edges between their own mailboxes. Arguments:
+
+     - data: A placement_processing Data object with loaded data.
+     - outPath: Path to write the overview to. Each tile is written next to
+           it, with the tile's name appended to the file name (e.g.
+           "map_LoneBox.B10.png").
+     - level: String, either "box" or "board"; the level of the hardware
+           hierarchy (see address.py) to tile by.
+     - drawHwEdges, maxNodeHLoad, maxEdgeHLoad, minCount: As for `draw_map`.
+           Loading colours and thicknesses are relative to the whole
+           system, so tiles can be compared with each other.
+     - processes: Number of worker processes to draw tiles with. Defaults to
+           one per CPU. If 1, tiles are drawn in this process.
+
+    Returns a dictionary mapping the name of each tile (the box, or box and
+    board, like "LoneBox.B10") to the path it was written to, and "overview"
+    to `outPath`. Raises a RuntimeError if mailboxes can't be positioned (see
+    `node_position_from_name`).
+    """
+    import concurrent.futures
+    import matplotlib.colors
+
+    if level not in tileLevels:
+        raise ValueError("Argument 'level' must be either 'box' or "
+                         "'board'.")
+
+    mailboxes = data.frames[keyNodeLoadingMbox]["node"]
+    mailboxAddresses = data.addresses[(keyNodeLoadingMbox, "node")]
+    with data.stats.stage("map positions"):
+        nodePositions = node_positions_from_addresses(mailboxAddresses,
+                                                      data.boxes)
+    unpositioned = np.flatnonzero(nodePositions[:, 0] == -1)
+    if len(unpositioned):
+        raise RuntimeError(
+            "Not sure how to decode name '{}', so can't draw this map in "
+            "tiles.".format(mailboxes.iloc[unpositioned[0]]))
+
+    # Tile of each mailbox, from its address, named like its hardware name
+    # without the engine file prefix (O_.<ROOT>.<EXT>.).
+    tileKeys, mailboxTiles = np.unique(
+        address.truncate(mailboxAddresses, level), return_inverse=True)
+    tileNames = [name.split(".", 3)[-1] for name in
+                 address.unpack(tileKeys, data.boxes, level).tolist()]
+
+    nodeLoads, edgeThicknesses = _loading_styles(data, maxNodeHLoad,
+                                                 maxEdgeHLoad)
+    with data.stats.stage("map crossing edges"):
+        crossingEdges = crossing_edge_counts(data)
+        fromIndices, toIndices, widths, colours = _map_edges(
+            data, mailboxes, edgeThicknesses if drawHwEdges else None,
+            crossingEdges[crossingEdges["count"] >= minCount])
+    nodeColours = _node_colours(nodeLoads)
+    edgeTiles = np.where(mailboxTiles[fromIndices] ==
+                         mailboxTiles[toIndices],
+                         mailboxTiles[fromIndices], -1)
+
+    # Each tile's mailboxes and edges, with edges renumbered to index into
+    # the tile's mailboxes.
+    stem, extension = os.path.splitext(outPath)
+    tilePaths = {}
+    jobs = []
+    localIndices = np.empty(len(mailboxes), dtype=np.int64)
+    nodeOrder = np.argsort(mailboxTiles, kind="stable")
+    nodeBounds = np.searchsorted(mailboxTiles[nodeOrder],
+                                 np.arange(len(tileKeys) + 1))
+    edgeOrder = np.argsort(edgeTiles, kind="stable")
+    edgeBounds = np.searchsorted(edgeTiles[edgeOrder],
+                                 np.arange(len(tileKeys) + 1))
+    for tile, name in enumerate(tileNames):
+        nodes = nodeOrder[nodeBounds[tile]:nodeBounds[tile + 1]]
+        edges = edgeOrder[edgeBounds[tile]:edgeBounds[tile + 1]]
+        localIndices[nodes] = np.arange(len(nodes))
+        tilePaths[name] = "{}_{}{}".format(stem, name, extension)
+        jobs.append((tilePaths[name], nodePositions[nodes],
+                     nodeColours[nodes], localIndices[fromIndices[edges]],
+                     localIndices[toIndices[edges]], widths[edges],
+                     colours[edges]))
+
+    os.makedirs(os.path.dirname(outPath) or ".", exist_ok=True)
+    with data.stats.stage("map tiles"):
+        if processes == 1 or len(jobs) == 1:
+            for job in jobs:
+                _save_map_figure(*job)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+                for future in [pool.submit(_save_map_figure, *job)
+                               for job in jobs]:
+                    future.result()
+
+    # Overview: tiles are positioned on a grid of boxes (or boards), coloured
+    # by their total load relative to the busiest tile, with application
+    # edges between tiles summed for each (undirected) pair of tiles.
+    with data.stats.stage("map overview"):
+        tileSize = boardSpacing * (np.array((boxSpacingX, boxSpacingY))
+                                   if level == "box" else 1)
+        tilePositions = np.empty((len(tileKeys), 2), dtype=np.int64)
+        tilePositions[mailboxTiles] = nodePositions // tileSize
+        tileLoads = np.bincount(
+            mailboxTiles,
+            weights=data.frames[keyNodeLoadingMbox]["load"].to_numpy(
+                dtype=np.float64), minlength=len(tileKeys))
+        mailboxIndex = pd.Index(np.asarray(mailboxes, dtype=object))
+        fromTiles = mailboxTiles[mailboxIndex.get_indexer(
+            np.asarray(crossingEdges["from"], dtype=object))]
+        toTiles = mailboxTiles[mailboxIndex.get_indexer(
+            np.asarray(crossingEdges["to"], dtype=object))]
+        between = fromTiles != toTiles
+        pairs, pairRows = np.unique(
+            _undirected_pairs(fromTiles[between], toTiles[between],
+                              len(tileKeys)), return_inverse=True)
+        counts = np.bincount(pairRows, weights=crossingEdges["count"]
+                             .to_numpy()[between], minlength=len(pairs))
+        tileWidths, tileAlphas = _extra_edge_style(counts)
+        tileColours = np.tile(matplotlib.colors.to_rgba(extraEdgeColour),
+                              (len(pairs), 1))
+        tileColours[:, 3] = tileAlphas
+        maxTileLoad = tileLoads.max() if len(tileLoads) else 0
+        _save_map_figure(
+            outPath, tilePositions,
+            _node_colours(tileLoads / maxTileLoad if maxTileLoad
+                          else tileLoads),
+            pairs // len(tileKeys), pairs % len(tileKeys), tileWidths,
+            tileColours, tileNames)
+    tilePaths["overview"] = outPath
+    return tilePaths
+
+
+def draw_delta_map(runDiff: RunDiff, outPath: str="",
+                   maxNodeHDelta: float=np.inf) -> None:
+    """
+    Draws a map of how mailbox loading changed between two placement runs,
+    using matplotlib, where mailboxes that gained application nodes are red,
+    mailboxes that lost them are blue, and the colour is stronger the bigger
+    the change. Arguments:
+
+     - runDiff: A RunDiff object, from `placement_postprocessing.diff.diff`.
+     - outPath: Path (absolute or relative) to write the map
+           to. Extension determines the type of file written.
+     - maxNodeHDelta: If not default, forces a maximum change in node loading
+           on the map. If infinite (default), impose no maximum.
+
+    Returns nothing, but writes the map to `outPath`. Raises a RuntimeError
+    if mailboxes can't be positioned (see `node_position_from_name`).
+    """
+    import matplotlib.collections
+    import matplotlib.colors
+    import matplotlib.figure
+
+    mailboxes = runDiff.mailboxLoads
+    nodePositions = node_positions_from_names(mailboxes["node"])
+    unpositioned = np.flatnonzero(nodePositions[:, 0] == -1)
+    if len(unpositioned):
+        raise RuntimeError(
+            "Not sure how to decode name '{}', so can't draw this map."
+            .format(mailboxes["node"].iloc[unpositioned[0]]))
+
+    deltas = mailboxes["delta"].to_numpy(dtype=np.float64)
+    maxDelta = np.abs(deltas).max() if maxNodeHDelta == np.inf \
+        else maxNodeHDelta
+    nodeColours = np.where(
+        (deltas >= 0)[:, np.newaxis],
+        matplotlib.colors.to_rgba(gainColour),
+        matplotlib.colors.to_rgba(lossColour))
+    nodeColours[:, 3] = np.clip(np.abs(deltas) / maxDelta, 0, 1) \
+        if maxDelta else 0
+
+    nodeSize = 0.75  # As in _draw_map_matplotlib.
+    corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * nodeSize / 2
+    low = nodePositions.min(axis=0) - nodeSize / 2
+    high = nodePositions.max(axis=0) + nodeSize / 2
+    figure = matplotlib.figure.Figure(figsize=tuple(high - low), dpi=72)
+    axes = figure.add_axes((0, 0, 1, 1))
+    axes.set_axis_off()
+    axes.set_xlim(low[0], high[0])
+    axes.set_ylim(low[1], high[1])
+    axes.add_collection(matplotlib.collections.PolyCollection(
+        nodePositions[:, np.newaxis, :] + corners[np.newaxis, :, :],
+        facecolors=nodeColours, edgecolors="#000000", linewidths=1))
+    figure.savefig(outPath)
@@ -0,0 +1,209 @@
+# Functions that measure the quality of a placement, as numbers rather than
+# pictures.
+
+from .keys import *  # Sorry
+from .data import Data
+from . import address
+
+import datetime
+import numpy as np
+import pandas as pd
+import types
+import typing
+
+# Format of timestamps in diagnostics files (and file names).
+timestampFormat = "%Y-%m-%dT%H-%M-%S"
+
+
+class Diagnostics(typing.NamedTuple):
+    """
+    The contents of a placement_diagnostics_<APPNAME>_<TIMESTAMP>.txt file.
+    Fields missing from the file are None. Fields we don't know about are
+    kept, as strings, in `extra` (which is an empty, read-only mapping if
+    none are given, shared by every such object).
+    """
+    maxDevicesPerThread: int = None
+    maxEdgeCost: float = None
+    method: str = None
+    startTime: datetime.datetime = None
+    endTime: datetime.datetime = None
+    score: float = None
+    argCount: int = None
+    extra: typing.Mapping[str, str] = types.MappingProxyType({})
+
+
+def _parse_timestamp(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, timestampFormat)
+
+
+# How to interpret each field of a diagnostics file.
+diagnosticTypes = {"maxDevicesPerThread": int,
+                   "maxEdgeCost": float,
+                   "method": str,
+                   "startTime": _parse_timestamp,
+                   "endTime": _parse_timestamp,
+                   "score": float,
+                   "argCount": int}
+
+
+def parse_diagnostics(path: str) -> Diagnostics:
+    """
+    Parses the placement diagnostics file at `path`, which holds one
+    "<KEY>:<VALUE>" pair per line. Raises a RuntimeError if a line can't be
+    understood.
+
+    Returns a Diagnostics object.
+    """
+    fields = {}
+    extra = {}
+    with open(path) as diagnosticsFile:
+        for lineNumber, line in enumerate(diagnosticsFile, 1):
+            line = line.strip()
+            if not line:
+                continue
+            key, separator, value = line.partition(":")
+            if not separator:
+                raise RuntimeError("Line {} of '{}' is not of the form "
+                                   "<KEY>:<VALUE>.".format(lineNumber, path))
+            if key not in diagnosticTypes:
+                extra[key] = value
+                continue
+            try:
+                fields[key] = diagnosticTypes[key](value)
+            except ValueError:
+                raise RuntimeError("Could not understand value '{}' for '{}' "
+                                   "on line {} of '{}'."
+                                   .format(value, key, lineNumber, path))
+    return Diagnostics(extra=extra, **fields)
+
+
+class Summary(typing.NamedTuple):
+    """
+    Numbers describing the quality of a placement. See `summarise`.
+    """
+    applicationNodes: int
+    applicationEdges: int
+    mailboxesUsed: int
+    coresUsed: int
+    totalEdgeCost: float
+    meanEdgeCost: float
+    maxEdgeCost: float
+    maxCoreLoad: float
+    meanCoreLoad: float
+    maxMailboxLoad: float
+    meanMailboxLoad: float
+    maxHwEdgeLoad: float
+    meanHwEdgeLoad: float
+    onMailboxFraction: float
+    meanFanOut: float
+    maxFanOut: int
+    edgesOverMaxEdgeCost: int
+    diagnostics: Diagnostics
+    mailboxes: pd.DataFrame
+
+
+def edge_mailboxes(data: Data) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the mailbox each end of each application edge is placed on.
+
+    Returns a tuple of (from, to) arrays of packed mailbox addresses (see
+    address.py), one entry per application edge, with -1 for ends that
+    aren't placed.
+    """
+    graph = data.graph("application")
+    mailboxes = address.truncate(graph.addresses, "mailbox")
+    return mailboxes[graph.edgeFrom], mailboxes[graph.edgeTo]
+
+
+def per_mailbox(data: Data) -> pd.DataFrame:
+    """
+    Computes metrics for each mailbox that application nodes are placed on.
+
+    Returns a dataframe indexed by packed mailbox address (see address.py),
+    with columns:
+
+     - node: The mailbox name.
+     - load: Number of application nodes placed on the mailbox.
+     - edges: Number of application edges leaving the mailbox's nodes.
+     - crossingEdges: Number of those edges that go to another mailbox.
+     - edgeCost: Total cost of those edges.
+     - fanOut: Number of other mailboxes those edges go to.
+    """
+    loads = data.rollup("mailbox")
+    mailboxes = loads.index.to_numpy()
+    fromMbox, toMbox = edge_mailboxes(data)
+    costs = data.frames[keyAppEdgeCosts]["cost"].to_numpy(dtype=np.float64)
+
+    # Index each edge by the position of its source mailbox in `mailboxes`
+    # (which is sorted).
+    placed = (fromMbox >= 0) & (toMbox >= 0)
+    fromRows = np.searchsorted(mailboxes, fromMbox[placed])
+    crossing = fromMbox[placed] != toMbox[placed]
+    size = len(mailboxes)
+
+    # Fan out: distinct (from, to) pairs of mailboxes, counted by source.
+    toRows = np.searchsorted(mailboxes, toMbox[placed])
+    pairs = np.unique(fromRows[crossing].astype(np.int64) * size +
+                      toRows[crossing])
+
+    out = loads.copy()
+    out["edges"] = np.bincount(fromRows, minlength=size)
+    out["crossingEdges"] = np.bincount(fromRows[crossing], minlength=size)
+    out["edgeCost"] = np.bincount(fromRows, weights=costs[placed],
+                                  minlength=size)
+    out["fanOut"] = np.bincount(pairs // size, minlength=size) if size \
+        else np.empty(0, dtype=np.int64)
+    return out
+
+
+def summarise(data: Data) -> Summary:
+    """
+    Computes numbers describing the quality of a placement in one go,
+    without any Python-level loops over nodes or edges. Arguments:
+
+     - data: A placement_processing Data object.
+
+    Returns a Summary, which holds scalar metrics, the parsed diagnostics
+    file, and the per-mailbox metrics from `per_mailbox`. Edge costs are
+    compared against the maximum edge cost in the diagnostics file, if it has
+    one.
+    """
+    costs = data.frames[keyAppEdgeCosts]["cost"].to_numpy(dtype=np.float64)
+    coreLoads = data.frames[keyNodeLoadingCore]["load"].to_numpy(
+        dtype=np.float64)
+    mailboxLoads = data.frames[keyNodeLoadingMbox]["load"].to_numpy(
+        dtype=np.float64)
+    hwEdgeLoads = data.frames[keyHwEdgeLoading]["load"].to_numpy(
+        dtype=np.float64)
+    diagnostics = data.load_diagnostics()
+    mailboxes = per_mailbox(data)
+    fromMbox, toMbox = edge_mailboxes(data)
+    placed = (fromMbox >= 0) & (toMbox >= 0)
+
+    def _max(values: np.ndarray) -> float:
+        return float(values.max()) if len(values) else np.nan
+
+    def _mean(values: np.ndarray) -> float:
+        return float(values.mean()) if len(values) else np.nan
+
+    return Summary(
+        applicationNodes=len(data.frames[keyAppToHw]),
+        applicationEdges=len(costs),
+        mailboxesUsed=len(mailboxes),
+        coresUsed=int((coreLoads > 0).sum()),
+        totalEdgeCost=float(costs.sum()),
+        meanEdgeCost=_mean(costs),
+        maxEdgeCost=_max(costs),
+        maxCoreLoad=_max(coreLoads),
+        meanCoreLoad=_mean(coreLoads),
+        maxMailboxLoad=_max(mailboxLoads),
+        meanMailboxLoad=_mean(mailboxLoads),
+        maxHwEdgeLoad=_max(hwEdgeLoads),
+        meanHwEdgeLoad=_mean(hwEdgeLoads),
+        onMailboxFraction=_mean(fromMbox[placed] == toMbox[placed]),
+        meanFanOut=_mean(mailboxes["fanOut"].to_numpy()),
+        maxFanOut=int(mailboxes["fanOut"].max()) if len(mailboxes) else 0,
+        edgesOverMaxEdgeCost=0 if diagnostics.maxEdgeCost is None
+        else int((costs > diagnostics.maxEdgeCost).sum()),
+        diagnostics=diagnostics,
+        mailboxes=mailboxes)
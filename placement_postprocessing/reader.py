@@ -0,0 +1,144 @@
+# Functions that read the CSV files dumped by the Orchestrator into compact
+# dataframes.
+
+from .keys import *  # Sorry
+
+import importlib.util
+import io
+import pandas as pd
+import typing
+
+# Section markers in the node loading file.
+coreSectionMarker = b"[core]"
+mailboxSectionMarker = b"[mailbox]"
+
+# Bytes read at a time when scanning for section markers.
+scanBlockSize = 1 << 20
+
+
+def available_engines() -> typing.Tuple[str, ...]:
+    """
+    Returns the CSV parsing engines that can be passed to `read_frame`: "c"
+    always, and "pyarrow" if pyarrow is installed.
+    """
+    if importlib.util.find_spec("pyarrow") is None:
+        return ("c",)
+    return ("c", "pyarrow")
+
+
+def _read_csv(source: typing.Union[str, typing.BinaryIO], key: str,
+              engine: str) -> pd.DataFrame:
+    """
+    Reads a headerless CSV file (or buffer) with the headers and dtypes we
+    expect for `key`.
+    """
+    if engine not in available_engines():
+        raise ValueError("CSV engine '{}' is not available. Use one of '{}'."
+                         .format(engine, "', '".join(available_engines())))
+    return pd.read_csv(source, header=None, names=headers[key],
+                       dtype=dtypes[key], engine=engine)
+
+
+def read_frame(path: str, key: str, engine: str="c") -> pd.DataFrame:
+    """
+    Reads one of the (unsectioned) CSV files dumped by the Orchestrator, with
+    columns named from `headers[key]`, and with the compact dtypes in
+    `dtypes[key]` (names are categorical, numbers are 32-bit), so that
+    nothing is type-inferred. Arguments:
+
+     - path: Path to the file.
+     - key: The kind of file (e.g. keyAppEdgeCosts).
+     - engine: CSV parsing engine for pandas. See `available_engines`.
+
+    Returns the dataframe.
+    """
+    return _read_csv(path, key, engine)
+
+
+def _find_lines(handle: typing.BinaryIO, markers: typing.Sequence[bytes],
+                blockSize: int=scanBlockSize) -> typing.Dict[bytes, int]:
+    """
+    Scans a file from the start, a block at a time, for the first line that
+    starts with each of `markers`.
+
+    Returns a dictionary mapping each marker found to the offset of its line.
+    """
+    out = {}
+    overlap = max(len(marker) for marker in markers)
+    carry = b"\n"  # The start of the file is the start of a line.
+    offset = -1  # Offset of carry[0] in the file
+    while len(out) < len(markers):
+        block = handle.read(blockSize)
+        if not block:
+            break
+        buffer = carry + block
+        for marker in markers:
+            found = buffer.find(b"\n" + marker)
+            if marker not in out and found != -1:
+                out[marker] = offset + found + 1
+        carry = buffer[-overlap - 1:]
+        offset += len(buffer) - len(carry)
+    return out
+
+
+class _Section(io.RawIOBase):
+    """
+    A read-only file over bytes `start` to `end` of the file `handle`, which
+    reads straight from `handle` (so pandas can parse one section of a file,
+    without it being copied out first).
+    """
+
+    def __init__(self, handle: typing.BinaryIO, start: int, end: int) \
+            -> None:
+        self._handle = handle
+        self._handle.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        read = self._handle.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+
+
+def read_node_loading(path: str, engine: str="c") \
+        -> typing.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Reads the sectioned node loading file, which holds a "[core]" section
+    and a "[mailbox]" section. The file is scanned once for the section
+    markers, then each section is parsed straight from the file, so the file
+    is never held in memory as a whole. Raises a RuntimeError if either
+    section is missing. Arguments are as for `read_frame`.
+
+    Returns a tuple of (core loading, mailbox loading) dataframes.
+    """
+    markers = (coreSectionMarker, mailboxSectionMarker)
+    out = []
+    with open(path, "rb") as nodeLoadingFile:
+        starts = _find_lines(nodeLoadingFile, markers)
+        for marker in markers:
+            if marker not in starts:
+                raise RuntimeError("Could not find the '{}' section in node "
+                                   "loading file '{}'."
+                                   .format(marker.decode(), path))
+        end = nodeLoadingFile.seek(0, io.SEEK_END)
+
+        # Each section runs from the line after its marker, to the next
+        # marker (or the end of the file).
+        for marker in markers:
+            nodeLoadingFile.seek(starts[marker])
+            bodyStart = starts[marker] + len(nodeLoadingFile.readline())
+            bodyEnd = min([start for start in starts.values()
+                           if start > starts[marker]] + [end])
+            try:
+                with _Section(nodeLoadingFile, bodyStart, bodyEnd) \
+                        as section:
+                    out.append(_read_csv(section, keyNodeLoading, engine))
+            except pd.errors.EmptyDataError:  # pandas can't parse nothing.
+                out.append(pd.DataFrame(
+                    {column: pd.Series(dtype=dtypes[keyNodeLoading][column])
+                     for column in headers[keyNodeLoading]}))
+    return tuple(out)
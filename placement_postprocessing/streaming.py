@@ -0,0 +1,261 @@
+# Functions and a class that compute statistics of one column of the CSV
+# files dumped by the Orchestrator a chunk of rows at a time, so that big
+# files (like the application edges) never need to be in memory as a whole
+# dataframe.
+
+from .keys import *  # Sorry
+
+import numpy as np
+import os
+import pandas as pd
+import typing
+
+# Rows read at a time.
+defaultChunksize = 1 << 20
+
+# Number of bins in the histogram that quantiles are estimated from. Quantiles
+# are out by at most (maximum - minimum) / quantileBins.
+defaultQuantileBins = 4096
+
+# Dataframes that can be streamed from their files, because each is the only
+# thing in its file (see data.frameSources). Node loading is small (there's
+# one row per core or mailbox), and sectioned, so it's always read whole.
+streamableKeys = (keyAppEdgeCosts, keyHwEdgeLoading)
+
+
+def iter_column(path: str, key: str, column: str,
+                chunksize: int=defaultChunksize) \
+        -> typing.Iterator[np.ndarray]:
+    """
+    Reads one column of a headerless CSV file dumped by the Orchestrator
+    (e.g. the "cost" column of the application edges), `chunksize` rows at a
+    time. The other columns are skipped, rather than parsed. Arguments:
+
+     - path: Path to the file.
+     - key: The kind of file (e.g. keyAppEdgeCosts), for its headers and
+           dtypes.
+     - column: Name of the column, from `headers[key]`.
+     - chunksize: Number of rows read at a time.
+
+    Yields the values of each chunk as a float64 array.
+    """
+    if column not in headers[key]:
+        raise ValueError("There's no column '{}' in {} files."
+                         .format(column, key))
+    chunks = pd.read_csv(path, header=None, names=headers[key],
+                         usecols=[column],
+                         dtype={column: dtypes[key][column]},
+                         chunksize=chunksize)
+    with chunks:
+        for chunk in chunks:
+            yield chunk[column].to_numpy(dtype=np.float64)
+
+
+class RunningStats:
+    """
+    Statistics of a stream of numbers, updated one array at a time: the
+    count, minimum, maximum, mean and variance (combined across arrays as in
+    Chan et al.'s parallel algorithm), and optionally a histogram with fixed
+    bins, and a finer histogram to estimate quantiles from. Memory use does
+    not depend on how many numbers go past.
+    """
+
+    # Number of values seen.
+    count = 0
+
+    # Smallest, largest and mean value seen (NaN until something's seen).
+    minimum = np.nan
+    maximum = np.nan
+    mean = np.nan
+
+    # Counts and edges of the histogram, as from `numpy.histogram`, or None
+    # if there isn't one.
+    counts = None
+    edges = None
+
+    # Counts and edges of the histogram that quantiles are estimated from, or
+    # None if there isn't one.
+    quantileCounts = None
+    quantileEdges = None
+
+    def __init__(self, bins: typing.Union[int, typing.Sequence[float]]=None,
+                 range: typing.Tuple[float, float]=None,
+                 quantileBins: int=0,
+                 quantileRange: typing.Tuple[float, float]=None) -> None:
+        """
+        Constructs empty statistics. If `bins` is given, values are also
+        counted into a histogram, as by `numpy.histogram` with `bins` and
+        `range` (which must be given if `bins` is a number). If `quantileBins`
+        is nonzero, values are also counted into that many bins over
+        `quantileRange`, to estimate quantiles from. Values outside the bins
+        are not counted.
+        """
+        self.count = 0
+        self.minimum = np.nan
+        self.maximum = np.nan
+        self.mean = np.nan
+        self._m2 = 0.0  # Sum of squared differences from the mean
+        self._histogramArgs = None
+        self._quantileArgs = None
+        if bins is not None:
+            if not np.iterable(bins) and range is None:
+                raise ValueError("A number of bins needs a range.")
+            self._histogramArgs = {"bins": bins, "range": range}
+            self.edges = np.histogram_bin_edges(np.empty(0), bins, range)
+            self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        if quantileBins:
+            self._quantileArgs = {"bins": quantileBins,
+                                  "range": quantileRange}
+            self.quantileEdges = np.histogram_bin_edges(
+                np.empty(0), quantileBins, quantileRange)
+            self.quantileCounts = np.zeros(quantileBins, dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Adds an array of values to the statistics.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+
+        # With the same arguments, numpy bins each value the same way as it
+        # would with all of the values at once.
+        if self._histogramArgs is not None:
+            self.counts += np.histogram(values, **self._histogramArgs)[0]
+        if self._quantileArgs is not None:
+            self.quantileCounts += np.histogram(values,
+                                                **self._quantileArgs)[0]
+
+        count = len(values)
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        if self.count == 0:
+            self.mean, self._m2 = mean, m2
+            self.minimum, self.maximum = values.min(), values.max()
+        else:
+            delta = mean - self.mean
+            self.mean += delta * count / total
+            self._m2 += m2 + delta ** 2 * self.count * count / total
+            self.minimum = min(self.minimum, values.min())
+            self.maximum = max(self.maximum, values.max())
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        """The (population) variance of the values seen, or NaN."""
+        return self._m2 / self.count if self.count else np.nan
+
+    @property
+    def histogram(self) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """The histogram, as a tuple of (counts, edges)."""
+        if self.counts is None:
+            raise RuntimeError("These statistics have no histogram.")
+        return self.counts, self.edges
+
+    def quantiles(self, q: typing.Union[float, typing.Sequence[float]]) \
+            -> np.ndarray:
+        """
+        Estimates quantiles (`q` in [0, 1]) of the values seen, by
+        interpolating within the bins of the quantile histogram. Raises a
+        RuntimeError if there is no quantile histogram.
+
+        Returns an array of quantiles, one for each of `q`.
+        """
+        if self.quantileCounts is None:
+            raise RuntimeError("These statistics have no quantile "
+                               "histogram.")
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        cumulative = np.cumsum(self.quantileCounts)
+        if cumulative[-1] == 0:
+            return np.full(len(q), np.nan)
+        targets = q * cumulative[-1]
+        bins = np.minimum(np.searchsorted(cumulative, targets, side="left"),
+                          len(cumulative) - 1)
+        below = np.where(bins > 0, cumulative[bins - 1], 0)
+        inBin = self.quantileCounts[bins]
+        fraction = np.where(inBin > 0, (targets - below) /
+                            np.maximum(inBin, 1), 0)
+        out = (self.quantileEdges[bins] + np.clip(fraction, 0, 1) *
+               np.diff(self.quantileEdges)[bins])
+        return np.clip(out, self.minimum, self.maximum)
+
+
+def column_stats(chunks: typing.Callable[[], typing.Iterable[np.ndarray]],
+                 bins: typing.Union[int, typing.Sequence[float]]=6,
+                 range: typing.Tuple[float, float]=None,
+                 quantileBins: int=defaultQuantileBins) -> RunningStats:
+    """
+    Computes the statistics (see RunningStats) of a stream of arrays.
+    Arguments:
+
+     - chunks: Function returning a fresh iterable of arrays each time it's
+           called (e.g. a lambda around `iter_column`).
+     - bins, range: As for `numpy.histogram`, except that `bins` can't be a
+           string. Counts are the same as `numpy.histogram` would give for
+           all of the values at once.
+     - quantileBins: Number of bins to estimate quantiles from, over the
+           range of the values, or 0 for no quantiles.
+
+    Reads the stream once if the bins are known up front (`bins` are edges,
+    or `range` is given) and no quantiles are wanted, and twice otherwise:
+    once for the range of the values, and once to count them into bins.
+
+    Returns the RunningStats.
+    """
+    if isinstance(bins, str):
+        raise ValueError("Can't compute bins '{}' a chunk at a time; pass "
+                         "a number of bins, or their edges.".format(bins))
+
+    # Bins over the range of the values, as numpy.histogram would choose.
+    if not np.iterable(bins) and range is None or quantileBins:
+        first = RunningStats()
+        for chunk in chunks():
+            first.update(chunk)
+        valueRange = (0, 1) if first.count == 0 \
+            else (first.minimum, first.maximum)
+        if range is None and not np.iterable(bins):
+            range = valueRange
+
+    out = RunningStats(bins, range, quantileBins,
+                       valueRange if quantileBins else None)
+    for chunk in chunks():
+        out.update(chunk)
+    return out
+
+
+def stats(data: "Data", what: str="appedge",
+          bins: typing.Union[int, typing.Sequence[float]]=6,
+          range: typing.Tuple[float, float]=None,
+          quantileBins: int=defaultQuantileBins,
+          chunksize: int=defaultChunksize) -> RunningStats:
+    """
+    Computes the statistics (see `column_stats`) of one metric of a
+    placement run. Metrics whose dataframes are in `streamableKeys`, and
+    aren't loaded already, are read from their files `chunksize` rows at a
+    time; otherwise, the loaded dataframe is used. Arguments:
+
+     - data: A placement_processing Data object.
+     - what: String, either "mailbox", "core", "hwedge", or "appedge" (see
+           data.histogramSources).
+     - bins, range, quantileBins: As for `column_stats`.
+     - chunksize: As for `iter_column`.
+
+    Returns the RunningStats.
+    """
+    from .data import frameSources, histogramSources  # data.py imports us.
+    if what not in histogramSources:
+        raise RuntimeError("Argument 'what' must be either 'mailbox', "
+                           "'core', 'hwedge', or 'appedge'.")
+    key, column = histogramSources[what]
+    if key in streamableKeys and not data.frames.is_loaded(key):
+        sourceKey = frameSources[key]
+        if data.files[sourceKey] is None:
+            raise RuntimeError(
+                "File '{}' has not been detected. Have you called "
+                "`detect_files` yet?".format(sourceKey))
+        path = os.path.join(data.dataDir, data.files[sourceKey])
+        return column_stats(lambda: iter_column(path, key, column, chunksize),
+                            bins, range, quantileBins)
+    values = data.frames[key][column].to_numpy(dtype=np.float64)
+    return column_stats(lambda: (values,), bins, range, quantileBins)
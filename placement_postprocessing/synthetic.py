@@ -0,0 +1,245 @@
+# Functions that write synthetic placement dumps, in the same format as the
+# Orchestrator, for applications and hardware of any size. Useful for seeing
+# how the rest of this library scales.
+
+from .collection import Run
+from .map import boxPositions
+from . import address
+from .edgecache import onMailboxCost
+from .metrics import timestampFormat
+from .topology import Topology, coresPerMailbox, threadsPerMailbox
+
+import datetime
+import numpy as np
+import os
+import pandas as pd
+import typing
+
+# Boxes used, in order, for multi-box hardware. "Ay" is missed out because
+# it shares its position with "By" (see map.boxPositions).
+multiBoxNames = ("By", "Co", "De", "El", "Fi", "Go", "He", "Ib")
+
+
+def _box_prefixes(boxes: typing.Union[int, typing.Sequence[str]]) \
+        -> typing.List[str]:
+    """
+    Turns `boxes` (a number of boxes, or a sequence of box names in
+    map.boxPositions) into the prefixes hardware names start with. Raises a
+    ValueError if the boxes aren't ones we know how to position.
+    """
+    if boxes == 1:
+        return ["O_.POETSHardwareOneBox.ocfg.LoneBox"]
+    if isinstance(boxes, int):
+        if not 1 <= boxes <= len(multiBoxNames):
+            raise ValueError("Can only generate between 1 and {} boxes, not "
+                             "{}.".format(len(multiBoxNames), boxes))
+        boxes = multiBoxNames[:boxes]
+    unknown = [box for box in boxes if box not in boxPositions]
+    if unknown:
+        raise ValueError("Don't know where to put boxes '{}'."
+                         .format("', '".join(unknown)))
+    if len({boxPositions[box] for box in boxes}) != len(boxes):
+        raise ValueError("Boxes '{}' overlap.".format("', '".join(boxes)))
+    return ["O_.POETSHardware.ocfg.{}".format(box) for box in boxes]
+
+
+def _place(width: int, height: int, hardware: Topology,
+           devicesPerThread: int, shuffle: float,
+           generator: np.random.Generator) -> typing.Tuple[np.ndarray,
+                                                           np.ndarray]:
+    """
+    Places the devices of a `width` by `height` plate on threads, spreading
+    them evenly over every mailbox, and filling mailboxes in order with
+    square tiles of the plate (so that most application edges stay on a
+    mailbox). Devices are dealt out to the cores of each mailbox in turn,
+    and then to their threads.
+    The threads of a `shuffle` fraction of devices are then swapped at
+    random. Raises a ValueError if the devices don't fit.
+
+    Returns a tuple of (mailbox index, thread index within the mailbox) for
+    each device, in row-major order.
+    """
+    devices = width * height
+    perMailbox = max(1, -(-devices // len(hardware)))
+    if perMailbox > threadsPerMailbox * devicesPerThread:
+        raise ValueError("Can't place {} devices on {} mailboxes with {} "
+                         "devices per thread.".format(
+                             devices, len(hardware), devicesPerThread))
+    tile = max(1, int(np.sqrt(perMailbox)))
+    x, y = np.meshgrid(np.arange(width), np.arange(height), indexing="xy")
+    x, y = x.ravel(), y.ravel()
+    order = np.lexsort((x % tile, y % tile, x // tile, y // tile))
+    slots = np.empty(devices, dtype=np.int64)
+    slots[order] = np.arange(devices)
+
+    shuffled = generator.choice(devices, int(devices * shuffle),
+                                replace=False)
+    slots[shuffled] = slots[generator.permutation(shuffled)]
+
+    mailboxes = slots // perMailbox
+    threads = (slots % perMailbox) % threadsPerMailbox
+    return mailboxes, threads
+
+
+def generate_run(path: str, width: int=33, height: int=33,
+                 boxes: typing.Union[int, typing.Sequence[str]]=1,
+                 devicesPerThread: int=None, shuffle: float=0.05,
+                 seed: int=0, timestamp: str="2021-12-04T18-29-57",
+                 edgeCache: bool=True) -> Run:
+    """
+    Writes a synthetic placement dump into the directory at `path` (which is
+    created if needed), with all six files the Orchestrator writes, and the
+    edge cache. The application is a heated plate (as in example_data/): a
+    `width` by `height` grid of devices, each with an edge to and from each
+    neighbour, so there are 4 * width * height edges, give or take the
+    edges of the plate. Everything is generated with numpy, so millions of
+    devices are fine. Arguments:
+
+     - path: Directory to write to.
+     - width, height: Size of the plate.
+     - boxes: Number of boxes (up to eight), or a sequence of box names from
+           map.boxPositions.
+     - devicesPerThread: Maximum number of devices placed on each thread. By
+           default, the fewest that fits the plate onto the hardware.
+     - shuffle: Fraction of devices whose threads are swapped at random
+           after placement, so that there's something to look at.
+     - seed: Seed for the random number generator.
+     - timestamp: <TIMESTAMP> for the file names.
+     - edgeCache: Whether to write the edge cache, which holds two lines for
+           every pair of mailboxes (so is large for many boxes).
+
+    Returns the Run that was written, which can be passed to Data through its
+    `dataDir` and `timestamp`. Raises a ValueError if the plate does not fit
+    on the hardware.
+    """
+    generator = np.random.default_rng(seed)
+    prefixes = _box_prefixes(boxes)
+    hardware = Topology(prefixes)
+    devices = width * height
+    if devicesPerThread is None:
+        devicesPerThread = max(1, -(-devices // (len(hardware) *
+                                                  threadsPerMailbox)))
+    appname = "plate_{}x{}".format(width, height)
+    os.makedirs(path, exist_ok=True)
+    start = datetime.datetime.now()
+
+    # Devices, and where they're placed.
+    x, y = np.meshgrid(np.arange(width), np.arange(height), indexing="xy")
+    appnodes = np.array(["O_.PlateHeat.{}.c_{}_{}".format(appname, column,
+                                                           row)
+                         for column, row in zip(x.ravel().tolist(),
+                                                y.ravel().tolist())],
+                        dtype=object)
+    mailboxes, threads = _place(width, height, hardware, devicesPerThread,
+                                shuffle, generator)
+    threadAddresses = (hardware.addresses[mailboxes] |
+                       ((threads % coresPerMailbox)
+                        << address.fieldShifts["core"]) |
+                       ((threads // coresPerMailbox)
+                        << address.fieldShifts["thread"]))
+    hwnodes = address.unpack(threadAddresses, prefixes, "thread")
+
+    # Edges between neighbouring devices, both ways.
+    index = np.arange(devices).reshape(height, width)
+    pairs = [(index[:, :-1], index[:, 1:]), (index[:-1, :], index[1:, :])]
+    fromDevices = np.concatenate([np.concatenate((a.ravel(), b.ravel()))
+                                  for a, b in pairs])
+    toDevices = np.concatenate([np.concatenate((b.ravel(), a.ravel()))
+                                for a, b in pairs])
+    fromMailboxes = mailboxes[fromDevices]
+    toMailboxes = mailboxes[toDevices]
+    costs = np.where(fromMailboxes == toMailboxes, onMailboxCost,
+                     hardware.costs(fromMailboxes, toMailboxes))
+
+    # Loading.
+    coreAddresses, coreLoads = address.group_sum(threadAddresses, "core")
+    mailboxAddresses, mailboxLoads = address.group_sum(threadAddresses,
+                                                       "mailbox")
+    size = len(hardware)
+    pairCounts = np.bincount(fromMailboxes * size + toMailboxes,
+                             minlength=size * size)
+    usedPairs = np.flatnonzero(pairCounts)
+    hwEdgeLoads = hardware.route(usedPairs // size, usedPairs % size,
+                                 pairCounts[usedPairs])
+    hwFrom, hwTo = np.nonzero(hwEdgeLoads)
+
+    # Writing.
+    def _write(frame: pd.DataFrame, handle: str, mode: str="w") -> None:
+        frame.to_csv(os.path.join(path, handle), header=False, index=False,
+                     float_format="%g", mode=mode)
+
+    _write(pd.DataFrame({"from": appnodes[fromDevices],
+                         "to": appnodes[toDevices], "cost": costs}),
+           "placement_gi_edges_{}_{}.csv".format(appname, timestamp))
+    _write(pd.DataFrame({"appnode": appnodes, "hwnode": hwnodes}),
+           "placement_gi_to_hardware_{}_{}.csv".format(appname, timestamp))
+    order = np.argsort(threadAddresses, kind="stable")
+    _write(pd.DataFrame({"hwnode": hwnodes[order],
+                         "appnode": appnodes[order]}),
+           "placement_hardware_to_gi_{}_{}.csv".format(appname, timestamp))
+    _write(pd.DataFrame({"from": hardware.mailboxes[hwFrom],
+                         "to": hardware.mailboxes[hwTo],
+                         "load": hwEdgeLoads[hwFrom, hwTo]}),
+           "placement_edge_loading_{}.csv".format(timestamp))
+
+    nodeLoadingHandle = "placement_node_loading_{}.csv".format(timestamp)
+    with open(os.path.join(path, nodeLoadingHandle), "w") as nodeLoadingFile:
+        nodeLoadingFile.write("[core]\n")
+    _write(pd.DataFrame({"node": address.unpack(coreAddresses, prefixes,
+                                                 "core"),
+                         "load": coreLoads.astype(np.int64)}),
+           nodeLoadingHandle, mode="a")
+    with open(os.path.join(path, nodeLoadingHandle), "a") as nodeLoadingFile:
+        nodeLoadingFile.write("[mailbox]\n")
+    _write(pd.DataFrame({"node": address.unpack(mailboxAddresses, prefixes,
+                                                 "mailbox"),
+                         "load": mailboxLoads.astype(np.int64)}),
+           nodeLoadingHandle, mode="a")
+
+    if edgeCache:
+        _write_edge_cache(hardware, os.path.join(
+            path, "placement_edge_cache_{}.txt".format(timestamp)))
+
+    end = datetime.datetime.now()
+    with open(os.path.join(path, "placement_diagnostics_{}_{}.txt"
+                           .format(appname, timestamp)), "w") \
+            as diagnosticsFile:
+        diagnosticsFile.write(
+            "maxDevicesPerThread:{}\nmaxEdgeCost:{:g}\nmethod:synthetic\n"
+            "startTime:{}\nendTime:{}\nscore:{:g}\nargCount:0\n".format(
+                devicesPerThread, costs.max() if len(costs) else 0,
+                start.strftime(timestampFormat),
+                end.strftime(timestampFormat), costs.sum()))
+
+    return Run(path, appname, timestamp)
+
+
+def _write_edge_cache(hardware: Topology, path: str) -> None:
+    """
+    Writes the cost and path matrices between every pair of mailboxes in
+    `hardware` to `path`, in the Orchestrator's edge cache format.
+    """
+    size = len(hardware)
+    fromIds = np.repeat(np.arange(size), size)
+    toIds = np.tile(np.arange(size), size)
+    costs = hardware.costs(fromIds, toIds)
+    nextHops = np.where(fromIds == toIds, toIds,
+                        hardware.next_hops(fromIds, toIds))
+    names = hardware.mailboxes.tolist()
+
+    with open(path, "w") as cacheFile:
+        cacheFile.write("Cost cache matrix " + "+" * 61 + "\n")
+        for row in range(size):
+            cacheFile.writelines(
+                "{} -> {} = {:f}\n".format(names[row], names[column], cost)
+                for column, cost in enumerate(
+                    costs[row * size:(row + 1) * size].tolist()))
+        cacheFile.write("Cost cache matrix " + "-" * 61 + "\n")
+        cacheFile.write("Path matrix " + "+" * 67 + "\n")
+        for row in range(size):
+            cacheFile.writelines(
+                "{} -> {} = {}\n".format(names[row], names[column],
+                                         names[hop])
+                for column, hop in enumerate(
+                    nextHops[row * size:(row + 1) * size].tolist()))
+        cacheFile.write("Path matrix " + "-" * 67 + "\n")
@@ -0,0 +1,370 @@
+# A model of POETS hardware (boxes of boards of mailboxes), which works out
+# the costs the Orchestrator gives to edges between mailboxes (and so to
+# application edges) from where the mailboxes are, rather than from the
+# files it dumps.
+
+from .keys import *  # Sorry
+from .data import Data
+from .edgecache import EdgeCache, onMailboxCost
+from .map import boardSpacing, boxPositions, boxSpacingX, boxSpacingY
+from . import address
+
+import numpy as np
+import pandas as pd
+import typing
+
+# Shape of the hardware. Boards exist in a 3x2 grid in each box, mailboxes in
+# a 4x4 grid on each board, and each mailbox has four cores of sixteen
+# threads.
+boardsX = boxSpacingX
+boardsY = boxSpacingY
+mailboxesX = boardSpacing
+mailboxesY = boardSpacing
+coresPerMailbox = 4
+threadsPerCore = 16
+threadsPerMailbox = coresPerMailbox * threadsPerCore
+
+# Costs used by the Orchestrator: edges between nodes on the same mailbox cost
+# a little (see edgecache.onMailboxCost), each hop between mailboxes on a
+# board costs one, and each hop between boards costs eight.
+mailboxHopCost = 1
+boardHopCost = 8
+
+# Ways of counting hops between boards (see `Topology.costs`).
+methods = ("manhattan", "shortest")
+
+
+class Topology:
+    """
+    Every mailbox in some boxes, positioned as in map.py, with the costs of
+    (and routes for) messages between them. Mailbox ids are indices into
+    `addresses`, which are ordered by position (rows, then columns), so that
+    consecutive mailboxes are mostly neighbours.
+    """
+
+    # Box prefixes (O_.<ROOT>.<EXT>.<BOX>), as in `Data.boxes`; the box field
+    # of each packed address is an index into these.
+    prefixes = None
+
+    # Packed address (see address.py) and name of each mailbox, by id.
+    addresses = None
+    mailboxes = None
+
+    # Board co-ordinates across all boxes, and mailbox co-ordinates on the
+    # board, of each mailbox.
+    boardX = None
+    boardY = None
+    mailboxX = None
+    mailboxY = None
+
+    # Mailbox id from (board X, board Y, mailbox X, mailbox Y), or -1 where
+    # there's no box.
+    table = None
+
+    def __init__(self, prefixes: typing.Sequence[str]) -> None:
+        """
+        Constructs the hardware for boxes with these prefixes, whose <BOX>
+        names must be in map.boxPositions. Raises a ValueError if they aren't.
+        """
+        self.prefixes = list(prefixes)
+        names = [prefix.split(".")[-1] for prefix in self.prefixes]
+        unknown = [name for name in names if name not in boxPositions]
+        if unknown:
+            raise ValueError("Don't know where to put boxes '{}'."
+                             .format("', '".join(unknown)))
+
+        box, boardX, boardY, mailboxX, mailboxY = np.meshgrid(
+            np.arange(len(self.prefixes)), np.arange(boardsX),
+            np.arange(boardsY), np.arange(mailboxesX), np.arange(mailboxesY),
+            indexing="ij")
+        addresses = ((box.ravel().astype(np.int64)
+                      << address.fieldShifts["box"]) |
+                     (boardX.ravel() << address.fieldShifts["boardX"]) |
+                     (boardY.ravel() << address.fieldShifts["boardY"]) |
+                     (mailboxX.ravel() << address.fieldShifts["mailboxX"]) |
+                     (mailboxY.ravel() << address.fieldShifts["mailboxY"]))
+
+        # Board co-ordinates across all boxes.
+        base = np.array([boxPositions[name] for name in names],
+                        dtype=np.int64).reshape(-1, 2)
+        boxes = address.field(addresses, "box")
+        globalX = base[boxes, 0] * boardsX + address.field(addresses,
+                                                           "boardX")
+        globalY = base[boxes, 1] * boardsY + address.field(addresses,
+                                                           "boardY")
+        order = np.lexsort(
+            (address.field(addresses, "mailboxX"), globalX,
+             address.field(addresses, "mailboxY"), globalY))
+
+        self.addresses = addresses[order]
+        self.boardX = globalX[order]
+        self.boardY = globalY[order]
+        self.mailboxX = address.field(self.addresses, "mailboxX")
+        self.mailboxY = address.field(self.addresses, "mailboxY")
+        self.mailboxes = address.unpack(self.addresses, self.prefixes,
+                                        "mailbox")
+
+        self.table = np.full((self.boardX.max(initial=-1) + 1,
+                              self.boardY.max(initial=-1) + 1,
+                              mailboxesX, mailboxesY), -1, dtype=np.int64)
+        self.table[self.boardX, self.boardY, self.mailboxX,
+                   self.mailboxY] = np.arange(len(self.addresses))
+        if (self.table >= 0).sum() != len(self.addresses):
+            raise ValueError("Boxes '{}' overlap.".format(
+                "', '".join(names)))
+
+        self._order = np.argsort(self.addresses, kind="stable")
+        self._boardHops = None
+
+    @classmethod
+    def from_data(cls, data: Data) -> "Topology":
+        """
+        Constructs the hardware for every box in a Data object, so that
+        packed addresses in `data.addresses` can be looked up with `ids`.
+        Raises a ValueError if the boxes can't be positioned.
+        """
+        # Make sure every box has been seen (and interned) first.
+        data.addresses[(keyNodeLoadingMbox, "node")]
+        data.addresses[(keyAppToHw, "hwnode")]
+        return cls(data.boxes)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def ids(self, addresses: np.ndarray) -> np.ndarray:
+        """
+        Returns the id of the mailbox each packed address (at the mailbox
+        level or below) is on, or -1 for addresses that aren't on any of our
+        mailboxes.
+        """
+        mailboxes = address.truncate(np.asarray(addresses, dtype=np.int64),
+                                     "mailbox")
+        sortedAddresses = self.addresses[self._order]
+        rows = np.minimum(np.searchsorted(sortedAddresses, mailboxes),
+                          len(sortedAddresses) - 1)
+        found = (sortedAddresses[rows] == mailboxes) & (mailboxes >= 0)
+        return np.where(found, self._order[rows], -1)
+
+    def board_hops(self) -> np.ndarray:
+        """
+        Returns (and caches) the fewest hops between each pair of boards
+        (indexed by global board co-ordinates, as a (X, Y, X, Y) array),
+        going only through boards that exist. Boards that can't reach each
+        other are -1 hops apart.
+
+        All boards are searched from at once, one hop at a time, with
+        boolean matrix products.
+        """
+        if self._boardHops is None:
+            present = (self.table >= 0).any(axis=(2, 3))
+            sizeX, sizeY = present.shape
+            boards = np.flatnonzero(present.ravel())
+            x, y = np.divmod(boards, sizeY)
+            adjacent = (np.abs(x[:, np.newaxis] - x) +
+                        np.abs(y[:, np.newaxis] - y)) == 1
+            hops = np.where(np.eye(len(boards), dtype=bool), 0, -1)
+            reached = np.eye(len(boards), dtype=bool)
+            distance = 0
+            while True:
+                distance += 1
+                frontier = (reached.astype(np.int64) @
+                            adjacent.astype(np.int64) > 0) & ~reached
+                if not frontier.any():
+                    break
+                hops[frontier] = distance
+                reached |= frontier
+            out = np.full((sizeX, sizeY, sizeX, sizeY), -1, dtype=np.int64)
+            out[x[:, np.newaxis], y[:, np.newaxis], x, y] = hops
+            self._boardHops = out
+        return self._boardHops
+
+    def costs(self, fromIds: np.ndarray, toIds: np.ndarray,
+              method: str="manhattan") -> np.ndarray:
+        """
+        Returns the cost of sending a message between each pair of mailboxes
+        (by id): the number of hops between mailboxes on the same board, or a
+        fixed cost per hop between boards otherwise. Arguments:
+
+         - fromIds, toIds: Arrays of mailbox ids.
+         - method: String, either "manhattan" (the default), where boards are
+               as many hops apart as their Manhattan distance, as the
+               Orchestrator assumes, or "shortest", where hops can only go
+               through boards that exist (see `board_hops`), so gaps between
+               boxes are routed around. The two agree if there are no gaps.
+               Pairs that can't reach each other cost NaN.
+
+        Returns the costs as a float64 array. Like the edge cache, pairs on
+        the same mailbox cost zero.
+        """
+        if method not in methods:
+            raise ValueError("Argument 'method' must be either 'manhattan' "
+                             "or 'shortest'.")
+        fromIds = np.asarray(fromIds)
+        toIds = np.asarray(toIds)
+        if method == "manhattan":
+            boardHops = (np.abs(self.boardX[fromIds] - self.boardX[toIds]) +
+                         np.abs(self.boardY[fromIds] - self.boardY[toIds]))
+        else:
+            boardHops = self.board_hops()[
+                self.boardX[fromIds], self.boardY[fromIds],
+                self.boardX[toIds], self.boardY[toIds]]
+        mailboxHops = (np.abs(self.mailboxX[fromIds] - self.mailboxX[toIds]) +
+                       np.abs(self.mailboxY[fromIds] - self.mailboxY[toIds]))
+        out = np.where(boardHops != 0, boardHops * boardHopCost,
+                       mailboxHops * mailboxHopCost).astype(np.float64)
+        out[boardHops < 0] = np.nan
+        return out
+
+    def cost_matrix(self, method: str="manhattan") -> np.ndarray:
+        """
+        Returns the cost between every pair of mailboxes (see `costs`), as a
+        dense (mailbox x mailbox) float64 matrix indexed by id, like
+        `EdgeCache.matrix`.
+        """
+        size = len(self)
+        fromIds, toIds = np.divmod(np.arange(size * size), size)
+        return self.costs(fromIds, toIds, method).reshape(size, size)
+
+    def next_hops(self, fromIds: np.ndarray, toIds: np.ndarray) \
+            -> np.ndarray:
+        """
+        Returns the next mailbox (by id) on the route between each pair of
+        mailboxes. Between boards, messages hop straight to the mailbox in
+        the same place as the destination on the next board (moving in Y
+        first, unless there's no board there), and then route within the
+        board in X, then Y.
+        """
+        def _step(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+            return source + np.sign(target - source)
+
+        boardX, boardY = self.boardX[fromIds], self.boardY[fromIds]
+        toBoardX, toBoardY = self.boardX[toIds], self.boardY[toIds]
+        mailboxX, mailboxY = self.mailboxX[toIds], self.mailboxY[toIds]
+
+        # Between boards.
+        moveY = self.table[boardX, _step(boardY, toBoardY), mailboxX,
+                           mailboxY]
+        moveX = self.table[_step(boardX, toBoardX), boardY, mailboxX,
+                           mailboxY]
+        out = np.where((boardY != toBoardY) & (moveY >= 0), moveY, moveX)
+
+        # On the same board.
+        sameBoard = (boardX == toBoardX) & (boardY == toBoardY)
+        fromX, fromY = self.mailboxX[fromIds], self.mailboxY[fromIds]
+        stepX = fromX != mailboxX
+        local = self.table[boardX, boardY,
+                           np.where(stepX, _step(fromX, mailboxX), fromX),
+                           np.where(stepX, fromY, _step(fromY, mailboxY))]
+        return np.where(sameBoard, local, out)
+
+    def route(self, fromIds: np.ndarray, toIds: np.ndarray,
+              weights: np.ndarray) -> np.ndarray:
+        """
+        Routes `weights` messages between each pair of mailboxes, one hop at a
+        time for all pairs at once. Raises a ValueError if a route runs into
+        a gap between boxes.
+
+        Returns a (N,N) array of the number of messages sent over each
+        hardware edge.
+        """
+        size = len(self)
+        loads = np.zeros(size * size, dtype=np.int64)
+        moving = fromIds != toIds
+        current, toIds, weights = fromIds[moving], toIds[moving], \
+            weights[moving]
+        while len(current):
+            nextHops = self.next_hops(current, toIds)
+            if ((nextHops < 0) | (nextHops == current)).any():
+                raise ValueError("Can't route between boxes '{}'; there are "
+                                 "gaps between them.".format(
+                                     "', '".join(self.prefixes)))
+            loads += np.bincount(current * size + nextHops, weights=weights,
+                                 minlength=size * size).astype(np.int64)
+            moving = nextHops != toIds
+            current, toIds, weights = nextHops[moving], toIds[moving], \
+                weights[moving]
+        return loads.reshape(size, size)
+
+
+def edge_costs(data: Data, topology: Topology=None,
+               method: str="manhattan") -> np.ndarray:
+    """
+    Works out the cost of every application edge from where its ends are
+    placed, all at once. Arguments:
+
+     - data: A placement_processing Data object with loaded data.
+     - topology: The hardware. Defaults to `Topology.from_data(data)`.
+     - method: As for `Topology.costs`.
+
+    Returns the costs as a float64 array, in the same order as the rows of
+    `data.frames[keyAppEdgeCosts]`. Edges between nodes on the same mailbox
+    cost `edgecache.onMailboxCost`, and edges with an end that isn't placed
+    cost NaN.
+    """
+    topology = Topology.from_data(data) if topology is None else topology
+    graph = data.graph("application")
+    mailboxIds = topology.ids(graph.addresses)
+    fromIds = np.append(mailboxIds, -1)[graph.edgeFrom]
+    toIds = np.append(mailboxIds, -1)[graph.edgeTo]
+    known = (fromIds >= 0) & (toIds >= 0)
+    out = np.full(graph.edgeCount, np.nan)
+    out[known] = topology.costs(fromIds[known], toIds[known], method)
+    out[known & (fromIds == toIds)] = onMailboxCost
+    return out
+
+
+def check_edge_costs(data: Data, topology: Topology=None,
+                     method: str="manhattan",
+                     tolerance: float=1e-6) -> pd.DataFrame:
+    """
+    Compares the cost of every application edge, as dumped by the
+    Orchestrator, with the cost worked out from the topology (see
+    `edge_costs`).
+
+    Returns a dataframe of the application edges whose costs differ by more
+    than `tolerance` (or that couldn't be costed), with the columns of the
+    application edge costs dataframe (`headers[keyAppEdgeCosts]`) and a
+    "computed" column, indexed by row in that dataframe. It's empty if
+    everything agrees.
+    """
+    frame = data.frames[keyAppEdgeCosts]
+    computed = edge_costs(data, topology, method)
+    dumped = frame["cost"].to_numpy(dtype=np.float64)
+    wrong = ~(np.abs(computed - dumped) <= tolerance)
+    out = frame[wrong].copy()
+    out["computed"] = computed[wrong]
+    return out
+
+
+def check_edge_cache(edgeCache: EdgeCache, topology: Topology,
+                     method: str="manhattan",
+                     tolerance: float=1e-4) -> pd.DataFrame:
+    """
+    Compares every cost in an edge cache (see edgecache.py) with the cost
+    worked out from `topology`, whose prefixes must include every box in the
+    cache.
+
+    Returns a dataframe with one row per pair of mailboxes whose costs differ
+    by more than `tolerance` (or that aren't in both), with columns "from",
+    "to", "cached" and "computed". It's empty if everything agrees.
+    """
+    boxes = list(topology.prefixes)
+    cacheAddresses = address.pack(
+        pd.Series(edgeCache.mailboxes, dtype=object), boxes)
+    if len(boxes) != len(topology.prefixes):
+        raise ValueError("The edge cache has boxes '{}', which aren't in the "
+                         "topology.".format("', '".join(
+                             boxes[len(topology.prefixes):])))
+    ids = topology.ids(cacheAddresses)
+    size = len(edgeCache)
+    fromRows, toRows = np.divmod(np.arange(size * size), size)
+    cached = np.asarray(edgeCache.matrix, dtype=np.float64).ravel()
+    computed = np.full(size * size, np.nan)
+    known = (ids[fromRows] >= 0) & (ids[toRows] >= 0)
+    computed[known] = topology.costs(ids[fromRows[known]],
+                                     ids[toRows[known]], method)
+    wrong = np.flatnonzero(~(np.abs(computed - cached) <= tolerance))
+    return pd.DataFrame({"from": edgeCache.mailboxes[fromRows[wrong]],
+                         "to": edgeCache.mailboxes[toRows[wrong]],
+                         "cached": cached[wrong],
+                         "computed": computed[wrong]})
@@ -0,0 +1,303 @@
+# Functions and a class that check the files dumped by the Orchestrator for a
+# placement run agree with each other: that both mappings hold the same
+# application nodes on the same threads, that node loading counts the
+# devices on each core and mailbox, and that every edge ends somewhere that
+# exists. Each check works on whole columns at once (interning, set
+# membership and bincounts), so it costs little next to reading the files.
+
+from .keys import *  # Sorry
+from . import address
+
+import numpy as np
+import pandas as pd
+import typing
+
+# Checks that can be run, in the order they're run.
+checks = ("mapping", "core loading", "mailbox loading", "application edges",
+          "hardware edges")
+
+# Dataframes each check reads. Data objects run each check as soon as all of
+# its dataframes have been loaded.
+checkFrames = {"mapping": (keyAppToHw, keyHwToApp),
+               "core loading": (keyNodeLoadingCore, keyAppToHw),
+               "mailbox loading": (keyNodeLoadingMbox, keyAppToHw),
+               "application edges": (keyAppEdgeCosts, keyAppToHw),
+               "hardware edges": (keyHwEdgeLoading,)}
+
+# Offending rows shown for each check when a report is printed.
+shownRows = 5
+
+
+class Report:
+    """
+    The result of checking a placement run (see `check`): the offending rows
+    found by each check, as a dataframe with the columns of the file they
+    came from, plus a "problem" column saying what's wrong with each row.
+    """
+
+    # Names of the checks that were run.
+    checks = None
+
+    # Checks that found problems, mapped to a dataframe of offending rows.
+    problems = None
+
+    def __init__(self, checks: typing.Iterable[str]) -> None:
+        self.checks = tuple(checks)
+        self.problems = {}
+
+    @property
+    def ok(self) -> bool:
+        """Whether no check found any problems."""
+        return not self.problems
+
+    def __str__(self) -> str:
+        if self.ok:
+            return "No problems found by {} check(s).".format(
+                len(self.checks))
+        lines = []
+        for name, rows in self.problems.items():
+            lines.append("{}: {} offending row(s).".format(name, len(rows)))
+            for problem, count in rows["problem"].value_counts(
+                    sort=False).items():
+                lines.append("  {} x {}".format(count, problem))
+            lines.append(rows.head(shownRows).to_string(max_colwidth=60))
+        return "\n".join(lines)
+
+
+def _offending(frame: pd.DataFrame,
+               problems: typing.Iterable[typing.Tuple[np.ndarray, str]],
+               extra: typing.Dict[str, np.ndarray]=None) -> pd.DataFrame:
+    """
+    Picks the offending rows out of `frame`. Arguments:
+
+     - frame: The dataframe being checked.
+     - problems: Tuples of (boolean array over the rows of `frame`,
+           description of the problem with the rows that are True).
+     - extra: Columns to add to `frame` (e.g. what a column should have
+           been), as arrays over its rows.
+
+    Returns a dataframe of the offending rows, with a "problem" column. Rows
+    with more than one problem appear once for each.
+    """
+    pieces = []
+    for mask, problem in problems:
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            continue
+        piece = frame.iloc[rows].copy()
+        for column, values in (extra or {}).items():
+            piece[column] = values[rows]
+        piece["problem"] = problem
+        pieces.append(piece)
+    return pd.concat(pieces) if pieces else frame.iloc[:0]
+
+
+def _codes(names: pd.Series, index: pd.Index) -> np.ndarray:
+    """
+    Returns the position of each of `names` (a categorical series) in
+    `index`, or -1 for names that aren't in it. Each distinct name is only
+    looked up once.
+    """
+    codes = names.cat.codes.to_numpy().astype(np.int64)
+    categories = names.cat.categories
+
+    # Files that name the same nodes have the same (sorted) categories, which
+    # are quicker to compare than to look up.
+    if len(categories) == len(index) and np.array_equal(
+            np.asarray(categories, dtype=object),
+            np.asarray(index, dtype=object)):
+        return codes
+    lookup = index.get_indexer(categories)
+    return np.where(codes >= 0, lookup[codes], -1)
+
+
+def check_mapping(data: "Data") -> pd.DataFrame:
+    """
+    Checks that the application to hardware mapping and the hardware to
+    application mapping hold the same (application node, thread) pairs, that
+    each application node is mapped only once, and that every hardware name
+    can be understood.
+
+    Returns a dataframe of offending rows from either mapping, with a "file"
+    column saying which.
+    """
+    appToHw = data.frames[keyAppToHw]
+    hwToApp = data.frames[keyHwToApp]
+
+    # Application nodes are numbered by the categories of the first
+    # mapping, and threads are compared by their packed addresses.
+    appnodes = appToHw["appnode"].cat.categories
+    appIds = (appToHw["appnode"].cat.codes.to_numpy().astype(np.int64),
+              _codes(hwToApp["appnode"], appnodes))
+    threads = (data.addresses[(keyAppToHw, "hwnode")],
+               data.addresses[(keyHwToApp, "hwnode")])
+    valid = [(appIds[side] >= 0) & (threads[side] >= 0) for side in (0, 1)]
+
+    # The thread of each application node in each mapping, and the number
+    # of times it's mapped there (-1 ids land on the spare slot at the end).
+    threadOf = []
+    mapped = []
+    for side in (0, 1):
+        threadOf.append(np.full(len(appnodes) + 1, -1, dtype=np.int64))
+        threadOf[side][appIds[side][valid[side]]] = \
+            threads[side][valid[side]]
+        mapped.append(np.bincount(appIds[side][appIds[side] >= 0],
+                                  minlength=len(appnodes) + 1))
+
+    out = []
+    for side, (key, frame, otherKey) in enumerate(
+            ((keyAppToHw, appToHw, keyHwToApp),
+             (keyHwToApp, hwToApp, keyAppToHw))):
+        other = 1 - side
+        inOther = valid[side] & \
+            (threadOf[other][appIds[side]] == threads[side])
+
+        # Nodes mapped more than once in the other mapping are looked up
+        # pair by pair; there should be none of those.
+        ambiguous = np.flatnonzero(valid[side] &
+                                   (mapped[other][appIds[side]] > 1))
+        if len(ambiguous):
+            repeated = mapped[other][appIds[other]] > 1
+            otherPairs = set(zip(appIds[other][repeated].tolist(),
+                                 threads[other][repeated].tolist()))
+            inOther[ambiguous] = [
+                pair in otherPairs for pair in
+                zip(appIds[side][ambiguous].tolist(),
+                    threads[side][ambiguous].tolist())]
+
+        offending = _offending(frame, (
+            (threads[side] < 0, "hardware name not understood"),
+            (valid[side] & ~inOther, "not in the {}".format(otherKey)),
+            ((appIds[side] >= 0) & (mapped[side][appIds[side]] > 1),
+             "application node mapped more than once")))
+        if len(offending):
+            offending.insert(0, "file", key)
+            out.append(offending)
+    return pd.concat(out) if out else pd.DataFrame()
+
+
+def check_loading(data: "Data", level: str="core") -> pd.DataFrame:
+    """
+    Checks that the node loading at `level` ("core" or "mailbox") gives the
+    number of application nodes mapped to each core or mailbox (in the
+    application to hardware mapping), and that every core or mailbox with
+    nodes on it is listed.
+
+    Returns a dataframe of offending rows from the node loading, with a
+    "devices" column holding the number of nodes that are mapped there.
+    Cores or mailboxes missing from the node loading are included with no
+    load.
+    """
+    key = {"core": keyNodeLoadingCore, "mailbox": keyNodeLoadingMbox}[level]
+    loading = data.frames[key]
+    loadAddresses = data.addresses[(key, "node")]
+    used, devices = address.group_sum(
+        data.addresses[(keyAppToHw, "hwnode")], level)
+    devices = devices.astype(np.int64)
+
+    # Devices on each row's core or mailbox, through a sorted lookup.
+    expected = np.zeros(len(loading), dtype=np.int64)
+    if len(used):
+        rows = np.minimum(np.searchsorted(used, loadAddresses), len(used) - 1)
+        found = (used[rows] == loadAddresses) & (loadAddresses >= 0)
+        expected[found] = devices[rows[found]]
+    offending = _offending(loading, (
+        (loadAddresses < 0, "hardware name not understood"),
+        ((loadAddresses >= 0) &
+         (loading["load"].to_numpy() != expected),
+         "load is not the number of devices mapped there"),
+        (pd.Series(loadAddresses).duplicated(keep=False).to_numpy() &
+         (loadAddresses >= 0), "listed more than once")),
+        {"devices": expected})
+
+    missing = ~np.isin(used, loadAddresses)
+    if missing.any():
+        offending = pd.concat((offending, pd.DataFrame(
+            {"node": address.unpack(used[missing], data.boxes, level),
+             "devices": devices[missing],
+             "problem": "has devices, but no load"})))
+    return offending
+
+
+def check_application_edges(data: "Data") -> pd.DataFrame:
+    """
+    Checks that both ends of every application edge are application nodes
+    in the application to hardware mapping.
+
+    Returns a dataframe of offending application edges.
+    """
+    edges = data.frames[keyAppEdgeCosts]
+    appnodes = data.frames[keyAppToHw]["appnode"].cat.categories
+    return _offending(edges, [
+        (_codes(edges[column], appnodes) < 0,
+         "'{}' is not in the application to hardware mapping"
+         .format(column))
+        for column in ("from", "to")])
+
+
+def check_hardware_edges(data: "Data") -> pd.DataFrame:
+    """
+    Checks that both ends of every mailbox edge are mailboxes that exist:
+    their names can be understood, and their boards and mailboxes are within
+    a box (see topology.py).
+
+    Returns a dataframe of offending mailbox edges.
+    """
+    # topology.py imports data.py, which imports us.
+    from .topology import boardsX, boardsY, mailboxesX, mailboxesY
+    edges = data.frames[keyHwEdgeLoading]
+    problems = []
+    for column in ("from", "to"):
+        addresses = data.addresses[(keyHwEdgeLoading, column)]
+        inBox = ((address.field(addresses, "boardX") < boardsX) &
+                 (address.field(addresses, "boardY") < boardsY) &
+                 (address.field(addresses, "mailboxX") < mailboxesX) &
+                 (address.field(addresses, "mailboxY") < mailboxesY))
+        problems.append((addresses < 0, "'{}' hardware name not understood"
+                         .format(column)))
+        problems.append(((addresses >= 0) & ~inBox,
+                         "'{}' is not a mailbox in its box".format(column)))
+    return _offending(edges, problems)
+
+
+def check(data: "Data", checks: typing.Iterable[str]=checks,
+          report: Report=None) -> Report:
+    """
+    Checks that the files of a placement run agree with each other.
+    Arguments:
+
+     - data: A placement_processing Data object. Dataframes the checks need
+           are loaded, if they aren't already.
+     - checks: Names of the checks to run (see `checks`): "mapping" (see
+           check_mapping), "core loading" and "mailbox loading" (see
+           check_loading), "application edges" (see
+           check_application_edges), and "hardware edges" (see
+           check_hardware_edges).
+     - report: A Report to add the results to, or None for a new one.
+
+    Returns the Report.
+    """
+    functions = {"mapping": check_mapping,
+                 "core loading": lambda data: check_loading(data, "core"),
+                 "mailbox loading": lambda data: check_loading(data,
+                                                               "mailbox"),
+                 "application edges": check_application_edges,
+                 "hardware edges": check_hardware_edges}
+    checks = tuple(checks)
+    for name in checks:
+        if name not in functions:
+            raise ValueError("Check '{}' must be one of '{}'."
+                             .format(name, "', '".join(functions)))
+    if report is None:
+        report = Report(checks)
+    else:
+        report.checks += tuple(name for name in checks
+                               if name not in report.checks)
+    for name in checks:
+        with data.stats.stage("validate {}".format(name)):
+            offending = functions[name](data)
+        if len(offending):
+            report.problems[name] = offending.reset_index(drop=True)
+        else:
+            report.problems.pop(name, None)
+    return report
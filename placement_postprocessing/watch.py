@@ -0,0 +1,352 @@
+# A class that watches directory trees for placement runs as the Orchestrator
+# writes them, and draws pictures for each one once its files have stopped
+# changing. Run with `python -m placement_postprocessing --watch PATH`.
+
+from .collection import RunCollection, Run
+from . import cli
+
+import concurrent.futures
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import sys
+import time
+import typing
+
+# Seconds between scans of the directory trees (at most; with inotify, trees
+# that aren't changing aren't scanned at all).
+defaultInterval = 2.0
+
+# Seconds that the files of a run must stay the same size (and modification
+# time) before the run is drawn, so that half-written files aren't read.
+defaultSettle = 5.0
+
+# Events that wake a watcher using inotify (see inotify(7)): files being
+# written, created, moved or deleted, in the watched directories.
+_inModify = 0x00000002
+_inCloseWrite = 0x00000008
+_inMovedFrom = 0x00000040
+_inMovedTo = 0x00000080
+_inCreate = 0x00000100
+_inDelete = 0x00000200
+_inIgnored = 0x00008000  # The watch was removed (e.g. directory deleted)
+_inOnlyDir = 0x01000000
+_inotifyMask = (_inModify | _inCloseWrite | _inMovedFrom | _inMovedTo |
+                _inCreate | _inDelete | _inOnlyDir)
+
+# Header of each inotify event: watch descriptor, mask, cookie, name length.
+_inotifyEvent = struct.Struct("iIII")
+
+
+class _Inotify:
+    """
+    Waits for anything to change in some directory trees, through Linux's
+    inotify (called through ctypes, so nothing needs installing).
+    Constructing one raises an OSError if inotify is not available.
+    """
+
+    def __init__(self) -> None:
+        libraryPath = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libraryPath, use_errno=True) \
+            if libraryPath is not None else None
+        if libc is None or not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this system.")
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watches = {}  # Watch descriptor -> directory
+        self._directories = set()
+
+    def watch(self, paths: typing.Iterable[str]) -> None:
+        """
+        Watches every directory under `paths` that isn't watched already.
+        """
+        for path in paths:
+            for directory, _, _ in os.walk(path):
+                if directory in self._directories:
+                    continue
+                descriptor = self._libc.inotify_add_watch(
+                    self.fd, os.fsencode(directory), _inotifyMask)
+                if descriptor < 0:  # Gone already; scans will notice.
+                    continue
+                self._watches[descriptor] = directory
+                self._directories.add(directory)
+
+    def wait(self, timeout: float=None) -> bool:
+        """
+        Waits until something changes, or `timeout` seconds pass (forever, if
+        `timeout` is None).
+
+        Returns whether anything changed.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+
+        # We only care that something changed, not what, except that
+        # directories that have gone need watching again if they come back.
+        while True:
+            try:
+                events = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return True
+            offset = 0
+            while offset < len(events):
+                descriptor, mask, _, length = \
+                    _inotifyEvent.unpack_from(events, offset)
+                offset += _inotifyEvent.size + length
+                if mask & _inIgnored:
+                    self._directories.discard(
+                        self._watches.pop(descriptor, None))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _init_worker() -> None:
+    """
+    Sets up a worker process for drawing (see cli._init_worker), leaving
+    Ctrl-C to the watcher, which lets the workers finish what they're doing.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cli._init_worker()
+
+
+class Watcher:
+    """
+    Watches directory trees for placement runs (see RunCollection), and draws
+    pictures for each complete run (see cli.render_run) across a pool of
+    worker processes, once all of its files have stayed the same for a while.
+    Runs are drawn again if their files change after they've been drawn.
+
+    Directories are scanned every so often, or (on Linux) when inotify says
+    something in them has changed. Only a bounded number of runs are queued
+    for the workers at once; the rest wait their turn, so a flood of new runs
+    doesn't pile up in memory.
+    """
+
+    # The directory trees we're watching.
+    paths = None
+
+    # Arguments for cli.render_run (other than the run), and the root
+    # directory passed to cli.output_dir.
+    renderArgs = None
+    outputRoot = None
+
+    # Seconds between scans, and seconds that files must stay the same.
+    interval = defaultInterval
+    settle = defaultSettle
+
+    # Number of worker processes.
+    processes = None
+
+    # Most runs being drawn (or queued for the workers) at once.
+    queueSize = None
+
+    # Complete runs whose files are still changing, or are waiting for a
+    # worker, mapped to a tuple of (signature of their files, time the
+    # signature last changed, from time.monotonic).
+    pending = None
+
+    # Runs that have been drawn (or failed), mapped to the signature of their
+    # files when they were.
+    rendered = None
+
+    # Runs that have been drawn, mapped to the timings returned by
+    # cli.render_run, or the exception raised.
+    results = None
+
+    def __init__(self, paths: typing.Iterable[str], outputRoot: str=None,
+                 extension: str="pdf", force: bool=False,
+                 draw: typing.Iterable[str]=None, stats: bool=None,
+                 processes: int=None, queueSize: int=None,
+                 interval: float=defaultInterval,
+                 settle: float=defaultSettle, existing: bool=True,
+                 inotify: bool=None, log: typing.TextIO=sys.stdout) -> None:
+        """
+        Constructs a watcher for the directory trees at `paths`. Arguments:
+
+         - outputRoot, extension, force, draw, stats: As for cli.render.
+         - processes: Number of worker processes. Defaults to one per CPU.
+         - queueSize: Most runs given to the workers at once. Defaults to
+               twice the number of processes.
+         - interval: Seconds between scans.
+         - settle: Seconds the files of a run must stay the same before it is
+               drawn.
+         - existing: Whether to draw runs that are already there on the first
+               scan (otherwise, only new or changed runs are drawn).
+         - inotify: Whether to use inotify to notice changes. If None, uses
+               it if it's available, and scans every `interval` otherwise.
+               If True, raises an OSError if it's not available.
+         - log: Where to write a line as each run is drawn.
+        """
+        self.paths = list(paths)
+        self.outputRoot = outputRoot
+        self.renderArgs = (extension, force, draw, stats)
+        self.processes = processes if processes is not None \
+            else os.cpu_count() or 1
+        self.queueSize = queueSize if queueSize is not None \
+            else 2 * self.processes
+        if self.queueSize < 1:
+            raise ValueError("Argument 'queueSize' must be at least one.")
+        self.interval = interval
+        self.settle = settle
+        self.existing = existing
+        self.log = log
+        self.pending = {}
+        self.rendered = {}
+        self.results = {}
+        self._running = {}  # Future -> (run, signature)
+        self._scans = 0
+
+        self._inotify = None
+        if inotify is not False:
+            try:
+                self._inotify = _Inotify()
+            except OSError:
+                if inotify:
+                    raise
+
+    def _signature(self, run: Run, files: typing.Dict[str, str]) \
+            -> typing.Optional[tuple]:
+        """
+        Returns the names, sizes and modification times of the files of
+        `run`, or None if any of them have gone.
+        """
+        signature = []
+        for handle in sorted(files.values()):
+            try:
+                status = os.stat(os.path.join(run.dataDir, handle))
+            except FileNotFoundError:
+                return None
+            signature.append((handle, status.st_size, status.st_mtime_ns))
+        return tuple(signature)
+
+    def scan(self) -> typing.List[Run]:
+        """
+        Scans the directory trees once, noting new and changed runs in
+        `self.pending`.
+
+        Returns the pending runs whose files have settled, oldest first.
+        """
+        now = time.monotonic()
+        complete = set()
+        for path in self.paths:
+            collection = RunCollection(path)
+            for run in collection.runs:
+                signature = self._signature(run, collection.files[run])
+                if signature is None:
+                    continue
+                complete.add(run)
+                if self._scans == 0 and not self.existing:
+                    self.rendered[run] = signature
+                if self.rendered.get(run) == signature:
+                    self.pending.pop(run, None)
+                    continue
+                if run not in self.pending or \
+                        self.pending[run][0] != signature:
+                    self.pending[run] = (signature, now)
+        self._scans += 1
+
+        # Forget runs that have gone, or lost a file.
+        for run in [run for run in self.pending if run not in complete]:
+            del self.pending[run]
+
+        running = {run for run, _ in self._running.values()}
+        return sorted((run for run, (_, changed) in self.pending.items()
+                       if now - changed >= self.settle and
+                       run not in running),
+                      key=lambda run: self.pending[run][1])
+
+    def _finish(self, future: concurrent.futures.Future) -> None:
+        """
+        Records (and logs) the result of a run the workers have finished.
+        """
+        run, signature = self._running.pop(future)
+        try:
+            self.results[run] = future.result()
+        except Exception as error:
+            self.results[run] = error
+        self.rendered[run] = signature
+        self.log.write(cli.format_result(run, self.results[run]) + "\n")
+        self.log.flush()
+
+    def poll(self, pool: concurrent.futures.Executor) -> None:
+        """
+        Collects runs the workers in `pool` have finished drawing, scans the
+        directory trees, and gives the workers as many settled runs as the
+        queue has room for.
+        """
+        for future in [future for future in self._running
+                       if future.done()]:
+            self._finish(future)
+
+        for run in self.scan():
+            if len(self._running) >= self.queueSize:
+                break  # The rest wait for the next poll.
+            signature = self.pending.pop(run)[0]
+            future = pool.submit(cli.render_run, run,
+                                 cli.output_dir(run, self.outputRoot),
+                                 *self.renderArgs)
+            self._running[future] = (run, signature)
+
+    def _wait(self, timeout: typing.Optional[float]) -> None:
+        """
+        Waits until the next poll is due: until something changes (with
+        inotify) or `timeout` seconds pass, but at least `interval` seconds
+        after the last poll began.
+        """
+        if self._inotify is None:
+            time.sleep(self.interval if timeout is None
+                       else min(self.interval, timeout))
+            return
+
+        # Runs settling, or being drawn, need looking at again even if
+        # nothing changes on disk.
+        if self.pending or self._running:
+            timeout = self.interval if timeout is None \
+                else min(self.interval, timeout)
+        self._inotify.watch(self.paths)
+        self._inotify.wait(timeout)
+
+    def watch(self, duration: float=None) \
+            -> typing.Dict[Run, typing.Union[dict, Exception]]:
+        """
+        Watches the directory trees until interrupted (with Ctrl-C), or for
+        `duration` seconds if it is given, then waits for the workers to
+        finish the runs they've been given.
+
+        Returns `self.results`.
+        """
+        start = time.monotonic()
+        pool = concurrent.futures.ProcessPoolExecutor(
+            self.processes, initializer=_init_worker)
+        try:
+            while True:
+                pollStart = time.monotonic()
+                self.poll(pool)
+                now = time.monotonic()
+                if duration is not None and now - start >= duration:
+                    break
+                self._wait(None if duration is None
+                           else start + duration - now)
+                # Don't scan more often than every `interval`, however busy
+                # the directories are.
+                time.sleep(max(0, pollStart + self.interval -
+                               time.monotonic()))
+        except KeyboardInterrupt:
+            self.log.write("Stopping; waiting for {} run(s) being drawn.\n"
+                           .format(len(self._running)))
+        finally:
+            pool.shutdown(wait=True)
+            for future in list(self._running):
+                self._finish(future)
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+        return self.results
@@ -0,0 +1,317 @@
+# A class that evaluates what happens to a placement when application nodes
+# are moved, without rebuilding anything from scratch.
+
+from .keys import *  # Sorry
+from .data import Data
+from .edgecache import EdgeCache, onMailboxCost
+from .topology import Topology
+from . import address
+
+import collections
+import numpy as np
+import pandas as pd
+import typing
+
+
+class Summary(typing.NamedTuple):
+    """
+    Numbers describing the current state of a MoveEvaluator. See
+    `MoveEvaluator.summary`.
+    """
+    moves: int
+    totalEdgeCost: float
+    meanEdgeCost: float
+    maxEdgeCost: float
+    onMailboxFraction: float
+    crossingEdges: int
+    mailboxesUsed: int
+    maxMailboxLoad: int
+    coresUsed: int
+    maxCoreLoad: int
+    maxPairLoad: int
+
+
+class MoveEvaluator:
+    """
+    A placement that can be changed, by moving application nodes to other
+    threads (or swapping them), starting from the placement in a Data object.
+    Mailbox and core loading, the cost of every application edge (from the
+    edge cost cache), and the number of application edges between each
+    (ordered) pair of mailboxes are kept up to date as nodes move.
+
+    Each batch of moves only touches the application edges of the nodes that
+    moved (found through `Data.graph`), so it takes time proportional to
+    those edges, not to the size of the application.
+    """
+
+    # The Data object we started from.
+    data = None
+
+    # The application graph (see graph.py). Node ids are used throughout.
+    graph = None
+
+    # Mailbox-to-mailbox edge costs: an EdgeCache (see edgecache.py), or a
+    # Topology (see topology.py) if the run has no edge cache. Mailbox ids
+    # are ids into this.
+    edgeCache = None
+
+    # Packed thread address (see address.py) of each application node, by
+    # node id, or -1 if it's not placed.
+    placement = None
+
+    # Mailbox id of each application node, or -1.
+    mailboxIds = None
+
+    # Cost of each application edge, by edge id, or NaN if either end is not
+    # on a mailbox in the edge cache.
+    edgeCosts = None
+
+    # Number of application nodes on each mailbox, by mailbox id, counting
+    # every node in the application to hardware mapping.
+    mailboxLoads = None
+
+    # Number of application nodes on each core, keyed by packed address.
+    coreLoads = None
+
+    # Number of application edges from each mailbox to each other mailbox,
+    # as a (mailbox x mailbox) matrix.
+    pairLoads = None
+
+    # Number of nodes moved so far.
+    moves = 0
+
+    def __init__(self, data: Data,
+                 edgeCache: typing.Union[EdgeCache, Topology]=None) -> None:
+        """
+        Constructs an evaluator starting from the placement in `data`, with
+        edge costs from `edgeCache` (an EdgeCache or a Topology). Defaults to
+        `data.load_edge_cache()`, or if there's no edge cache file, to costs
+        worked out from the topology of the hardware.
+        """
+        self.data = data
+        self.graph = data.graph("application")
+        if edgeCache is None:
+            try:
+                edgeCache = data.load_edge_cache()
+            except RuntimeError:
+                edgeCache = Topology.from_data(data)
+        self.edgeCache = edgeCache
+
+        # Mailbox ids from packed addresses, through a sorted lookup table.
+        cacheAddresses = address.pack(
+            pd.Series(self.edgeCache.mailboxes, dtype=object), data.boxes)
+        self._order = np.argsort(cacheAddresses, kind="stable")
+        self._sortedAddresses = cacheAddresses[self._order]
+
+        self.placement = self.graph.addresses.copy()
+        self.mailboxIds = self._mailbox_ids(self.placement)
+        self.edgeCosts = self._costs(np.arange(self.graph.edgeCount))
+
+        # Loading counts every mapped application node, including those
+        # without edges (which aren't in the graph, so can't be moved).
+        mapped = data.addresses[(keyAppToHw, "hwnode")]
+        mappedMailboxes = self._mailbox_ids(mapped)
+        self.mailboxLoads = np.bincount(
+            mappedMailboxes[mappedMailboxes >= 0],
+            minlength=len(self.edgeCache))
+        cores, counts = address.group_sum(mapped, "core")
+        self.coreLoads = collections.Counter(
+            dict(zip(cores.tolist(), counts.astype(np.int64).tolist())))
+
+        size = len(self.edgeCache)
+        self.pairLoads = np.zeros(size * size, dtype=np.int64)
+        self._totalCost = 0.0
+        self._costedEdges = 0
+        self._onMailboxEdges = 0
+        self._account(np.arange(self.graph.edgeCount), 1)
+        self.moves = 0
+
+    def _mailbox_ids(self, addresses: np.ndarray) -> np.ndarray:
+        """
+        Returns the mailbox id (in the edge cache) of each packed address,
+        or -1 for addresses that aren't on a mailbox in the cache.
+        """
+        mailboxes = address.truncate(np.asarray(addresses, dtype=np.int64),
+                                     "mailbox")
+        rows = np.minimum(np.searchsorted(self._sortedAddresses, mailboxes),
+                          len(self._sortedAddresses) - 1)
+        found = (self._sortedAddresses[rows] == mailboxes) & (mailboxes >= 0)
+        return np.where(found, self._order[rows], -1)
+
+    def _costs(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Returns the cost of each of `edges` (by edge id) in the current
+        placement.
+        """
+        fromIds = self.mailboxIds[self.graph.edgeFrom[edges]]
+        toIds = self.mailboxIds[self.graph.edgeTo[edges]]
+        known = (fromIds >= 0) & (toIds >= 0)
+        out = np.full(len(edges), np.nan)
+        out[known] = self.edgeCache.costs(fromIds[known], toIds[known])
+        out[known & (fromIds == toIds)] = onMailboxCost
+        return out
+
+    def _account(self, edges: np.ndarray, sign: int) -> None:
+        """
+        Adds (`sign` 1) or removes (`sign` -1) the contribution of `edges`,
+        with their current costs, to the running totals.
+        """
+        fromIds = self.mailboxIds[self.graph.edgeFrom[edges]]
+        toIds = self.mailboxIds[self.graph.edgeTo[edges]]
+        costs = self.edgeCosts[edges]
+        costed = ~np.isnan(costs)
+        self._totalCost += sign * float(costs[costed].sum())
+        self._costedEdges += sign * int(costed.sum())
+        self._onMailboxEdges += sign * int(
+            (costed & (fromIds == toIds)).sum())
+        crossing = costed & (fromIds != toIds)
+        np.add.at(self.pairLoads, fromIds[crossing] * len(self.edgeCache) +
+                  toIds[crossing], sign)
+
+    def _threads(self, threads) -> np.ndarray:
+        """
+        Returns `threads` (hardware names, or packed addresses) as packed
+        addresses. Raises a ValueError if any aren't on a mailbox in the edge
+        cache.
+        """
+        threads = np.atleast_1d(np.asarray(threads))
+        if threads.dtype.kind not in "iu":
+            threads = address.pack(pd.Series(threads, dtype=object),
+                                   self.data.boxes)
+        threads = threads.astype(np.int64)
+        unknown = self._mailbox_ids(threads) < 0
+        if unknown.any():
+            raise ValueError("Thread {} is not on a mailbox in the edge cache."
+                             .format(np.atleast_1d(threads)[unknown][0]))
+        return threads
+
+    def _nodes(self, nodes) -> np.ndarray:
+        """
+        Returns the ids of `nodes` (see CSRGraph.ids). Raises a ValueError
+        if any node is given twice.
+        """
+        ids = self.graph.ids(nodes)
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("Each node can only be moved once per batch.")
+        return ids
+
+    def _moves(self, nodes, threads) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ids of `nodes` (see `_nodes`) and `threads` as packed
+        addresses (see `_threads`). Raises a ValueError if there isn't one
+        thread for each node.
+        """
+        ids = self._nodes(nodes)
+        threads = self._threads(threads)
+        if len(threads) != len(ids):
+            raise ValueError("Got {} nodes, but {} threads."
+                             .format(len(ids), len(threads)))
+        return ids, threads
+
+    def move(self, nodes, threads) -> float:
+        """
+        Moves application nodes to threads, updating loading and edge costs.
+        Arguments:
+
+         - nodes: Application nodes, as names or node ids (or one of either).
+         - threads: Thread to move each node to, as hardware names or packed
+               addresses (see address.py).
+
+        Returns the change in the total cost of application edges.
+        """
+        ids, threads = self._moves(nodes, threads)
+        edges = self.graph.edges(ids)
+        before = self._totalCost
+        self._account(edges, -1)
+
+        # Loading.
+        oldMailboxes = self.mailboxIds[ids]
+        np.subtract.at(self.mailboxLoads, oldMailboxes[oldMailboxes >= 0], 1)
+        oldCores = address.truncate(self.placement[ids], "core")
+        self.coreLoads.subtract(oldCores[oldCores >= 0].tolist())
+        self.placement[ids] = threads
+        self.mailboxIds[ids] = self._mailbox_ids(threads)
+        np.add.at(self.mailboxLoads, self.mailboxIds[ids], 1)
+        newCores = address.truncate(threads, "core")
+        self.coreLoads.update(newCores[newCores >= 0].tolist())
+
+        self.edgeCosts[edges] = self._costs(edges)
+        self._account(edges, 1)
+        self.moves += len(ids)
+        return self._totalCost - before
+
+    def swap(self, nodesA, nodesB) -> float:
+        """
+        Swaps the threads of two sets of application nodes (given as for
+        `move`), pairwise.
+
+        Returns the change in the total cost of application edges.
+        """
+        idsA = self.graph.ids(nodesA)
+        idsB = self.graph.ids(nodesB)
+        return self.move(np.concatenate((idsA, idsB)),
+                         np.concatenate((self.placement[idsB],
+                                         self.placement[idsA])))
+
+    def cost_change(self, nodes, threads) -> float:
+        """
+        Returns the change in the total cost of application edges that moving
+        `nodes` to `threads` (as for `move`) would make, without moving
+        anything.
+        """
+        ids, threads = self._moves(nodes, threads)
+        edges = self.graph.edges(ids)
+        before = np.nansum(self.edgeCosts[edges])
+        saved = self.mailboxIds[ids].copy()
+        self.mailboxIds[ids] = self._mailbox_ids(threads)
+        after = np.nansum(self._costs(edges))
+        self.mailboxIds[ids] = saved
+        return float(after - before)
+
+    def summary(self) -> Summary:
+        """
+        Returns numbers describing the current placement. The maximum edge
+        cost looks at every edge; everything else is kept up to date as nodes
+        move.
+        """
+        coreLoads = np.fromiter(self.coreLoads.values(), dtype=np.int64,
+                                count=len(self.coreLoads))
+        return Summary(
+            moves=self.moves,
+            totalEdgeCost=self._totalCost,
+            meanEdgeCost=self._totalCost / self._costedEdges
+            if self._costedEdges else np.nan,
+            maxEdgeCost=float(np.nanmax(self.edgeCosts))
+            if self._costedEdges else np.nan,
+            onMailboxFraction=self._onMailboxEdges / self._costedEdges
+            if self._costedEdges else np.nan,
+            crossingEdges=self._costedEdges - self._onMailboxEdges,
+            mailboxesUsed=int((self.mailboxLoads > 0).sum()),
+            maxMailboxLoad=int(self.mailboxLoads.max())
+            if len(self.mailboxLoads) else 0,
+            coresUsed=int((coreLoads > 0).sum()),
+            maxCoreLoad=int(coreLoads.max()) if len(coreLoads) else 0,
+            maxPairLoad=int(self.pairLoads.max())
+            if len(self.pairLoads) else 0)
+
+    def placement_frame(self) -> pd.DataFrame:
+        """
+        Returns the current placement as a dataframe like the application to
+        hardware mapping (`data.frames[keyAppToHw]`), with one row per
+        application node in the graph.
+        """
+        return pd.DataFrame(
+            {headers[keyAppToHw][0]: self.graph.names,
+             headers[keyAppToHw][1]: address.unpack(self.placement,
+                                                    self.data.boxes)})
+
+    def mailbox_loading(self) -> pd.DataFrame:
+        """
+        Returns the current number of application nodes on each mailbox, as
+        a dataframe like the mailbox loading (`data.frames[
+        keyNodeLoadingMbox]`), with one row per mailbox that has any.
+        """
+        used = np.flatnonzero(self.mailboxLoads)
+        return pd.DataFrame(
+            {headers[keyNodeLoading][0]: self.edgeCache.mailboxes[used],
+             headers[keyNodeLoading][1]: self.mailboxLoads[used]})
@@ -0,0 +1,32 @@
+# Checks packing hardware names into integer addresses, and back.
+
+from placement_postprocessing import address
+
+import numpy as np
+import pandas as pd
+
+
+def test_pack_round_trip():
+    names = ["O_.root.ext.LoneBox.B10.M23",
+             "O_.root.ext.LoneBox.B10.M23.C3",
+             "O_.root.ext.Co.B21.M00.C1.T15"]
+    boxes = []
+    packed = address.pack(pd.Series(names), boxes)
+    assert boxes == ["O_.root.ext.LoneBox", "O_.root.ext.Co"]
+    assert address.unpack(packed[:1], boxes, "mailbox").tolist() == names[:1]
+    assert address.unpack(packed[1:2], boxes, "core").tolist() == names[1:2]
+    assert address.unpack(packed[2:], boxes, "thread").tolist() == \
+        ["O_.root.ext.Co.B21.M00.C1.T15"]
+    assert address.field(packed, "boardX").tolist() == [1, 1, 2]
+    assert (address.truncate(packed[:2], "mailbox") == packed[0]).all()
+
+
+def test_pack_rejects_junk():
+    names = ["O_.root.ext.LoneBox.B10.M34garbage",
+             "O_.root.ext.LoneBox.B10.M34.C1x",
+             "prefix O_.root.ext.LoneBox.B10.M34\nmore",
+             "O_.root.ext.LoneBox.B10",
+             "nonsense"]
+    assert (address.pack(pd.Series(names), []) == -1).all()
+    assert address.pack(pd.Series(["O_.root.ext.LoneBox.B10.M34"]),
+                        [])[0] >= 0
@@ -0,0 +1,64 @@
+# Checks that placement files are read when they're first needed, and that
+# cached dataframes come back as they went in.
+
+import placement_postprocessing as pp
+from placement_postprocessing import framecache, reader
+
+import os
+import pandas as pd
+import pytest
+
+exampleData = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "example_data")
+
+
+def test_frames_are_read_lazily():
+    data = pp.Data(exampleData)
+    assert not any(data.frames.is_loaded(key) for key in data.frames)
+    data.frames[pp.keyNodeLoadingCore]
+
+    # Both halves of the node loading file are read together, and nothing
+    # else is.
+    assert {key for key in data.frames if data.frames.is_loaded(key)} == \
+        {pp.keyNodeLoadingCore, pp.keyNodeLoadingMbox}
+
+
+def test_frames_are_read_eagerly():
+    data = pp.Data(exampleData, lazy=False)
+    assert all(data.frames.is_loaded(key) for key in data.frames)
+    assert data.validation.ok
+
+
+def test_cached_frames_are_reused(tmp_path, monkeypatch):
+    cacheDir = str(tmp_path / "cache")
+    parsed = pp.Data(exampleData, cacheDir=cacheDir, lazy=False)
+
+    def refuse(*args, **kwargs):
+        raise AssertionError("Parsed a file that was cached.")
+    monkeypatch.setattr(reader, "read_frame", refuse)
+    monkeypatch.setattr(reader, "read_node_loading", refuse)
+    cached = pp.Data(exampleData, cacheDir=cacheDir, lazy=False)
+    for key in parsed.frames:
+        pd.testing.assert_frame_equal(cached.frames[key], parsed.frames[key])
+
+
+def test_cache_round_trip(tmp_path):
+    frame = pd.DataFrame({"name": pd.Categorical(["b", "a", "b"]),
+                          "note": ["x", None, "y"],
+                          "load": pd.Series([1, 2, 3], dtype="int32"),
+                          "cost": [0.5, 1.0, 2.0]})
+    path = framecache.cache_path(str(tmp_path), "source.csv", "some key")
+    framecache.save(path, frame, "fingerprint")
+    loaded = framecache.load(path, "fingerprint")
+    pd.testing.assert_frame_equal(loaded, frame, check_dtype=False)
+    assert (loaded.dtypes[["name", "load", "cost"]] ==
+            frame.dtypes[["name", "load", "cost"]]).all()
+
+    # A changed source, or a missing cache, just means parsing again.
+    assert framecache.load(path, "another fingerprint") is None
+    assert framecache.load(path + ".missing", "fingerprint") is None
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError, match="CSV engine"):
+        pp.Data(exampleData, csvEngine="nonsense", lazy=False)
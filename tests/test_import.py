@@ -0,0 +1,35 @@
+# Checks that importing the package stays quick, and leaves the heavy
+# modules to be imported when they're first used.
+
+import benchmark
+
+import os
+import subprocess
+import sys
+
+
+def test_import_is_quick():
+    seconds, imported = benchmark.time_import()
+    assert seconds < benchmark.importBudget, \
+        "Importing took {:.3f}s (budget {}s).".format(
+            seconds, benchmark.importBudget)
+    assert not imported, "Importing imported '{}'.".format(
+        "', '".join(imported))
+
+
+def test_data_defers_its_helpers():
+    # Modules only some of Data's methods need.
+    deferred = ("address", "edgecache", "framecache", "graph", "streaming",
+                "validation")
+    code = ("import sys\n"
+            "import placement_postprocessing as pp\n"
+            "pp.Data\n"
+            "print(' '.join(module for module in {!r} if "
+            "'placement_postprocessing.' + module in sys.modules))"
+            .format(deferred))
+    root = os.path.dirname(os.path.abspath(benchmark.__file__))
+    imported = subprocess.run(
+        [sys.executable, "-c", code], check=True, stdout=subprocess.PIPE,
+        universal_newlines=True, cwd=root).stdout.split()
+    assert not imported, "Touching Data imported '{}'.".format(
+        "', '".join(imported))
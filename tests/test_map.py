@@ -0,0 +1,31 @@
+# Checks where mailboxes are put on maps.
+
+import placement_postprocessing as pp
+
+import numpy as np
+
+
+def test_positions_from_names():
+    names = ["O_.root.ext.LoneBox.B00.M00",
+             "O_.root.ext.LoneBox.B10.M01",
+             "O_.root.ext.LoneBox.B21.M33",
+             "O_.root.ext.Co.B00.M00",
+             "O_.root.ext.Co.B21.M32",
+             "O_.root.ext.El.B01.M10",
+             "O_.root.ext.Nowhere.B00.M00",
+             "gibberish"]
+    expected = [(0, 0), (4, 1), (11, 7), (12, 0), (23, 6), (13, 12),
+                (-1, -1), (-1, -1)]
+    assert pp.map.node_positions_from_names(names).tolist() == \
+        [list(position) for position in expected]
+    assert [pp.map.node_position_from_name(name) for name in names] == \
+        expected
+
+
+def test_boxes_do_not_overlap():
+    names = ["O_.root.ext.{}.B{}{}.M{}{}".format(box, bx, by, mx, my)
+             for box in ("Ay", "Co", "De", "El")
+             for bx in range(3) for by in range(2)
+             for mx in range(4) for my in range(4)]
+    positions = pp.map.node_positions_from_names(names)
+    assert len(np.unique(positions, axis=0)) == len(names)
@@ -0,0 +1,117 @@
+# Checks that placement files that don't agree with each other are caught,
+# however they're loaded.
+
+import placement_postprocessing as pp
+
+import glob
+import os
+import pytest
+import shutil
+
+exampleData = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "example_data")
+
+
+def _corrupt(tmp_path, pattern: str, edit) -> str:
+    """
+    Copies the example data into `tmp_path`, with the lines of the file
+    matching `pattern` changed by `edit`, which is given the list of lines
+    and changes it in place. Returns the copy's path.
+    """
+    dataDir = str(tmp_path / "data")
+    shutil.copytree(exampleData, dataDir)
+    path = glob.glob(os.path.join(dataDir, pattern))[0]
+    with open(path) as dataFile:
+        lines = dataFile.readlines()
+    edit(lines)
+    with open(path, "w") as dataFile:
+        dataFile.writelines(lines)
+    return dataDir
+
+
+def _set_load(lines, marker: str) -> None:
+    """Sets the load of the first row after `marker` in node loading."""
+    row = lines.index(marker + "\n") + 1
+    lines[row] = lines[row].rsplit(",", 1)[0] + ",99\n"
+
+
+def _set_column(lines, column: int, value: str) -> None:
+    """Sets one column of the first row of a CSV file."""
+    fields = lines[0].rstrip("\n").split(",")
+    fields[column] = value
+    lines[0] = ",".join(fields) + "\n"
+
+
+def _corrupt_core_load(tmp_path) -> str:
+    """
+    Copies the example data into `tmp_path`, with the load of the first core
+    in the node loading file changed. Returns the copy's path.
+    """
+    return _corrupt(tmp_path, "placement_node_loading_*",
+                    lambda lines: _set_load(lines, "[core]"))
+
+
+# Corruptions, as (check that should catch it, file pattern, edit, problem
+# the offending row should have).
+corruptions = (
+    ("mapping", "placement_hardware_to_gi_*",
+     lambda lines: _set_column(
+         lines, 0, "O_.POETSHardwareOneBox.ocfg.LoneBox.B00.M00.C0.T09"),
+     "not in the {}".format(pp.keyAppToHw)),
+    ("core loading", "placement_node_loading_*",
+     lambda lines: _set_load(lines, "[core]"),
+     "load is not the number of devices mapped there"),
+    ("mailbox loading", "placement_node_loading_*",
+     lambda lines: _set_load(lines, "[mailbox]"),
+     "load is not the number of devices mapped there"),
+    ("application edges", "placement_gi_edges_*",
+     lambda lines: _set_column(lines, 1, "O_.PlateHeat.plate_33x33.nope"),
+     "'to' is not in the application to hardware mapping"),
+    ("hardware edges", "placement_edge_loading_*",
+     lambda lines: _set_column(
+         lines, 0, "O_.POETSHardwareOneBox.ocfg.LoneBox.B30.M10"),
+     "'from' is not a mailbox in its box"))
+
+
+def test_example_data_passes():
+    report = pp.Data(exampleData, validate=False).validate()
+    assert report.ok
+    assert report.checks == pp.validation.checks
+
+
+@pytest.mark.parametrize("check, pattern, edit, problem", corruptions,
+                         ids=[corruption[0] for corruption in corruptions])
+def test_corruption_is_found(tmp_path, check, pattern, edit, problem):
+    data = pp.Data(_corrupt(tmp_path, pattern, edit), validate=False)
+    with pytest.raises(RuntimeError, match=check):
+        data.validate()
+    assert list(data.validation.problems) == [check]
+    rows = data.validation.problems[check]
+    assert problem in rows["problem"].tolist()
+
+    # Explicit checks leave the dataframes alone.
+    assert data.frames.is_loaded(pp.validation.checkFrames[check][0])
+
+
+def test_eager_failure_raises(tmp_path):
+    with pytest.raises(RuntimeError, match="core loading"):
+        pp.Data(_corrupt_core_load(tmp_path), lazy=False)
+
+
+def test_checks_wait_for_their_frames(tmp_path):
+    data = pp.Data(_corrupt_core_load(tmp_path))
+    data.frames[pp.keyNodeLoadingCore]  # The mapping isn't loaded yet...
+    assert data.validation is None
+    with pytest.raises(RuntimeError, match="core loading"):
+        data.frames[pp.keyAppToHw]  # ...but now it is.
+
+
+def test_lazy_failure_raises_every_time(tmp_path):
+    data = pp.Data(_corrupt_core_load(tmp_path))
+    data.frames[pp.keyAppToHw]
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="core loading"):
+            data.frames[pp.keyNodeLoadingCore]
+    with pytest.raises(RuntimeError, match="core loading"):
+        pp.metrics.summarise(data)
+    assert "core loading" in data.validation.problems
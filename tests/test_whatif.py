@@ -0,0 +1,80 @@
+# Checks that moving application nodes about keeps the what-if evaluator's
+# costs and loading up to date.
+
+import placement_postprocessing as pp
+from placement_postprocessing import address, whatif
+
+import numpy as np
+import os
+import pytest
+
+exampleData = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "example_data")
+
+
+@pytest.fixture
+def evaluator(tmp_path):
+    data = pp.Data(exampleData)
+    return whatif.MoveEvaluator(
+        data, data.load_edge_cache(sidecarDir=str(tmp_path)))
+
+
+def _elsewhere(evaluator, node: int) -> int:
+    """Returns a thread on a different mailbox to `node`'s."""
+    mailboxes = address.truncate(evaluator.placement, "mailbox")
+    return int(evaluator.placement[np.flatnonzero(
+        mailboxes != mailboxes[node])[0]])
+
+
+def _loading(evaluator) -> dict:
+    frame = evaluator.mailbox_loading()
+    return dict(zip(frame["node"].tolist(), frame["load"].tolist()))
+
+
+def test_loading_matches_the_dumps(evaluator):
+    frame = evaluator.data.frames[pp.keyNodeLoadingMbox]
+    assert _loading(evaluator) == dict(zip(frame["node"].astype(str),
+                                           frame["load"].tolist()))
+
+
+def test_cost_change_predicts_move(evaluator):
+    start = evaluator.summary()
+    loading = _loading(evaluator)
+    home = int(evaluator.placement[0])
+    thread = _elsewhere(evaluator, 0)
+
+    predicted = evaluator.cost_change(0, thread)
+    assert evaluator.summary() == start  # Nothing moved.
+    change = evaluator.move(0, thread)
+    assert change == pytest.approx(predicted)
+    assert evaluator.summary().totalEdgeCost == \
+        pytest.approx(start.totalEdgeCost + change)
+    assert evaluator.summary().moves == 1
+    assert _loading(evaluator) != loading
+
+    # Moving back puts everything back.
+    assert evaluator.move(0, home) == pytest.approx(-change)
+    assert evaluator.summary()._replace(moves=0) == \
+        start._replace(totalEdgeCost=pytest.approx(start.totalEdgeCost))
+    assert _loading(evaluator) == loading
+
+
+def test_swap_twice_changes_nothing(evaluator):
+    start = evaluator.summary()
+    placement = evaluator.placement.copy()
+    node = np.flatnonzero(evaluator.placement ==
+                          _elsewhere(evaluator, 0))[0]
+    change = evaluator.swap(0, node)
+    assert evaluator.placement[0] == placement[node]
+    assert evaluator.placement[node] == placement[0]
+    assert evaluator.swap(0, node) == pytest.approx(-change)
+    assert (evaluator.placement == placement).all()
+    assert evaluator.summary().totalEdgeCost == \
+        pytest.approx(start.totalEdgeCost)
+
+
+def test_bad_moves(evaluator):
+    with pytest.raises(ValueError, match="threads"):
+        evaluator.cost_change([0, 1], [int(evaluator.placement[2])])
+    with pytest.raises(ValueError, match="once per batch"):
+        evaluator.move([0, 0], evaluator.placement[:2])